@@ -0,0 +1,61 @@
+"""
+Compare two benchmark result files written by benchmarks.pipeline.
+
+Usage:
+    python -m benchmarks.compare BASE.json NEW.json [--threshold 10]
+
+Exits with status 1 if any stage, the total or the peak RSS got slower
+or larger than the threshold (in percent).
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Optional
+
+
+def change(base: Optional[float], new: Optional[float]) -> Optional[float]:
+    if base is None or new is None or base == 0:
+        return None
+    return (new - base) / base * 100
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare two Connor benchmark results.")
+    parser.add_argument("base", type=str)
+    parser.add_argument("new", type=str)
+    parser.add_argument("--threshold", type=float, default=10.0, help="Max allowed regression in percent.")
+    parser.add_argument("--min-seconds", type=float, default=0.05,
+                        help="Ignore regressions of stages faster than this in both runs.")
+    args = parser.parse_args()
+
+    base = json.loads(Path(args.base).read_text())
+    new = json.loads(Path(args.new).read_text())
+
+    print(f"base: {base.get('commit') or 'unknown'}  new: {new.get('commit') or 'unknown'}")
+    if base.get("parameters") != new.get("parameters"):
+        print("Warning: the runs used different parameters")
+
+    rows = [(stage, base["stages"].get(stage), new["stages"].get(stage), "s") for stage in new["stages"]]
+    rows.append(("total", base.get("total_seconds"), new.get("total_seconds"), "s"))
+    rows.append(("peak rss", base.get("peak_rss_mb"), new.get("peak_rss_mb"), "MB"))
+
+    regressed = False
+    for name, old_value, new_value, unit in rows:
+        delta = change(old_value, new_value)
+        flag = ""
+        small = unit == "s" and max(old_value or 0, new_value or 0) < args.min_seconds
+        if delta is not None and delta > args.threshold and not small:
+            flag = "  REGRESSION"
+            regressed = True
+
+        old_text = f"{old_value:10.3f}" if old_value is not None else f"{'-':>10}"
+        new_text = f"{new_value:10.3f}" if new_value is not None else f"{'-':>10}"
+        delta_text = f"{delta:+8.1f}%" if delta is not None else f"{'-':>9}"
+        print(f"{name:<18} {old_text} {new_text} {unit:<2} {delta_text}{flag}")
+
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+Synthetic corpus generator for the benchmarks.
+
+Writes a reproducible folder of topical documents in every format Connor
+reads, plus binary files that end up in _misc, spread over nested
+subfolders so that nested trees are exercised too.
+
+Usage:
+    python -m benchmarks.corpus PATH [--files N] [--mix txt=2,pdf=1,...] [--seed S]
+"""
+import argparse
+import random
+import zipfile
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List
+
+TOPICS = {
+    "finance": "invoice budget payment quarter report finance tax revenue audit ledger",
+    "cooking": "recipe pasta garlic tomato kitchen oven dinner flour basil sauce",
+    "software": "kernel compiler thread memory python function module test build release",
+    "medicine": "patient clinic dose therapy symptom trial hospital nurse diagnosis",
+    "legal": "contract clause tenant lease court agreement liability party witness",
+    "travel": "flight hotel passport itinerary luggage airport booking museum beach",
+}
+FILLER = "the and of to in for with on this that from by is are was were".split()
+VOCABULARY = [word for words in TOPICS.values() for word in words.split()]
+
+FORMATS = ("txt", "md", "csv", "pdf", "docx", "xlsx", "pptx", "odt", "bin")
+DEFAULT_MIX = {fmt: 1.0 for fmt in FORMATS}
+
+
+def synthetic_texts(count: int, words: int, seed: int = 0) -> List[str]:
+    """
+    Return reproducible pseudo-documents drawn from all topics at random.
+    """
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(5, words)))
+        for _ in range(count)
+    ]
+
+
+def topical_text(rng: random.Random, topic: str, words: int) -> str:
+    """
+    Return a pseudo-document mostly about one topic.
+    """
+    topic_words = TOPICS[topic].split()
+    return " ".join(
+        rng.choice(topic_words) if rng.random() < 0.6 else rng.choice(FILLER)
+        for _ in range(words)
+    )
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """
+    Parse a format mix such as 'txt=2,pdf=1,bin=0.5'.
+    """
+    mix = {}
+    for item in value.split(","):
+        fmt, _, weight = item.partition("=")
+        fmt = fmt.strip().lstrip(".")
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{fmt}', expected one of {', '.join(FORMATS)}")
+        mix[fmt] = float(weight or 1)
+    return mix
+
+
+def write_text(path: Path, text: str) -> None:
+    path.write_text(text + "\n", encoding="utf-8")
+
+
+def write_csv(path: Path, text: str) -> None:
+    words = text.split()
+    rows = [",".join(words[i:i + 6]) for i in range(0, len(words), 6)]
+    path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+
+
+def write_pdf(path: Path, text: str) -> None:
+    """
+    Write a minimal single-page PDF with the text as lines of Helvetica.
+    """
+    words = text.split()
+    lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+    stream = "BT /F1 11 Tf 50 780 Td 14 TL\n" + "\n".join(f"({line}) '" for line in lines) + "\nET"
+
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+        "/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream",
+    ]
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(bytes(out))
+
+
+def write_docx(path: Path, text: str) -> None:
+    from docx import Document
+
+    document = Document()
+    words = text.split()
+    for i in range(0, len(words), 20):
+        document.add_paragraph(" ".join(words[i:i + 20]))
+    document.save(str(path))
+
+
+def write_xlsx(path: Path, text: str) -> None:
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    words = text.split()
+    for i in range(0, len(words), 5):
+        sheet.append(words[i:i + 5])
+    workbook.save(str(path))
+
+
+def write_pptx(path: Path, text: str) -> None:
+    from pptx import Presentation
+
+    presentation = Presentation()
+    words = text.split()
+    for i in range(0, len(words), 30):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+        slide.shapes.title.text = " ".join(words[i:i + 3])
+        slide.placeholders[1].text = " ".join(words[i + 3:i + 30])
+    presentation.save(str(path))
+
+
+def write_odt(path: Path, text: str) -> None:
+    """
+    Write a minimal OpenDocument text file.
+    """
+    words = text.split()
+    paragraphs = "".join(
+        f"<text:p>{' '.join(words[i:i + 20])}</text:p>"
+        for i in range(0, len(words), 20)
+    )
+    content = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<office:document-content '
+        'xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+        'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" office:version="1.2">'
+        f"<office:body><office:text>{paragraphs}</office:text></office:body>"
+        "</office:document-content>"
+    )
+    manifest = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0">'
+        '<manifest:file-entry manifest:full-path="/" manifest:media-type="application/vnd.oasis.opendocument.text"/>'
+        '<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>'
+        "</manifest:manifest>"
+    )
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("mimetype", "application/vnd.oasis.opendocument.text", compress_type=zipfile.ZIP_STORED)
+        archive.writestr("content.xml", content, compress_type=zipfile.ZIP_DEFLATED)
+        archive.writestr("META-INF/manifest.xml", manifest, compress_type=zipfile.ZIP_DEFLATED)
+
+
+WRITERS: Dict[str, Callable[[Path, str], None]] = {
+    "txt": write_text,
+    "md": write_text,
+    "csv": write_csv,
+    "pdf": write_pdf,
+    "docx": write_docx,
+    "xlsx": write_xlsx,
+    "pptx": write_pptx,
+    "odt": write_odt,
+}
+MISC_EXTENSIONS = ("png", "zip", "exe", "mp3", "bin")
+
+
+def generate_corpus(
+    root: Path,
+    files: int,
+    mix: Dict[str, float] = DEFAULT_MIX,
+    words: int = 300,
+    depth: int = 2,
+    seed: int = 0,
+) -> Dict[str, int]:
+    """
+    Generate a synthetic folder to organize.
+
+    Args:
+        root: Folder to write into (created if missing).
+        files: Number of files.
+        mix: Relative weight of each format; 'bin' stands for misc files.
+        words: Words per document.
+        depth: Max depth of the nested subfolders.
+        seed: Random seed, the same seed gives the same corpus.
+
+    Returns:
+        Number of files written per format.
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+
+    formats = [fmt for fmt in mix if mix[fmt] > 0]
+    weights = [mix[fmt] for fmt in formats]
+    topics = list(TOPICS)
+    counts: Counter = Counter()
+
+    for i in range(files):
+        fmt = rng.choices(formats, weights)[0]
+        folder = root
+        for level in range(rng.randint(0, depth)):
+            folder = folder / f"dir_{level}_{rng.randint(0, 3)}"
+        folder.mkdir(parents=True, exist_ok=True)
+
+        topic = rng.choice(topics)
+        if fmt == "bin":
+            extension = rng.choice(MISC_EXTENSIONS)
+            (folder / f"{topic}_{i:06d}.{extension}").write_bytes(rng.randbytes(rng.randint(256, 4096)))
+        else:
+            WRITERS[fmt](folder / f"{topic}_{i:06d}.{fmt}", topical_text(rng, topic, words))
+        counts[fmt] += 1
+
+    return dict(counts)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic folder for Connor benchmarks.")
+    parser.add_argument("path", type=str, help="Folder to write into.")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="Format weights, e.g. txt=2,pdf=1,bin=0.5")
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    counts = generate_corpus(Path(args.path), args.files, args.mix, args.words, args.depth, args.seed)
+    print(", ".join(f"{fmt}: {count}" for fmt, count in sorted(counts.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Parity and throughput comparison of the embedding backends.
+
+Encodes the same texts with the PyTorch model and the ONNX backend
+(float32 and each requested int8 quantization) and reports, for every
+ONNX variant, the cosine similarity to the PyTorch embeddings, how often
+the nearest neighbour of a text stays the same, and texts per second.
+
+Usage:
+    python -m benchmarks.embedding_backends [--folder PATH] [--count N]
+        [--quantization avx2 avx512_vnni ...] [--min-cosine 0.99]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from benchmarks.corpus import synthetic_texts  # noqa: E402
+from connor.core.prepare import get_files_list  # noqa: E402
+from connor.core.setup.config import get_model_cache_dir, load_stopwords  # noqa: E402
+from connor.core.setup.dependencies import (  # noqa: E402
+    _load_embedding_model, _setup_cache_environment, get_embedding_model_id
+)
+
+
+def encode(model, texts: List[str], batch_size: int) -> Dict[str, object]:
+    start = time.perf_counter()
+    embeddings = model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+    elapsed = time.perf_counter() - start
+    return {"embeddings": np.asarray(embeddings, dtype=np.float32), "per_second": len(texts) / elapsed}
+
+
+def parity(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, float]:
+    """
+    Compare two embedding matrices of the same texts.
+    """
+    cosine = np.einsum("ij,ij->i", reference, candidate)
+
+    def nearest(X: np.ndarray) -> np.ndarray:
+        similarities = X @ X.T
+        np.fill_diagonal(similarities, -np.inf)
+        return similarities.argmax(axis=1)
+
+    return {
+        "mean_cosine": float(cosine.mean()),
+        "min_cosine": float(cosine.min()),
+        "neighbour_agreement": float((nearest(reference) == nearest(candidate)).mean()),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the torch and ONNX embedding backends.")
+    parser.add_argument("--folder", type=str, help="Read texts from this folder instead of generating them.")
+    parser.add_argument("--count", type=int, default=512, help="Number of synthetic texts.")
+    parser.add_argument("--words", type=int, default=200, help="Max words per text.")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--quantization", nargs="*", default=["avx2"], help="int8 targets to compare.")
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="Fail below this mean cosine.")
+    args = parser.parse_args()
+
+    if args.folder:
+        files_list, _ = get_files_list(Path(args.folder), args.words, load_stopwords())
+        texts = [content for _, content in files_list]
+    else:
+        texts = synthetic_texts(args.count, args.words)
+
+    cache_dir = get_model_cache_dir()
+    _setup_cache_environment(cache_dir)
+
+    reference = encode(_load_embedding_model(cache_dir, "torch", "none"), texts, args.batch_size)
+    print(f"{'backend':<36} {'texts/s':>9} {'speedup':>8} {'mean cos':>9} {'min cos':>9} {'nn agree':>9}")
+    print(f"{get_embedding_model_id('torch', 'none'):<36} {reference['per_second']:9.1f} {1.0:8.2f}")
+
+    failed = False
+    for quantization in ["none", *args.quantization]:
+        model = _load_embedding_model(cache_dir, "onnx", quantization)
+        result = encode(model, texts, args.batch_size)
+        scores = parity(reference["embeddings"], result["embeddings"])
+        speedup = result["per_second"] / reference["per_second"]
+        print(
+            f"{get_embedding_model_id('onnx', quantization):<36} {result['per_second']:9.1f} {speedup:8.2f} "
+            f"{scores['mean_cosine']:9.4f} {scores['min_cosine']:9.4f} {scores['neighbour_agreement']:9.3f}"
+        )
+        failed = failed or scores["mean_cosine"] < args.min_cosine
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+Per-stage benchmark of the organization pipeline.
+
+Generates a synthetic corpus, runs start_run and confirm_run on it with
+a RunProfile, and reports the time and counters of every stage they
+record. Results, including peak RSS and the current commit, are written
+as JSON so that runs can be compared across commits with
+benchmarks.compare.
+
+Usage:
+    python -m benchmarks.pipeline [--files N] [--mix txt=2,pdf=1,...]
+        [--encoder bge|hashing] [--sequential] [--repeat R] [--output results.json]
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from benchmarks.corpus import DEFAULT_MIX, generate_corpus, parse_mix  # noqa: E402
+from connor.core.encoding import EncodingOptions, seq_length_for_budget  # noqa: E402
+from connor.core.group import ClusteringOptions  # noqa: E402
+from connor.core.organize import confirm_run, start_run  # noqa: E402
+from connor.core.pipeline import PipelineOptions  # noqa: E402
+from connor.core.profiling import RunProfile  # noqa: E402
+from connor.core.setup.config import load_config, load_stopwords  # noqa: E402
+
+
+class HashingEncoder:
+    """
+    Model-free stand-in for the embedding model.
+
+    Hashes words into a fixed-size vector so the rest of the pipeline can
+    be benchmarked without loading torch or the model weights.
+    """
+
+    def __init__(self, dimensions: int = 768):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.vectorizer = HashingVectorizer(n_features=dimensions, norm="l2", alternate_sign=False)
+
+    def encode(self, texts: List[str], normalize_embeddings: bool = True, **kwargs: Any) -> np.ndarray:
+        return self.vectorizer.transform(texts).toarray().astype(np.float32)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Return the peak resident set size of this process and its children, in MB.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    scale = 1 if sys.platform == "darwin" else 1024
+    return peak * scale / 2 ** 20
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def run_pipeline(
+    root: Path,
+    model: Any,
+    vectorizer: Any,
+    stop_words: set,
+    exts: Dict[str, str],
+    word_limit: int,
+    folder_word_limit: int,
+    workers: int,
+    clustering: ClusteringOptions,
+    encoding: EncodingOptions,
+    pipeline: PipelineOptions,
+) -> Dict[str, Any]:
+    """
+    Organize a folder with start_run and confirm_run, timing every stage on a RunProfile.
+
+    Stages that overlap in the pipeline threads are timed as they run, so
+    their times can add up to more than the total, which is wall time.
+    """
+    profile = RunProfile()
+    renamed_dict, _, index = start_run(
+        str(root), word_limit, folder_word_limit, exts, model, stop_words, vectorizer,
+        read_workers=workers, clustering=clustering, encoding=encoding, profile=profile,
+        preview_files=None, pipeline=pipeline,
+    )
+    move_stats = confirm_run(str(root), renamed_dict, index, profile)
+
+    report = profile.report()
+    stages = report["stages"]
+    return {
+        "seconds": {name: stage["seconds"] for name, stage in stages.items()},
+        "total_seconds": report["total_seconds"],
+        "stage_counters": {
+            name: {key: value for key, value in stage.items() if key not in ("seconds", "items_per_second")}
+            for name, stage in stages.items()
+        },
+        "counts": {
+            "text_files": stages["encode"]["items"] if "encode" in stages else 0,
+            "folders": len(renamed_dict),
+            "files_moved": move_stats.moved,
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the Connor pipeline.")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="Format weights, e.g. txt=2,pdf=1,bin=0.5")
+    parser.add_argument("--words", type=int, default=300, help="Words per generated document.")
+    parser.add_argument("--depth", type=int, default=2, help="Max depth of generated subfolders.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs on fresh copies of the corpus; stage times are medians.")
+    parser.add_argument("--encoder", choices=("bge", "hashing"), default="bge",
+                        help="'hashing' skips the model to time the rest of the pipeline.")
+    parser.add_argument("--backend", default="torch", help="Embedding backend for the bge encoder.")
+    parser.add_argument("--quantization", default="none", help="ONNX quantization for the bge encoder.")
+    parser.add_argument("--word-limit", type=int, default=200)
+    parser.add_argument("--folder-word-limit", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=0, help="Extraction processes, 0 uses every CPU.")
+    parser.add_argument("--engine", default="auto", help="Clustering engine.")
+    parser.add_argument("--k-selection", default="sqrt", help="Cluster count selection.")
+    parser.add_argument("--batch-size", type=int, default=32, help="Encoding batch size.")
+    parser.add_argument("--sequential", action="store_true",
+                        help="Run reading, preprocessing and encoding one after the other.")
+    parser.add_argument("--output", type=str, help="Write JSON results to this file.")
+    args = parser.parse_args()
+
+    stop_words = load_stopwords()
+    exts = dict(load_config()["Extension_Map"])
+    clustering = ClusteringOptions(engine=args.engine, k_selection=args.k_selection)
+    encoding = EncodingOptions(batch_size=args.batch_size, max_seq_length=seq_length_for_budget(args.word_limit))
+    pipeline = PipelineOptions(enabled=not args.sequential)
+
+    load_start = time.perf_counter()
+    if args.encoder == "bge":
+        from connor.core.setup.dependencies import initialize_models
+
+        model, _, vectorizer = initialize_models(args.backend, args.quantization)
+    else:
+        from connor.core.setup.dependencies import _initialize_vectorizer
+
+        model, vectorizer = HashingEncoder(), _initialize_vectorizer()
+    model_load = time.perf_counter() - load_start
+
+    runs = []
+    for repeat in range(args.repeat):
+        with tempfile.TemporaryDirectory(prefix="connor-bench-") as tmp:
+            root = Path(tmp)
+            corpus = generate_corpus(root, args.files, args.mix, args.words, args.depth, args.seed)
+            runs.append(run_pipeline(
+                root, model, vectorizer, stop_words, exts,
+                args.word_limit, args.folder_word_limit, args.workers,
+                clustering, encoding, pipeline,
+            ))
+
+    # Stages in the order they ran, kept if every run recorded them
+    names = [name for name in runs[-1]["seconds"] if all(name in run["seconds"] for run in runs)]
+    stages = {name: statistics.median(run["seconds"][name] for run in runs) for name in names}
+    results = {
+        **git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            key: value for key, value in vars(args).items() if key != "output"
+        },
+        "corpus": corpus,
+        "counts": runs[-1]["counts"],
+        "model_load_seconds": model_load,
+        "stages": stages,
+        "total_seconds": statistics.median(run["total_seconds"] for run in runs),
+        "stage_counters": runs[-1]["stage_counters"],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    for name, seconds in stages.items():
+        print(f"{name:<18} {seconds:9.3f} s")
+    print(f"{'total':<18} {results['total_seconds']:9.3f} s")
+    if results["peak_rss_mb"] is not None:
+        print(f"{'peak rss':<18} {results['peak_rss_mb']:9.1f} MB")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Startup latency check for the Connor CLI.
+
+Runs `connor -h` and `connor settings` in fresh interpreters and fails if
+either is slower than the budget or imports one of the heavy ML/document
+libraries that should only be loaded during a run.
+
+Usage:
+    python -m benchmarks.startup [--runs N] [--budget SECONDS]
+"""
+import argparse
+import json
+import os
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / "src"
+
+COMMANDS = {
+    "help": ["-h"],
+    "settings": ["settings"],
+}
+
+HEAVY_MODULES = [
+    "torch",
+    "sentence_transformers",
+    "transformers",
+    "sklearn",
+    "openpyxl",
+    "pptx",
+    "docx",
+    "PyPDF2",
+]
+
+# Runs the CLI in-process, then reports which heavy modules got imported
+PROBE = """
+import json, sys
+from connor.main import main
+sys.argv = ["connor"] + sys.argv[1:]
+try:
+    main()
+except SystemExit:
+    pass
+heavy = {heavy}
+sys.stderr.write("CONNOR_MODULES=" + json.dumps([m for m in heavy if m in sys.modules]) + "\\n")
+"""
+
+
+def _env(config_home: Path) -> Dict[str, str]:
+    """
+    Return an environment that runs the source tree against a scratch config.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC_DIR), env.get("PYTHONPATH")]))
+    env["XDG_CONFIG_HOME"] = str(config_home)
+    return env
+
+
+def time_command(args: List[str], runs: int, env: Dict[str, str]) -> float:
+    """
+    Return the median wall time of running the CLI with the given arguments.
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "connor.main", *args],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def imported_heavy_modules(args: List[str], env: Dict[str, str]) -> List[str]:
+    """
+    Return the heavy modules imported while running the CLI with the given arguments.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(heavy=HEAVY_MODULES), *args],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        if line.startswith("CONNOR_MODULES="):
+            return json.loads(line.split("=", 1)[1])
+    return []
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check Connor CLI startup latency.")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per command.")
+    parser.add_argument("--budget", type=float, default=1.0, help="Max median seconds per command.")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as config_home:
+        config_dir = Path(config_home) / "connor"
+        config_dir.mkdir()
+        shutil.copy(ROOT_DIR / "config" / "config.ini", config_dir / "config.ini")
+        env = _env(Path(config_home))
+
+        for name, command in COMMANDS.items():
+            median = time_command(command, args.runs, env)
+            heavy = imported_heavy_modules(command, env)
+
+            status = "ok"
+            if median > args.budget or heavy:
+                status = "FAIL"
+                failed = True
+
+            print(f"{name:<10} {median * 1000:8.1f} ms  {status}")
+            if heavy:
+                print(f"  imported: {', '.join(heavy)}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+from connor.core.organizer import Organizer, OrganizerSettings
+
+__all__ = [
+    "Organizer",
+    "OrganizerSettings",
+]
@@ -1,12 +1,30 @@
 import configparser
 import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from multiprocessing.connection import Connection
+from typing import Optional, Tuple, List
 
 from connor.core import *
+from connor.core.cache import open_embedding_cache
+from connor.core.setup.config import get_embedding_cache_path
+from connor.core.setup.dependencies import get_embedding_model_id, prepare_model_snapshot
+from connor.core.setup.defaults import (
+    EMBEDDING_BACKEND, EMBEDDING_QUANTIZATION,
+    WATCH_POLL_INTERVAL, WATCH_DEBOUNCE, WATCH_MAX_WAIT, TREE_PREVIEW_FILES
+)
+from connor.core.index import FolderIndex
+from connor.core.moving import MoveStats
+from connor.core.organizer import OrganizerSettings
+from connor.core.plan import OrganizationPlan, apply_plan
+from connor.core.prepare import get_files_list
+from connor.core.tree_builder import count_files, write_tree
+from connor.core.profiling import RunProfile, optional_stage
 from connor.core.organize import (
-    start_run, confirm_run
+    start_run, start_incremental_run
 )
+from connor.cli.daemon import WatchDaemon, connect_to_daemon
 
 
 class ConnorCLI:
@@ -20,14 +38,66 @@ class ConnorCLI:
         self.settings.read(self.config_path)
         print("Looking for config at:", self.config_path)
 
-        self.folder_word_limit = int(self.settings["Parameters"].get("folder_word_limit", 2))
-        self.reading_word_limit = int(self.settings["Parameters"].get("reading_word_limit", 200))
-        self.exts = self.settings["Extension_Map"]
+        organizer_settings = OrganizerSettings.from_config(self.settings)
+        self.folder_word_limit = organizer_settings.folder_word_limit
+        self.reading_word_limit = organizer_settings.reading_word_limit
+        self.exts = organizer_settings.exts
+        self.read_workers = organizer_settings.read_workers
+        self.embedding_backend = self.settings.get("Embedding", "backend", fallback=EMBEDDING_BACKEND)
+        self.embedding_quantization = self.settings.get("Embedding", "quantization", fallback=EMBEDDING_QUANTIZATION)
+        snapshot_dir = self.settings.get("Embedding", "snapshot_dir", fallback="")
+        self.model_snapshot_dir = Path(snapshot_dir).expanduser() if snapshot_dir else None
+        self.encoding = organizer_settings.encoding
+        self.pipeline = organizer_settings.pipeline
+        self.dedup = organizer_settings.dedup
+        self.clustering = organizer_settings.clustering
+        self.similarity_threshold = organizer_settings.similarity_threshold
+        self.watch_poll_interval = self.settings.getfloat("Watch", "poll_interval", fallback=WATCH_POLL_INTERVAL)
+        self.watch_debounce = self.settings.getfloat("Watch", "debounce", fallback=WATCH_DEBOUNCE)
+        self.watch_max_wait = self.settings.getfloat("Watch", "max_wait", fallback=WATCH_MAX_WAIT)
+        self.daemon_handoff = self.settings.getboolean("Watch", "handoff", fallback=True)
+        self.move_workers = organizer_settings.move_workers
+        self.preview_files = self.settings.getint("Preview", "files", fallback=TREE_PREVIEW_FILES)
+        self.memory = organizer_settings.memory
+        self.cache_enabled = self.settings.getboolean("Cache", "enabled", fallback=True)
+        self.cache_max_size_mb = organizer_settings.cache_max_size_mb
 
         terminal_width = shutil.get_terminal_size().columns
         self.separator = '-' * terminal_width
 
-        self.model, self.stop_words, self.vectorizer = initialize_models()
+        # Models are loaded on first use so that commands like
+        # `connor settings` do not pay for torch and the embedding weights.
+        self.model = None
+        self.stop_words = None
+        self.vectorizer = None
+
+    def load_models(self) -> None:
+        """
+        Load the embedding model, stop words and vectorizer if not loaded yet.
+        """
+        if self.model is None:
+            self.model, self.stop_words, self.vectorizer = initialize_models(
+                self.embedding_backend,
+                self.embedding_quantization,
+                self.model_snapshot_dir,
+            )
+
+    def prepare_model(self, output: Optional[str] = None) -> None:
+        """
+        Write a local snapshot of the embedding model that later runs load offline.
+
+        Args:
+            output: Directory to write the snapshot into, the configured one by default.
+        """
+        root = Path(output).expanduser() if output else self.model_snapshot_dir
+        try:
+            snapshot_dir = prepare_model_snapshot(root)
+        except FileExistsError as e:
+            print(f"Error: {e}")
+            return
+        print(f"Model snapshot written to {snapshot_dir}")
+        if output and root != self.model_snapshot_dir:
+            print(f"Set snapshot_dir = {root} in the [Embedding] section of {self.config_path} to use it")
 
     def update_settings(
         self,
@@ -58,43 +128,146 @@ class ConnorCLI:
         print(f"  {'folder words limit':<22} {self.folder_word_limit}")
         print(f"  {'reading limit':<22} {self.reading_word_limit}")
 
-    def organize_folder(self, folder_to_organize: str) -> None:
+    def plan_folder(
+        self,
+        folder_to_organize: Path,
+        incremental: bool = False,
+        profile: Optional[RunProfile] = None,
+        files: Optional[Tuple[List[Tuple[str, str]], List[str]]] = None,
+        require_index: bool = False,
+    ) -> OrganizationPlan:
+        """
+        Compute how a folder will be organized, without moving anything.
+
+        The tree is not formatted here: callers print or send it from the
+        plan, with the names given to colliding files.
+        files are the folder's files already read by read_folder, if any.
+        An incremental run of a folder never organized before organizes the
+        whole folder, or raises FileNotFoundError with require_index.
+        """
+        index = None
+        if incremental:
+            index = FolderIndex.load(folder_to_organize)
+            if index is None and require_index:
+                raise FileNotFoundError(f"No previous organization found in '{folder_to_organize}'")
+            if index is None:
+                print(f"No previous organization found in '{folder_to_organize}', organizing the whole folder.")
+
+        self.load_models()
+
+        cache = None
+        if self.cache_enabled:
+            cache = open_embedding_cache(
+                get_embedding_cache_path(),
+                f"{get_embedding_model_id(self.embedding_backend, self.embedding_quantization)}@{self.encoding.max_seq_length}",
+                self.reading_word_limit,
+                self.cache_max_size_mb,
+            )
+
+        if index is not None:
+            renamed_dict, _, index = start_incremental_run(
+                folder_to_organize=folder_to_organize,
+                reading_word_limit=self.reading_word_limit,
+                folder_word_limit=self.folder_word_limit,
+                exts=self.exts,
+                model=self.model,
+                stop_words=self.stop_words,
+                vectorizer=self.vectorizer,
+                index=index,
+                cache=cache,
+                read_workers=self.read_workers,
+                clustering=self.clustering,
+                similarity_threshold=self.similarity_threshold,
+                encoding=self.encoding,
+                profile=profile,
+                dedup=self.dedup,
+                files=files,
+                pipeline=self.pipeline,
+                build_tree=False,
+            )
+        else:
+            renamed_dict, _, index = start_run(
+                folder_to_organize=folder_to_organize, 
+                reading_word_limit=self.reading_word_limit,
+                folder_word_limit=self.folder_word_limit,
+                exts=self.exts,
+                model=self.model,
+                stop_words=self.stop_words,
+                vectorizer=self.vectorizer,
+                cache=cache,
+                read_workers=self.read_workers,
+                clustering=self.clustering,
+                encoding=self.encoding,
+                profile=profile,
+                dedup=self.dedup,
+                memory=self.memory,
+                files=files,
+                pipeline=self.pipeline,
+                build_tree=False,
+            )
+        if cache is not None:
+            print(f"Embedding cache: {cache.hits} hits, {cache.misses} misses")
+            cache.close()
+
+        return OrganizationPlan.build(folder_to_organize, renamed_dict, index)
+
+    def organize_folder(
+        self,
+        folder_to_organize: str,
+        incremental: bool = False,
+        profile_path: Optional[str] = None,
+        cprofile_stage: Optional[str] = None,
+        full: bool = False,
+        assume_yes: bool = False,
+    ) -> None:
         """
         Frontend level. Just calls the various functions.
+
+        The tree preview lists the first files of each folder, or every file if full.
+        With assume_yes the organization is applied without asking.
+
+        Each stage shows a live progress line when stderr is a terminal. With
+        profile_path, per-stage timings and counters are also written there as
+        JSON, and cprofile_stage is run under cProfile into <profile_path>.<stage>.prof.
         """
         folder_to_organize = Path(folder_to_organize)
 
         if not folder_to_organize.exists():
             print(f"Error: The folder '{folder_to_organize}' does not exist.")
             return
-        
+
         print(self.separator)
         print(f'To customize default settings instead run the command <connor settings -h>\nfolder_word_limit: {self.folder_word_limit}\nreading_word_limit: {self.reading_word_limit}')
         print(self.separator)
+
+        profile = RunProfile(
+            display=sys.stderr.isatty(),
+            cprofile_stage=cprofile_stage if profile_path is not None else None,
+            cprofile_path=Path(f"{profile_path}.{cprofile_stage}.prof") if profile_path and cprofile_stage else None,
+        )
+
+        # Hand the work to a running `connor watch` process if there is one,
+        # unless the run is profiled locally
+        connection = connect_to_daemon() if self.daemon_handoff and profile_path is None and not assume_yes else None
+        if connection is not None:
+            print(f"Folder '{folder_to_organize}' is being organized by the running watch process...")
+            self.organize_with_daemon(connection, folder_to_organize, incremental, full)
+            return
+
         print(f"Folder '{folder_to_organize}' is being organized...")
         
         # Show organization
-        renamed_dict, tree = start_run(
-            folder_to_organize=folder_to_organize, 
-            reading_word_limit=self.reading_word_limit,
-            folder_word_limit=self.folder_word_limit,
-            exts=self.exts,
-            model=self.model,
-            stop_words=self.stop_words,
-            vectorizer=self.vectorizer
-        )
-        print(tree)
+        plan = self.plan_folder(folder_to_organize, incremental, profile)
+        self.print_tree(folder_to_organize, plan, full)
         print(self.separator)
 
         # Confirm Organization
         try:
-            confirm = input(f"The above directory tree explains how the folder will be organized.\nDo you want to continue? [y/n] ")
+            confirm = 'y' if assume_yes else input(f"The above directory tree explains how the folder will be organized.\nDo you want to continue? [y/n] ")
 
             if confirm.lower() == 'y' or confirm == '':
-                confirm_run(
-                    folder_to_organize=folder_to_organize,
-                    renamed_dict=renamed_dict
-                )
+                stats = self.apply_planned(plan, profile)
+                self.print_move_stats(stats)
                 print(f"Folder '{folder_to_organize}' organized successfully.")
                 print(self.separator)
 
@@ -103,4 +276,274 @@ class ConnorCLI:
                 print(self.separator)
 
         except KeyboardInterrupt:
-            print(f"\nAbort. The files in '{folder_to_organize}' were left untouched.")
\ No newline at end of file
+            print(f"\nAbort. The files in '{folder_to_organize}' were left untouched.")
+
+        if profile_path is not None:
+            profile.dump(Path(profile_path))
+            print(f"Profile written to {profile_path}")
+
+    def read_folder(self, folder_to_organize: Path, incremental: bool = False) -> Tuple[List[Tuple[str, str]], List[str]]:
+        """
+        Read and preprocess the files plan_folder will organize: the loose
+        top-level files of an incremental run, or the whole nested tree.
+        """
+        self.load_models()
+        recursive = not (incremental and FolderIndex.path(folder_to_organize).exists())
+        return get_files_list(
+            folder_to_organize, self.reading_word_limit, self.stop_words, self.read_workers,
+            recursive=recursive, skip_duplicates=self.dedup.exact,
+        )
+
+    def organize_folders(
+        self,
+        folders: List[str],
+        incremental: bool = False,
+        full: bool = False,
+        assume_yes: bool = False,
+    ) -> None:
+        """
+        Organize many folders in one process, loading the models once.
+
+        While a folder is encoded, clustered, named and confirmed, the next
+        one is read in a background thread. Each folder gets its own tree
+        and a summary line, and a failing folder does not stop the others.
+        With assume_yes every organization is applied without asking.
+
+        Folders given twice are organized once. A folder inside another one
+        is skipped, as organizing the outer folder moves its files, which
+        could happen while it is read ahead.
+        """
+        roots: List[Path] = []
+        for folder in folders:
+            if not Path(folder).exists():
+                print(f"Error: The folder '{folder}' does not exist.")
+                continue
+            root = Path(folder).resolve()
+            if root not in roots:
+                roots.append(root)
+        for root in list(roots):
+            outer = next((other for other in roots if other != root and other in root.parents), None)
+            if outer is not None:
+                print(f"Error: The folder '{root}' is inside '{outer}', which is organized with it. Skipping it.")
+                roots.remove(root)
+        if not roots:
+            return
+
+        self.load_models()
+        # Low-memory runs stream their own reading and cannot be read ahead
+        read_ahead = not self.memory.low_memory
+        summaries = []
+
+        with ThreadPoolExecutor(max_workers=1) as reader:
+            pending = reader.submit(self.read_folder, roots[0], incremental) if read_ahead else None
+            for i, root in enumerate(roots):
+                print(self.separator)
+                print(f"[{i + 1}/{len(roots)}] Folder '{root}' is being organized...")
+                try:
+                    files = pending.result() if pending is not None else None
+                except Exception as e:
+                    summaries.append(f"{root}: failed to read ({type(e).__name__}: {e})")
+                    print(f"Error reading '{root}': {e}")
+                    continue
+                finally:
+                    if read_ahead and i + 1 < len(roots):
+                        pending = reader.submit(self.read_folder, roots[i + 1], incremental)
+
+                profile = RunProfile(display=sys.stderr.isatty())
+                try:
+                    plan = self.plan_folder(root, incremental, profile, files=files)
+                    del files
+                    self.print_tree(root, plan, full)
+                    print(self.separator)
+
+                    planned = f"{count_files(plan.renamed_dict)} files in {len(plan.renamed_dict)} folders"
+                    confirm = 'y' if assume_yes else input(f"The above directory tree explains how the folder will be organized.\nDo you want to continue? [y/n] ")
+                    if confirm.lower() == 'y' or confirm == '':
+                        stats = self.apply_planned(plan, profile)
+                        self.print_move_stats(stats)
+                        summaries.append(f"{root}: {planned}, {stats.moved} moved in {stats.seconds:.2f}s")
+                    else:
+                        print(f"Folder organization aborted. The files in '{root}' were left untouched.")
+                        summaries.append(f"{root}: {planned}, left untouched")
+                except KeyboardInterrupt:
+                    print(f"\nAbort. The files in '{root}' were left untouched.")
+                    summaries.append(f"{root}: interrupted")
+                    break
+                except Exception as e:
+                    print(f"Error organizing '{root}': {e}")
+                    summaries.append(f"{root}: failed ({type(e).__name__}: {e})")
+
+        print(self.separator)
+        print(f"Organized {len(roots)} folders:")
+        for summary in summaries:
+            print(f"  {summary}")
+        print(self.separator)
+
+    def print_tree(self, folder: Path, plan: OrganizationPlan, full: bool) -> None:
+        """
+        Print the tree preview, or stream the whole tree if full.
+
+        Files renamed to avoid a collision show their new name, as they will be on disk.
+        """
+        write_tree(str(folder), plan.renamed_dict, sys.stdout, None if full else self.preview_files, plan.renames())
+
+    def apply_planned(self, plan: OrganizationPlan, profile: Optional[RunProfile] = None) -> MoveStats:
+        """
+        Apply a plan just confirmed by the user, then save its folder index.
+
+        Files changed since planning are left in place and listed.
+        """
+        with optional_stage(profile, "confirm_run") as stage:
+            stats = apply_plan(plan, None, self.move_workers, stage)
+        if stats.changed:
+            print(f"{len(stats.changed)} files changed since planning and were left in place:")
+            for name in stats.changed:
+                print(f"  {name}")
+        return stats.moves
+
+    def save_plan(
+        self,
+        folder_to_organize: str,
+        output: str,
+        incremental: bool = False,
+        full: bool = False,
+    ) -> None:
+        """
+        Compute how a folder will be organized and save the plan to apply later.
+        """
+        folder_to_organize = Path(folder_to_organize)
+
+        if not folder_to_organize.exists():
+            print(f"Error: The folder '{folder_to_organize}' does not exist.")
+            return
+
+        print(f"Planning the organization of '{folder_to_organize}'...")
+        plan = self.plan_folder(folder_to_organize, incremental)
+        self.print_tree(folder_to_organize, plan, full)
+        print(self.separator)
+
+        plan.save(Path(output))
+        print(f"Plan of {len(plan.moves)} moves written to {output}. Apply it with <connor apply {output}>")
+
+    def apply_saved_plan(self, plan_path: str) -> None:
+        """
+        Apply a saved plan, resuming an interrupted apply of the same plan.
+        """
+        plan_path = Path(plan_path)
+
+        if not plan_path.exists():
+            print(f"Error: The plan '{plan_path}' does not exist.")
+            return
+
+        try:
+            plan = OrganizationPlan.load(plan_path)
+        except (ValueError, KeyError) as e:
+            print(f"Error: '{plan_path}' is not a valid plan ({e})")
+            return
+
+        if not plan.root.exists():
+            print(f"Error: The folder '{plan.root}' does not exist.")
+            return
+
+        journal_path = OrganizationPlan.journal_path(plan_path)
+        print(f"Applying {len(plan.moves)} moves to '{plan.root}'...")
+        stats = apply_plan(plan, journal_path, self.move_workers)
+
+        if stats.resumed:
+            print(f"{stats.resumed} moves were already done by an earlier apply")
+        self.print_move_stats(stats.moves)
+        if stats.changed:
+            print(f"{len(stats.changed)} files changed since planning and were left in place:")
+            for name in stats.changed:
+                print(f"  {name}")
+        print(f"Folder '{plan.root}' organized successfully.")
+        print(self.separator)
+
+    def print_move_stats(self, stats: MoveStats) -> None:
+        print(f"Moved {stats.moved} files in {stats.seconds:.2f}s ({stats.files_per_second:.0f} files/s)")
+        if stats.copied:
+            print(f"  {stats.copied} files ({stats.bytes_copied / 2 ** 20:.1f} MB) were copied across devices")
+        if stats.missing:
+            print(f"  {stats.missing} files were no longer in the folder and were skipped")
+        if stats.renamed:
+            print(f"  {stats.renamed} files got a new name as another file took their place after planning")
+
+    def organize_with_daemon(
+        self,
+        connection: Connection,
+        folder_to_organize: Path,
+        incremental: bool = False,
+        full: bool = False,
+    ) -> None:
+        """
+        Organize a folder through a running watch process, confirming locally.
+        """
+        with connection:
+            connection.send({
+                "command": "run",
+                "path": str(folder_to_organize.resolve()),
+                "incremental": incremental,
+                "full": full,
+            })
+            reply = connection.recv()
+            if "error" in reply:
+                print(f"Error: {reply['error']}")
+                return
+            # The tree comes in parts, printed as they arrive
+            while "tree" in reply:
+                sys.stdout.write(reply["tree"])
+                reply = connection.recv()
+            print(self.separator)
+
+            try:
+                confirm = input(f"The above directory tree explains how the folder will be organized.\nDo you want to continue? [y/n] ")
+            except KeyboardInterrupt:
+                connection.send({"confirm": False})
+                print(f"\nAbort. The files in '{folder_to_organize}' were left untouched.")
+                return
+
+            if confirm.lower() == 'y' or confirm == '':
+                connection.send({"confirm": True})
+                reply = connection.recv()
+                if "error" in reply:
+                    print(f"Error: {reply['error']}")
+                    return
+                self.print_move_stats(MoveStats(**reply["stats"]))
+                if reply.get("changed"):
+                    print(f"  {len(reply['changed'])} files changed since planning and were left in place")
+                print(f"Folder '{folder_to_organize}' organized successfully.")
+            else:
+                connection.send({"confirm": False})
+                print(f"Folder organization aborted. The files in '{folder_to_organize}' were left untouched.")
+            print(self.separator)
+
+    def watch_folder(self, folder_to_watch: str) -> None:
+        """
+        Keep the models loaded and organize new files as they arrive.
+        """
+        folder_to_watch = Path(folder_to_watch)
+
+        if not folder_to_watch.exists():
+            print(f"Error: The folder '{folder_to_watch}' does not exist.")
+            return
+
+        # New files are placed into an existing organization, never used to reorganize the whole tree
+        if FolderIndex.load(folder_to_watch) is None:
+            print(f"Error: '{folder_to_watch}' has not been organized yet. Run <connor run {folder_to_watch}> once before watching it.")
+            return
+
+        self.load_models()
+
+        daemon = WatchDaemon(
+            cli=self,
+            folder=folder_to_watch,
+            poll_interval=self.watch_poll_interval,
+            debounce=self.watch_debounce,
+            max_wait=self.watch_max_wait,
+        )
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
+        finally:
+            daemon.close()
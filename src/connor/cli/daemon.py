@@ -0,0 +1,202 @@
+import os
+import sys
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from pathlib import Path
+from typing import Any, List, Optional
+
+from connor.core.plan import apply_plan
+from connor.core.setup.config import get_daemon_address, get_daemon_authkey
+from connor.core.tree_builder import write_tree
+from connor.core.watch import FolderWatcher
+
+# Lines of the folder tree sent to a client per message
+TREE_MESSAGE_LINES = 1000
+
+
+def connect_to_daemon() -> Optional[Connection]:
+    """
+    Connect to a running `connor watch` process, if there is one.
+    """
+    address = get_daemon_address()
+    if sys.platform != "win32" and not os.path.exists(address):
+        return None
+
+    try:
+        return Client(address, authkey=get_daemon_authkey())
+    except (OSError, EOFError, AuthenticationError):
+        return None
+
+
+class TreeSender:
+    """
+    File-like writer that sends a folder tree to a client in messages of
+    TREE_MESSAGE_LINES lines, so a full tree is never held in memory whole.
+    """
+
+    def __init__(self, connection: Connection):
+        self.connection = connection
+        self.lines: List[str] = []
+
+    def write(self, text: str) -> None:
+        self.lines.append(text)
+        if len(self.lines) >= TREE_MESSAGE_LINES:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.lines:
+            self.connection.send({"tree": "".join(self.lines)})
+            self.lines = []
+
+
+class WatchDaemon:
+    """
+    Long-running process that keeps the models loaded.
+
+    It organizes new files dropped into the watched folder and serves
+    `connor run` invocations handed over through a local socket.
+    """
+
+    def __init__(
+        self,
+        cli: Any,
+        folder: Path,
+        poll_interval: float,
+        debounce: float,
+        max_wait: float,
+    ):
+        """
+        Args:
+            cli: ConnorCLI with loaded models and settings.
+            folder: Folder to watch.
+            poll_interval: Seconds between folder scans.
+            debounce: Quiet seconds required before a batch is organized.
+            max_wait: Max seconds a batch can be delayed by ongoing arrivals.
+        """
+        self.cli = cli
+        self.folder = Path(folder)
+        self.watcher = FolderWatcher(self.folder, poll_interval, debounce, max_wait)
+        self.address = get_daemon_address()
+        self.listener: Optional[Listener] = None
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+
+    def open_listener(self) -> Listener:
+        """
+        Listen on the handoff socket, clearing a stale one left by a dead process.
+        """
+        if sys.platform != "win32" and os.path.exists(self.address):
+            connection = connect_to_daemon()
+            if connection is not None:
+                connection.close()
+                raise RuntimeError(f"Another watch process is already listening on {self.address}")
+            os.unlink(self.address)
+
+        return Listener(self.address, authkey=get_daemon_authkey())
+
+    def serve_forever(self) -> None:
+        """
+        Watch the folder and serve handed-off runs until interrupted.
+        """
+        try:
+            self.listener = self.open_listener()
+        except (OSError, RuntimeError) as e:
+            print(f"Warning: Not accepting handed-off runs ({e})")
+        else:
+            threading.Thread(target=self.serve_clients, daemon=True).start()
+
+        print(f"Watching '{self.folder}'. Press Ctrl+C to stop.")
+        while not self.stop.is_set():
+            batch = self.watcher.wait_for_batch(self.stop)
+            if batch:
+                self.organize_batch(batch)
+
+    def organize_batch(self, batch: List[str]) -> None:
+        """
+        Organize a batch of new files into the watched folder.
+
+        Only the files of the batch are planned and moved, into the folders
+        of the existing organization, so other loose files neither move nor
+        enter the saved folder index. Files changed between planning and
+        moving are left in place and picked up by the next batch.
+        """
+        print(f"{len(batch)} new file(s) in '{self.folder}', organizing...")
+        try:
+            with self.lock:
+                new_files = set(batch)
+                files_list, misc_list = self.cli.read_folder(self.folder, incremental=True)
+                files = (
+                    [(name, content) for name, content in files_list if name in new_files],
+                    [name for name in misc_list if name in new_files],
+                )
+                plan = self.cli.plan_folder(self.folder, incremental=True, files=files, require_index=True)
+                stats = apply_plan(plan, None, self.cli.move_workers)
+        except Exception as e:
+            print(f"Error organizing '{self.folder}': {e}")
+        else:
+            print(f"Organized {stats.moves.moved} new file(s) in '{self.folder}'.")
+            if stats.changed:
+                print(f"{len(stats.changed)} file(s) changed while organizing and were left in place.")
+        self.watcher.mark_done()
+
+    def serve_clients(self) -> None:
+        while not self.stop.is_set():
+            try:
+                connection = self.listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                if self.stop.is_set():
+                    break
+                continue
+            self.handle_client(connection)
+
+    def handle_client(self, connection: Connection) -> None:
+        """
+        Plan a handed-off run, send the tree back and apply it if confirmed.
+        """
+        with connection:
+            try:
+                request = connection.recv()
+                if request.get("command") != "run":
+                    connection.send({"error": f"Unknown command '{request.get('command')}'"})
+                    return
+
+                folder = Path(request["path"])
+                if not folder.exists():
+                    connection.send({"error": f"The folder '{folder}' does not exist."})
+                    return
+
+                print(f"Handed-off run for '{folder}'")
+                try:
+                    with self.lock:
+                        # Files are checked against their planned size and mtime when applying,
+                        # as the watcher may move some while the user decides
+                        plan = self.cli.plan_folder(folder, request.get("incremental", False))
+                except Exception as e:
+                    connection.send({"error": str(e)})
+                    return
+                sender = TreeSender(connection)
+                write_tree(
+                    str(folder), plan.renamed_dict, sender,
+                    None if request.get("full") else self.cli.preview_files, plan.renames(),
+                )
+                sender.flush()
+                connection.send({"tree_done": True})
+
+                if connection.recv().get("confirm"):
+                    try:
+                        with self.lock:
+                            stats = apply_plan(plan, None, self.cli.move_workers)
+                    except Exception as e:
+                        connection.send({"error": str(e)})
+                        return
+                    connection.send({"status": "ok", "stats": stats.moves._asdict(), "changed": stats.changed})
+            except (OSError, EOFError) as e:
+                print(f"Handed-off run ended early: {e}")
+
+    def close(self) -> None:
+        self.stop.set()
+        if self.listener is not None:
+            self.listener.close()
+            if sys.platform != "win32" and os.path.exists(self.address):
+                os.unlink(self.address)
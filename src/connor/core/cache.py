@@ -0,0 +1,199 @@
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed store of sentence embeddings.
+
+    Entries are keyed by a hash of the encoded text together with the
+    model name and reading word limit, so a change to either invalidates
+    old vectors. The store is bounded in size and evicts the least
+    recently used entries once the limit is exceeded.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        model_name: str,
+        reading_word_limit: int,
+        max_size_mb: int,
+    ):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: Path to the SQLite file backing the cache.
+            model_name: Name of the embedding model.
+            reading_word_limit: Max words read from each file.
+            max_size_mb: Maximum total size of stored vectors in megabytes.
+        """
+        self.path = Path(path)
+        self.namespace = f"{model_name}:{reading_word_limit}"
+        self.max_size = max_size_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        # Running total of the stored bytes, so a put does not sum the whole table
+        self._stored: Optional[int] = None
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.path))
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, "
+            "vector BLOB NOT NULL, "
+            "dim INTEGER NOT NULL, "
+            "last_used REAL NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self.connection.commit()
+
+    def key(self, text: str) -> str:
+        """
+        Return the cache key of a text.
+        """
+        digest = hashlib.sha256()
+        digest.update(self.namespace.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _stored_lengths(self, keys: List[str]) -> int:
+        """
+        Return the total size of the stored vectors of some keys.
+        """
+        total = 0
+        # SQLite limits the number of bound parameters per statement
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            (length,) = self.connection.execute(
+                f"SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings WHERE key IN ({placeholders})",
+                chunk,
+            ).fetchone()
+            total += length
+        return total
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up several keys at once and mark the found ones as used.
+
+        Args:
+            keys: Cache keys to look up.
+
+        Returns:
+            Dictionary of key -> embedding for every key found.
+        """
+        found: Dict[str, np.ndarray] = {}
+        unique_keys = list(dict.fromkeys(keys))
+
+        # SQLite limits the number of bound parameters per statement
+        for start in range(0, len(unique_keys), 500):
+            chunk = unique_keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.connection.execute(
+                f"SELECT key, vector, dim FROM embeddings WHERE key IN ({placeholders})",
+                chunk,
+            )
+            for key, vector, dim in rows:
+                found[key] = np.frombuffer(vector, dtype=np.float32, count=dim)
+
+        if found:
+            now = time.time()
+            self.connection.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+            self.connection.commit()
+
+        self.hits += sum(1 for key in keys if key in found)
+        self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        """
+        Store several embeddings and evict old entries if over the size limit.
+
+        The size of the table is summed once, then kept as a running total;
+        entries written by another process are counted when it is next opened.
+
+        Args:
+            items: Dictionary of key -> embedding.
+        """
+        if not items:
+            return
+
+        now = time.time()
+        rows = []
+        for key, vector in items.items():
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((key, vector.tobytes(), vector.shape[0], now))
+
+        stored = self.size() if self._stored is None else self._stored
+        replaced = self._stored_lengths(list(items))
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector, dim, last_used) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        self.connection.commit()
+        self._stored = stored - replaced + sum(len(row[1]) for row in rows)
+        self.evict()
+
+    def size(self) -> int:
+        """
+        Return the total size of stored vectors in bytes.
+        """
+        (total,) = self.connection.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()
+        self._stored = total
+        return total
+
+    def evict(self) -> None:
+        """
+        Remove least recently used entries until the cache fits its size limit.
+        """
+        stored = self.size() if self._stored is None else self._stored
+        excess = stored - self.max_size
+        if excess <= 0:
+            return
+
+        rows = self.connection.execute(
+            "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used ASC"
+        )
+        stale = []
+        for key, length in rows:
+            if excess <= 0:
+                break
+            stale.append((key,))
+            excess -= length
+            self._stored -= length
+
+        self.connection.executemany("DELETE FROM embeddings WHERE key = ?", stale)
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def open_embedding_cache(
+    path: Path,
+    model_name: str,
+    reading_word_limit: int,
+    max_size_mb: int,
+) -> Optional[EmbeddingCache]:
+    """
+    Open the embedding cache, or return None if it cannot be used.
+    """
+    try:
+        return EmbeddingCache(path, model_name, reading_word_limit, max_size_mb)
+    except sqlite3.Error as e:
+        print(f"Warning: Embedding cache disabled ({e})")
+        return None
@@ -0,0 +1,253 @@
+import hashlib
+import os
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from connor.core.setup.defaults import (
+    DEDUP_EXACT, DEDUP_NEAR, NEAR_DUPLICATE_THRESHOLD
+)
+
+HASH_CHUNK_SIZE = 1 << 20
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+SHINGLE_WORDS = 3
+
+
+class DedupOptions(NamedTuple):
+    """
+    Settings of the duplicate detection before encoding.
+
+    exact skips reading byte-identical files twice. near lets texts whose
+    estimated Jaccard similarity (MinHash over word shingles) reaches
+    near_threshold share one embedding.
+    """
+    exact: bool = DEDUP_EXACT
+    near: bool = DEDUP_NEAR
+    near_threshold: float = NEAR_DUPLICATE_THRESHOLD
+
+
+class DuplicateGroups(NamedTuple):
+    """
+    Texts to encode and how every text maps onto them.
+
+    exact and near count the texts that reuse another text's embedding
+    because they are identical or near-identical to it.
+    """
+    unique: np.ndarray
+    inverse: np.ndarray
+    exact: int
+    near: int
+
+    @property
+    def saved(self) -> int:
+        return self.exact + self.near
+
+
+def file_digest(path: Path) -> bytes:
+    """
+    Hash a file in fixed-size chunks.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def find_exact_duplicates(paths: List[Path]) -> Dict[int, int]:
+    """
+    Find byte-identical files.
+
+    Only files sharing their size and extension with another file are
+    hashed, so most files cost a single stat.
+
+    Args:
+        paths: Files to compare.
+
+    Returns:
+        Mapping of the position of each duplicate to the position of the
+        first identical file.
+    """
+    by_size: Dict[Tuple[str, int], List[int]] = defaultdict(list)
+    for i, path in enumerate(paths):
+        try:
+            by_size[(path.suffix.lower(), os.stat(path).st_size)].append(i)
+        except OSError:
+            continue
+
+    duplicates = {}
+    for positions in by_size.values():
+        if len(positions) < 2:
+            continue
+        first_by_digest: Dict[bytes, int] = {}
+        for i in positions:
+            try:
+                digest = file_digest(paths[i])
+            except OSError:
+                continue
+            first = first_by_digest.setdefault(digest, i)
+            if first != i:
+                duplicates[i] = first
+    return duplicates
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """
+    SplitMix64 finalizer, one independent hash function per seed.
+    """
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def minhash_signatures(texts: List[str], permutations: int = MINHASH_PERMUTATIONS) -> np.ndarray:
+    """
+    Compute the MinHash signature of the word shingles of every text.
+
+    Returns:
+        Array of shape (len(texts), permutations).
+    """
+    seeds = np.random.default_rng(0).integers(0, 1 << 63, size=(permutations, 1), dtype=np.uint64)
+
+    signatures = np.empty((len(texts), permutations), dtype=np.uint64)
+    for row, text in enumerate(texts):
+        words = text.split()
+        shingles = {
+            " ".join(words[i:i + SHINGLE_WORDS])
+            for i in range(max(1, len(words) - SHINGLE_WORDS + 1))
+        }
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+        signatures[row] = _mix(hashes ^ seeds).min(axis=1)
+    return signatures
+
+
+def group_duplicates(texts: List[str], options: DedupOptions = DedupOptions()) -> DuplicateGroups:
+    """
+    Group identical and near-identical texts so each group is encoded once.
+
+    Identical texts are found by hashing. Near-identical ones are found by
+    locality-sensitive hashing of MinHash signatures: texts sharing a band
+    of their signature are candidates, and candidates whose signatures
+    agree on at least near_threshold of their values join the same group.
+
+    Args:
+        texts: Preprocessed texts.
+        options: Duplicate detection settings.
+
+    Returns:
+        Indices of the texts to encode and the group of every text.
+    """
+    representative = np.arange(len(texts))
+    if options.exact:
+        first_by_text: Dict[str, int] = {}
+        for i, text in enumerate(texts):
+            representative[i] = first_by_text.setdefault(text, i)
+    distinct = np.flatnonzero(representative == np.arange(len(texts)))
+    exact = len(texts) - len(distinct)
+
+    near = 0
+    if options.near and len(distinct) > 1:
+        signatures = minhash_signatures([texts[i] for i in distinct])
+        rows_per_band = signatures.shape[1] // MINHASH_BANDS
+        parent = np.arange(len(distinct))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for band in range(MINHASH_BANDS):
+            columns = slice(band * rows_per_band, (band + 1) * rows_per_band)
+            first_in_bucket: Dict[bytes, int] = {}
+            for i, key in enumerate(map(bytes, signatures[:, columns])):
+                j = first_in_bucket.setdefault(key, i)
+                if j == i:
+                    continue
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j and np.mean(signatures[i] == signatures[j]) >= options.near_threshold:
+                    parent[max(root_i, root_j)] = min(root_i, root_j)
+
+        roots = np.array([find(i) for i in range(len(distinct))])
+        near = int((roots != np.arange(len(distinct))).sum())
+        representative[distinct] = distinct[roots]
+        representative = representative[representative]
+
+    unique, inverse = np.unique(representative, return_inverse=True)
+    return DuplicateGroups(unique, inverse, exact, near)
+
+
+class DuplicateIndex:
+    """
+    Finds identical and near-identical texts one at a time, for pipelines
+    that encode texts before every file has been read.
+
+    Each text is only compared with the distinct texts added before it, so
+    a near-duplicate joins the first earlier text it matches rather than a
+    whole connected group as in group_duplicates.
+    """
+
+    def __init__(self, options: DedupOptions = DedupOptions()):
+        """
+        Args:
+            options: Duplicate detection settings.
+        """
+        self.options = options
+        self.exact = 0
+        self.near = 0
+        self._group_by_text: Dict[str, int] = {}
+        self._buckets: List[Dict[bytes, int]] = [{} for _ in range(MINHASH_BANDS)]
+        self._signatures: List[np.ndarray] = []
+        self._groups = 0
+
+    @property
+    def saved(self) -> int:
+        return self.exact + self.near
+
+    def add(self, text: str) -> Tuple[int, bool]:
+        """
+        Add a text and find the group it belongs to.
+
+        Returns:
+            Tuple containing:
+                Group of the text, groups are numbered in order of creation
+                True if the text opened a new group and has to be encoded
+        """
+        if self.options.exact:
+            group = self._group_by_text.get(text)
+            if group is not None:
+                self.exact += 1
+                return group, False
+
+        match: Optional[int] = None
+        if self.options.near:
+            signature = minhash_signatures([text])[0]
+            rows_per_band = signature.shape[0] // MINHASH_BANDS
+            keys = [
+                signature[band * rows_per_band:(band + 1) * rows_per_band].tobytes()
+                for band in range(MINHASH_BANDS)
+            ]
+            for bucket, key in zip(self._buckets, keys):
+                candidate = bucket.get(key)
+                if candidate is not None and np.mean(signature == self._signatures[candidate]) >= self.options.near_threshold:
+                    match = candidate
+                    break
+
+        if match is not None:
+            self.near += 1
+            group = match
+        else:
+            group = self._groups
+            self._groups += 1
+            if self.options.near:
+                self._signatures.append(signature)
+                for bucket, key in zip(self._buckets, keys):
+                    bucket.setdefault(key, group)
+
+        if self.options.exact:
+            self._group_by_text[text] = group
+        return group, match is None
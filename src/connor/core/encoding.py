@@ -0,0 +1,341 @@
+import atexit
+import math
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from connor.core.cache import EmbeddingCache
+from connor.core.profiling import Stage
+from connor.core.setup.defaults import (
+    ENCODE_BATCH_SIZE, ENCODE_PROCESSES, ENCODE_THREADS_PER_PROCESS, ENCODE_MIN_POOL_TEXTS, TOKENS_PER_WORD
+)
+
+# Shards per encode process, so processes that finish early pick up more work
+SHARDS_PER_PROCESS = 4
+
+
+class EncodingOptions(NamedTuple):
+    """
+    Settings of the embedding step.
+
+    length_buckets sorts texts by token length so each batch holds texts
+    of similar length and little compute is spent on padding.
+    max_seq_length caps the tokens per text, 0 keeps the model's limit.
+    processes encode in parallel, each loading its own copy of the model
+    and running threads_per_process threads (0 splits the CPUs evenly); 0 uses
+    every CPU and 1 encodes in this process. Calls with fewer than
+    min_pool_texts texts always encode in this process.
+    """
+    batch_size: int = ENCODE_BATCH_SIZE
+    length_buckets: bool = True
+    max_seq_length: int = 0
+    processes: int = ENCODE_PROCESSES
+    threads_per_process: int = ENCODE_THREADS_PER_PROCESS
+    min_pool_texts: int = ENCODE_MIN_POOL_TEXTS
+
+
+def seq_length_for_budget(word_limit: int, tokens_per_word: float = TOKENS_PER_WORD) -> int:
+    """
+    Return the token limit that fits a reading budget given in words.
+
+    Args:
+        word_limit: Max words read from each file.
+        tokens_per_word: Average number of tokens per word.
+
+    Returns:
+        Token limit, including the two special tokens.
+    """
+    return int(math.ceil(word_limit * tokens_per_word)) + 2
+
+
+def token_lengths(model: Any, texts: List[str]) -> np.ndarray:
+    """
+    Return the token count of every text, or its word count if the model
+    exposes no tokenizer.
+    """
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is None:
+        return np.array([len(text.split()) for text in texts])
+
+    encoded = tokenizer(
+        texts,
+        truncation=True,
+        max_length=getattr(model, "max_seq_length", None),
+        return_attention_mask=False,
+        return_token_type_ids=False,
+    )
+    return np.array([len(ids) for ids in encoded["input_ids"]])
+
+
+# Held while a call changes the token limit of a model, so concurrent calls
+# with other options never see it
+_seq_length_lock = threading.RLock()
+
+
+def _encode(
+    model: Any,
+    texts: List[str],
+    options: EncodingOptions,
+    progress: Optional[Stage] = None,
+) -> np.ndarray:
+    """
+    Run the model over texts with the token limit of options, which is
+    put back on the model afterwards.
+    """
+    if not hasattr(model, "max_seq_length"):
+        return _encode_batches(model, texts, options, progress)
+
+    with _seq_length_lock:
+        saved = model.max_seq_length
+        if options.max_seq_length > 0:
+            model_limit = getattr(getattr(model, "tokenizer", None), "model_max_length", options.max_seq_length)
+            model.max_seq_length = min(options.max_seq_length, model_limit)
+        try:
+            return _encode_batches(model, texts, options, progress)
+        finally:
+            model.max_seq_length = saved
+
+
+def _encode_batches(
+    model: Any,
+    texts: List[str],
+    options: EncodingOptions,
+    progress: Optional[Stage] = None,
+) -> np.ndarray:
+    """
+    Run the model over texts, in length-sorted batches if enabled.
+    """
+    embeddings = _encode_parallel(model, texts, options, progress)
+    if embeddings is not None:
+        return embeddings
+
+    if not options.length_buckets or len(texts) <= options.batch_size:
+        embeddings = np.asarray(model.encode(
+            texts,
+            batch_size=options.batch_size,
+            normalize_embeddings=True,
+        ), dtype=np.float32)
+        if progress is not None:
+            progress.advance(len(texts))
+        return embeddings
+
+    order = np.argsort(token_lengths(model, texts), kind="stable")
+    embeddings = None
+    for start in range(0, len(texts), options.batch_size):
+        bucket = order[start:start + options.batch_size]
+        vectors = np.asarray(model.encode(
+            [texts[i] for i in bucket],
+            batch_size=options.batch_size,
+            normalize_embeddings=True,
+        ), dtype=np.float32)
+        if embeddings is None:
+            embeddings = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+        embeddings[bucket] = vectors
+        if progress is not None:
+            progress.advance(len(bucket))
+
+    return embeddings
+
+
+# Encode process pools by id of the model and their processes and threads,
+# kept with the model so the id stays valid. None marks a model that cannot
+# be shared.
+_pools: Dict[Tuple[int, int, int], Tuple[Any, Optional[ProcessPoolExecutor]]] = {}
+_pools_lock = threading.Lock()
+_model_loaders: "weakref.WeakKeyDictionary[Any, Callable[[], Any]]" = weakref.WeakKeyDictionary()
+_worker_model: Any = None
+
+
+def set_model_loader(model: Any, loader: Callable[[], Any]) -> None:
+    """
+    Record how encode processes load their own copy of a model.
+
+    Args:
+        model: Model that encode_texts will be called with.
+        loader: Picklable callable returning an equivalent model, such as
+            a functools.partial of load_embedding_model.
+    """
+    _model_loaders[getattr(model, "__wrapped__", model)] = loader
+
+
+def _init_worker(loader: Callable[[], Any], threads: int) -> None:
+    global _worker_model
+    _worker_model = loader()
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _encode_shard(texts: List[str], options: EncodingOptions) -> np.ndarray:
+    return _encode(_worker_model, texts, options)
+
+
+def _encode_pool(model: Any, processes: int, threads: int) -> Optional[ProcessPoolExecutor]:
+    """
+    Return the encode pool of a model with the given processes and
+    threads, starting it on first use.
+
+    Each worker loads the model itself with the loader recorded by
+    set_model_loader, so workers loading a snapshot share its mapped
+    weights. Workers are spawned rather than forked, as forking a process
+    that already ran torch can deadlock its thread pools. Returns None if
+    no loader was recorded for the model.
+    """
+    model = getattr(model, "__wrapped__", model)
+    key = (id(model), processes, threads)
+    with _pools_lock:
+        if key not in _pools:
+            loader = _model_loaders.get(model)
+            if loader is None:
+                print("Encoding in one process, the model was not loaded by initialize_models")
+                _pools[key] = (model, None)
+            else:
+                _pools[key] = (model, ProcessPoolExecutor(
+                    processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(loader, threads),
+                ))
+        return _pools[key][1]
+
+
+def close_encode_pool(model: Any) -> None:
+    """
+    Shut down the encode processes of a model, if it has any.
+    """
+    model = getattr(model, "__wrapped__", model)
+    with _pools_lock:
+        keys = [key for key in _pools if key[0] == id(model)]
+        pools = [_pools.pop(key)[1] for key in keys]
+    for pool in pools:
+        if pool is not None:
+            pool.shutdown()
+
+
+@atexit.register
+def _close_encode_pools() -> None:
+    with _pools_lock:
+        pools = [pool for _, pool in _pools.values() if pool is not None]
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+def _encode_parallel(
+    model: Any,
+    texts: List[str],
+    options: EncodingOptions,
+    progress: Optional[Stage] = None,
+) -> Optional[np.ndarray]:
+    """
+    Encode texts over the model's process pool, in length-sorted shards.
+
+    Returns:
+        Embeddings in the input order, or None if the texts should be
+        encoded in this process instead.
+    """
+    cpus = os.cpu_count() or 1
+    processes = options.processes if options.processes > 0 else cpus
+    if processes <= 1 or len(texts) < max(2, options.min_pool_texts):
+        return None
+    threads = options.threads_per_process if options.threads_per_process > 0 else max(1, cpus // processes)
+
+    pool = _encode_pool(model, processes, threads)
+    if pool is None:
+        return None
+
+    # Sorting first gives every shard texts of similar length
+    if options.length_buckets:
+        order = np.argsort(token_lengths(model, texts), kind="stable")
+    else:
+        order = np.arange(len(texts))
+    shards = np.array_split(order, min(processes * SHARDS_PER_PROCESS, math.ceil(len(texts) / options.batch_size)))
+    shard_options = options._replace(length_buckets=False, processes=1)
+
+    try:
+        futures = {
+            pool.submit(_encode_shard, [texts[i] for i in shard], shard_options): shard
+            for shard in shards
+        }
+        embeddings = None
+        for future in as_completed(futures):
+            shard = futures[future]
+            vectors = future.result()
+            if embeddings is None:
+                embeddings = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            embeddings[shard] = vectors
+            if progress is not None:
+                progress.advance(len(shard))
+    except BrokenProcessPool as e:
+        print(f"Encoding in one process, the encode processes failed: {e}")
+        model = getattr(model, "__wrapped__", model)
+        with _pools_lock:
+            _pools[(id(model), processes, threads)] = (model, None)
+        pool.shutdown(wait=False)
+        return None
+    return embeddings
+
+
+def encode_texts(
+    model: Any,
+    texts: List[str],
+    cache: Optional[EmbeddingCache] = None,
+    options: EncodingOptions = EncodingOptions(),
+    progress: Optional[Stage] = None,
+) -> np.ndarray:
+    """
+    Encode texts into normalized embeddings, reusing cached vectors.
+
+    Only texts missing from the cache are sent to the model. With
+    options.processes other than 1, large inputs are sharded over a pool
+    of encode processes that lives as long as the model, one pool for
+    each setting of processes and threads_per_process.
+
+    Args:
+        model: SentenceTransformer model.
+        texts: Texts to encode.
+        cache: Optional persistent embedding cache.
+        options: Batching and truncation settings.
+        progress: Optional stage to report encoded texts and cache hits on.
+
+    Returns:
+        Array of embeddings, one row per text in the input order.
+    """
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+
+    if progress is not None:
+        progress.set_total(len(texts))
+
+    if cache is None:
+        return _encode(model, texts, options, progress)
+
+    keys = [cache.key(text) for text in texts]
+    found = cache.get_many(keys)
+
+    # Encode each distinct missing text once
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in found and key not in missing:
+            missing[key] = text
+
+    if progress is not None:
+        progress.advance(len(texts) - len(missing))
+        progress.count("cache_hits", len(texts) - len(missing))
+        progress.count("encoded", len(missing))
+
+    if missing:
+        vectors = _encode(model, list(missing.values()), options, progress)
+        new_items = dict(zip(missing.keys(), vectors))
+        cache.put_many(new_items)
+        found.update(new_items)
+
+    return np.vstack([found[key] for key in keys])
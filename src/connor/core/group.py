@@ -1,38 +1,292 @@
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Mapping, Optional, NamedTuple, Union
 from collections import defaultdict
 
 import numpy as np
-from sklearn.cluster import KMeans
 
+from connor.core.cache import EmbeddingCache
+from connor.core.encoding import encode_texts, EncodingOptions
+from connor.core.naming import name_clusters, unique_names
+from connor.core.profiling import Stage
+from connor.core.setup.defaults import (
+    CLUSTERING_ENGINE, CLUSTERING_LARGE_THRESHOLD,
+    CLUSTERING_BATCH_SIZE, CLUSTERING_SAMPLE_SIZE,
+    K_SELECTION, K_MIN, K_MAX, K_SELECTION_SAMPLE_SIZE, K_SELECTION_CANDIDATES,
+    CLUSTERING_MAX_DEPTH, CLUSTERING_MAX_FOLDER_SIZE, MISCELLANEOUS_FOLDER_NAME
+)
 
-def group_files_into_dict(
-    model: Any,
-    files_list: List[Tuple[str, str]],
-) -> Dict[str, List[str]]:
+CLUSTERING_ENGINES = ("auto", "kmeans", "minibatch", "sample", "streaming")
+K_SELECTION_MODES = ("sqrt", "silhouette", "elbow")
+RANDOM_STATE = 42
+
+
+class ClusteringOptions(NamedTuple):
     """
-    Organize files into clusters using KMeans.
+    Settings of the clustering step.
+
+    engine is one of:
+        kmeans: full-batch KMeans.
+        minibatch: MiniBatchKMeans.
+        sample: KMeans on a random sample, then nearest-centroid assignment.
+        streaming: MiniBatchKMeans fed chunk by chunk, for matrices that
+            are memory-mapped rather than loaded.
+        auto: kmeans below large_threshold files, minibatch above.
+
+    k_selection is one of:
+        sqrt: square root of the number of files.
+        silhouette: best subsampled silhouette score over candidate k.
+        elbow: knee of the subsampled inertia curve over candidate k.
+
+    Folders of more than max_folder_size files are split into subfolders,
+    down to max_depth levels. A max_folder_size of 0 keeps one flat level.
+    """
+    engine: str = CLUSTERING_ENGINE
+    large_threshold: int = CLUSTERING_LARGE_THRESHOLD
+    batch_size: int = CLUSTERING_BATCH_SIZE
+    sample_size: int = CLUSTERING_SAMPLE_SIZE
+    k_selection: str = K_SELECTION
+    k_min: int = K_MIN
+    k_max: int = K_MAX
+    selection_sample_size: int = K_SELECTION_SAMPLE_SIZE
+    selection_candidates: int = K_SELECTION_CANDIDATES
+    max_depth: int = CLUSTERING_MAX_DEPTH
+    max_folder_size: int = CLUSTERING_MAX_FOLDER_SIZE
+
+
+def assign_to_centroids(
+    X: np.ndarray,
+    centroids: np.ndarray,
+    chunk_size: int = 8192,
+) -> np.ndarray:
+    """
+    Assign each row of X to its nearest centroid (euclidean), in chunks.
 
     Args:
-        model: SentenceTransformer model.
-        files_list: List of tuples (file_name, content).
+        X: Embedding matrix.
+        centroids: Centroid matrix.
+        chunk_size: Rows compared per step, bounds the distance matrix size.
 
     Returns:
-        Dictionary mapping a representative file to a list of similar files.
+        Array of centroid indices, one per row.
     """
+    # argmin |x - c|^2 == argmax (x.c - |c|^2 / 2)
+    half_norms = 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(X.shape[0], dtype=np.int64)
+    for start in range(0, X.shape[0], chunk_size):
+        scores = X[start:start + chunk_size] @ centroids.T - half_norms
+        labels[start:start + chunk_size] = scores.argmax(axis=1)
+    return labels
 
-    if not files_list:
-        return {}
 
-    file_names = [pair[0] for pair in files_list]
-    texts = [pair[1] for pair in files_list]
+def silhouette_score(D: np.ndarray, labels: np.ndarray, n_clusters: int) -> float:
+    """
+    Mean silhouette coefficient from a precomputed distance matrix.
+
+    Args:
+        D: Square pairwise distance matrix.
+        labels: Cluster label of each row.
+        n_clusters: Number of clusters.
+
+    Returns:
+        Mean silhouette over all points (0 for singleton clusters).
+    """
+    one_hot = np.zeros((labels.shape[0], n_clusters), dtype=D.dtype)
+    one_hot[np.arange(labels.shape[0]), labels] = 1
+    counts = one_hot.sum(axis=0)
+
+    # Summed distance from every point to every cluster
+    sums = D @ one_hot
+    rows = np.arange(labels.shape[0])
+    own_counts = counts[labels]
+
+    a = sums[rows, labels] / np.maximum(own_counts - 1, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = sums / counts
+    means[rows, labels] = np.inf
+    means[:, counts == 0] = np.inf
+    b = means.min(axis=1)
+
+    s = (b - a) / np.maximum(np.maximum(a, b), 1e-12)
+    s[own_counts <= 1] = 0
+    return float(s.mean())
+
+
+def knee_point(ks: np.ndarray, inertias: np.ndarray) -> int:
+    """
+    Return the index of the knee of a decreasing curve.
+
+    The knee is the point furthest from the straight line joining the
+    first and last points, after scaling both axes to [0, 1].
+    """
+    x = (ks - ks[0]) / max(ks[-1] - ks[0], 1)
+    span = inertias[0] - inertias[-1]
+    y = (inertias - inertias[-1]) / span if span > 0 else np.zeros_like(inertias)
+    # Distance below the line from (0, 1) to (1, 0)
+    return int(np.argmax(1 - x - y))
+
+
+def choose_n_clusters(
+    X: np.ndarray,
+    options: ClusteringOptions = ClusteringOptions(),
+) -> int:
+    """
+    Pick the number of clusters for an embedding matrix.
+
+    Candidate values are scored on a fixed-size random sample of X, so the
+    cost does not grow with the number of files.
+
+    Args:
+        X: Embedding matrix, one row per file.
+        options: Clustering settings.
+
+    Returns:
+        Number of clusters, between 1 and the number of rows.
+    """
+    n_files = X.shape[0]
+    sqrt_k = max(1, int(n_files ** 0.5))
+
+    mode = options.k_selection
+    if mode not in K_SELECTION_MODES:
+        raise ValueError(
+            f"Unknown cluster count selection '{mode}', expected one of {', '.join(K_SELECTION_MODES)}"
+        )
+    if mode == "sqrt" or n_files < 3:
+        return min(sqrt_k, n_files)
+
+    from sklearn.cluster import KMeans
+
+    rng = np.random.default_rng(RANDOM_STATE)
+    sample_size = min(n_files, options.selection_sample_size)
+    sample = np.asarray(X[rng.choice(n_files, size=sample_size, replace=False)], dtype=np.float32)
+
+    k_max = options.k_max if options.k_max > 0 else 4 * sqrt_k
+    k_max = min(k_max, sample_size // 2, n_files - 1)
+    k_min = max(2, min(options.k_min, k_max))
+    ks = np.unique(np.geomspace(k_min, k_max, num=options.selection_candidates).round().astype(int))
+    # Tiny folders give k_max below k_min: keep the counts a silhouette is defined for
+    ks = ks[(ks >= 2) & (ks < sample_size)]
+    if not len(ks):
+        return min(sqrt_k, n_files)
+
+    if mode == "silhouette":
+        # Unit-norm embeddings: |x - y|^2 = 2 - 2 x.y
+        gram = sample @ sample.T
+        D = np.sqrt(np.maximum(2 - 2 * gram, 0))
+
+    scores = []
+    for k in ks:
+        kmeans = KMeans(n_clusters=int(k), random_state=RANDOM_STATE, n_init=1)
+        labels = kmeans.fit_predict(sample)
+        if mode == "silhouette":
+            scores.append(silhouette_score(D, labels, int(k)))
+        else:
+            scores.append(kmeans.inertia_)
+
+    if mode == "silhouette":
+        return int(ks[int(np.argmax(scores))])
+    return int(ks[knee_point(ks.astype(float), np.array(scores, dtype=float))])
+
+
+def cluster_embeddings(
+    X: np.ndarray,
+    n_clusters: int,
+    options: ClusteringOptions = ClusteringOptions(),
+    progress: Optional[Stage] = None,
+) -> np.ndarray:
+    """
+    Cluster an embedding matrix with the configured engine.
+
+    Args:
+        X: Embedding matrix, one row per file.
+        n_clusters: Number of clusters.
+        options: Clustering settings.
+        progress: Optional stage to count the clustering iterations on.
 
-    embeddings = model.encode(texts, normalize_embeddings=True)
-    X = np.array(embeddings)
+    Returns:
+        Array of cluster labels, one per row.
+    """
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+
+    engine = options.engine
+    if engine not in CLUSTERING_ENGINES:
+        raise ValueError(
+            f"Unknown clustering engine '{engine}', expected one of {', '.join(CLUSTERING_ENGINES)}"
+        )
+    if engine == "auto":
+        engine = "kmeans" if X.shape[0] < options.large_threshold else "minibatch"
+
+    if engine == "minibatch":
+        minibatch = MiniBatchKMeans(
+            n_clusters=n_clusters,
+            batch_size=options.batch_size,
+            random_state=RANDOM_STATE,
+            n_init=3,
+        )
+        labels = minibatch.fit_predict(X)
+        if progress is not None:
+            progress.count("iterations", int(minibatch.n_iter_))
+        return labels
 
-    n_clusters = int(len(files_list) ** 0.5)
+    if engine == "streaming":
+        minibatch = MiniBatchKMeans(
+            n_clusters=n_clusters,
+            batch_size=options.batch_size,
+            random_state=RANDOM_STATE,
+            n_init=3,
+        )
+        # Initialize on a random sample, as the rows are in path order
+        step = max(options.batch_size, n_clusters)
+        rng = np.random.default_rng(RANDOM_STATE)
+        init = np.sort(rng.choice(X.shape[0], size=min(step, X.shape[0]), replace=False))
+        minibatch.partial_fit(np.asarray(X[init], dtype=np.float32))
+        for start in range(0, X.shape[0], step):
+            minibatch.partial_fit(np.asarray(X[start:start + step], dtype=np.float32))
+        if progress is not None:
+            progress.count("iterations", int(minibatch.n_steps_))
+        return assign_to_centroids(X, minibatch.cluster_centers_.astype(np.float32))
 
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+    if engine == "sample" and X.shape[0] > options.sample_size:
+        rng = np.random.default_rng(RANDOM_STATE)
+        sample = rng.choice(X.shape[0], size=max(options.sample_size, n_clusters), replace=False)
+        kmeans = KMeans(n_clusters=n_clusters, random_state=RANDOM_STATE, n_init=10)
+        kmeans.fit(X[sample])
+        if progress is not None:
+            progress.count("iterations", int(kmeans.n_iter_))
+        return assign_to_centroids(X, kmeans.cluster_centers_)
+
+    kmeans = KMeans(n_clusters=n_clusters, random_state=RANDOM_STATE, n_init=10)
     labels = kmeans.fit_predict(X)
+    if progress is not None:
+        progress.count("iterations", int(kmeans.n_iter_))
+    return labels
+
+
+def cluster_files(
+    file_names: List[str],
+    X: np.ndarray,
+    clustering: ClusteringOptions = ClusteringOptions(),
+    progress: Optional[Stage] = None,
+) -> Dict[str, List[str]]:
+    """
+    Cluster files from their embeddings.
+
+    Args:
+        file_names: File name of each row of X.
+        X: Embedding matrix.
+        clustering: Clustering settings.
+        progress: Optional stage to report clustered files on.
+
+    Returns:
+        Dictionary mapping a representative file to a list of similar files.
+    """
+    if not file_names:
+        return {}
+
+    n_clusters = choose_n_clusters(X, clustering)
+
+    if n_clusters <= 1:
+        labels = np.zeros(len(file_names), dtype=np.int64)
+    else:
+        labels = cluster_embeddings(X, n_clusters, clustering, progress)
 
     raw_clusters = defaultdict(list)
 
@@ -45,4 +299,99 @@ def group_files_into_dict(
         parent = files[0]
         grouped_files_dict[parent] = files
 
-    return grouped_files_dict
\ No newline at end of file
+    if progress is not None:
+        progress.advance(len(file_names))
+        progress.count("clusters", len(grouped_files_dict))
+    return grouped_files_dict
+
+
+def split_large_folders(
+    renamed_dict: Dict[str, Any],
+    file_names: List[str],
+    X: np.ndarray,
+    vectorizer: Any,
+    files_list: Union[List[Tuple[str, str]], Mapping[str, str]],
+    folder_word_limit: int,
+    clustering: ClusteringOptions = ClusteringOptions(),
+) -> Dict[str, Any]:
+    """
+    Split oversized folders into named subfolders, level by level.
+
+    Subfolders are clustered from the rows of the embedding matrix already
+    computed and named with the fitted vectorizer, so nothing is read or
+    encoded again. Only the texts of the folder being split are
+    transformed at a time.
+
+    Args:
+        renamed_dict: Dictionary of folder_name -> list of files.
+        file_names: File name of each row of X.
+        X: Embedding matrix.
+        vectorizer: Fitted TD-IDF.
+        files_list: List of (file_name, content), or a mapping of file_name to content.
+        folder_word_limit: Max words in folder names.
+        clustering: Clustering settings, with max_depth and max_folder_size.
+
+    Returns:
+        Dictionary where oversized folders map to dictionaries of subfolders.
+    """
+    if clustering.max_folder_size <= 0 or clustering.max_depth <= 1:
+        return renamed_dict
+
+    rows = {name: i for i, name in enumerate(file_names)}
+    contents = files_list if isinstance(files_list, Mapping) else dict(files_list)
+
+    def split(files: List[str], depth: int) -> Union[List[str], Dict[str, Any]]:
+        if depth >= clustering.max_depth or len(files) <= clustering.max_folder_size:
+            return files
+
+        members = [f for f in files if f in rows]
+        groups = cluster_files(members, X[[rows[f] for f in members]], clustering)
+        if len(groups) <= 1:
+            return files
+
+        base_names = name_clusters(
+            vectorizer,
+            [[contents[f] for f in group if f in contents] for group in groups.values()],
+            folder_word_limit,
+        )
+        return {
+            name: split(group, depth + 1)
+            for name, group in zip(unique_names(base_names), groups.values())
+        }
+
+    return {
+        folder: split(files, 1) if isinstance(files, list) and folder != MISCELLANEOUS_FOLDER_NAME else files
+        for folder, files in renamed_dict.items()
+    }
+
+
+def group_files_into_dict(
+    model: Any,
+    files_list: List[Tuple[str, str]],
+    cache: Optional[EmbeddingCache] = None,
+    clustering: ClusteringOptions = ClusteringOptions(),
+    encoding: EncodingOptions = EncodingOptions(),
+) -> Dict[str, List[str]]:
+    """
+    Organize files into clusters using KMeans.
+
+    Args:
+        model: SentenceTransformer model.
+        files_list: List of tuples (file_name, content).
+        cache: Optional persistent embedding cache.
+        clustering: Clustering settings.
+        encoding: Batching and truncation settings of the model.
+
+    Returns:
+        Dictionary mapping a representative file to a list of similar files.
+    """
+
+    if not files_list:
+        return {}
+
+    file_names = [pair[0] for pair in files_list]
+    texts = [pair[1] for pair in files_list]
+
+    X = encode_texts(model, texts, cache, encoding)
+
+    return cluster_files(file_names, X, clustering)
@@ -0,0 +1,178 @@
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from connor.core.setup.defaults import (
+    MISCELLANEOUS_FOLDER_NAME, STATE_DIR_NAME, INDEX_FILE
+)
+
+# Rows of the embedding matrix summed at once, bounds the copy of a memory-mapped matrix
+SUM_CHUNK_ROWS = 65536
+
+
+def leaf_folders(
+    folder_dict: Dict[str, Union[List[str], Dict]],
+    prefix: str = "",
+) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Yield the (path, files) of every folder of files, nested ones included,
+    except those of the miscellaneous folder.
+    """
+    for folder, files in folder_dict.items():
+        if folder == MISCELLANEOUS_FOLDER_NAME and not prefix:
+            continue
+        if isinstance(files, dict):
+            yield from leaf_folders(files, f"{prefix}{folder}/")
+        else:
+            yield f"{prefix}{folder}", files
+
+
+class FolderIndex:
+    """
+    Per-folder embedding centroids of an organized tree.
+
+    The index is saved inside the organized folder so that later
+    incremental runs can place new files into the existing folders
+    without re-clustering the files already organized.
+    """
+
+    def __init__(
+        self,
+        names: Optional[List[str]] = None,
+        centroids: Optional[np.ndarray] = None,
+        counts: Optional[np.ndarray] = None,
+    ):
+        """
+        Args:
+            names: Folder names.
+            centroids: Mean embedding of each folder, one row per name.
+            counts: Number of files each centroid was computed from.
+        """
+        self.names = list(names or [])
+        self.centroids = centroids if centroids is not None else np.empty((0, 0), dtype=np.float32)
+        self.counts = counts if counts is not None else np.empty(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_groups(
+        cls,
+        renamed_dict: Dict[str, Union[List[str], Dict]],
+        file_names: List[str],
+        X: np.ndarray,
+    ) -> "FolderIndex":
+        """
+        Build an index from a folder dictionary and the embeddings of its files.
+
+        Args:
+            renamed_dict: Dictionary of folder_name -> list of files.
+            file_names: File name of each row of X.
+            X: Embedding matrix.
+
+        Returns:
+            FolderIndex with one centroid per folder of files.
+        """
+        index = cls()
+        index.update(renamed_dict, file_names, X)
+        return index
+
+    @staticmethod
+    def path(root: Path) -> Path:
+        return Path(root) / STATE_DIR_NAME / INDEX_FILE
+
+    @classmethod
+    def load(cls, root: Path) -> Optional["FolderIndex"]:
+        """
+        Load the index saved in an organized folder, if there is one.
+        """
+        index_path = cls.path(root)
+        if not index_path.exists():
+            return None
+
+        with np.load(index_path, allow_pickle=False) as data:
+            return cls(
+                names=[str(name) for name in data["names"]],
+                centroids=data["centroids"],
+                counts=data["counts"],
+            )
+
+    def save(self, root: Path) -> None:
+        """
+        Save the index inside the organized folder.
+        """
+        index_path = self.path(root)
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        with index_path.open("wb") as file:
+            np.savez(
+                file,
+                names=np.array(self.names, dtype=str),
+                centroids=self.centroids,
+                counts=self.counts,
+            )
+
+    def match(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the most similar folder of every embedding by cosine similarity.
+
+        Args:
+            X: Normalized embedding matrix.
+
+        Returns:
+            Tuple containing:
+                Index of the best folder for each row
+                Cosine similarity to that folder
+        """
+        if not len(self) or not X.shape[0]:
+            return np.zeros(X.shape[0], dtype=np.int64), np.full(X.shape[0], -np.inf)
+
+        norms = np.linalg.norm(self.centroids, axis=1, keepdims=True)
+        unit_centroids = self.centroids / np.maximum(norms, 1e-12)
+        similarities = X @ unit_centroids.T
+        best = similarities.argmax(axis=1)
+        return best, similarities[np.arange(X.shape[0]), best]
+
+    def update(
+        self,
+        folder_dict: Dict[str, Union[List[str], Dict]],
+        file_names: List[str],
+        X: np.ndarray,
+    ) -> None:
+        """
+        Fold newly placed files into the running mean of their folders.
+
+        Folders not yet in the index are added. Nested folders are indexed
+        by their path, such as "Parent/Child". The miscellaneous folder is
+        skipped.
+
+        Args:
+            folder_dict: Dictionary of folder_name -> list of files.
+            file_names: File name of each row of X.
+            X: Embedding matrix, possibly memory-mapped.
+        """
+        rows = {name: i for i, name in enumerate(file_names)}
+        positions = {name: i for i, name in enumerate(self.names)}
+
+        for folder, files in leaf_folders(folder_dict):
+            members = [rows[f] for f in files if f in rows]
+            if not members:
+                continue
+
+            total = np.zeros(X.shape[1], dtype=np.float64)
+            for start in range(0, len(members), SUM_CHUNK_ROWS):
+                total += X[members[start:start + SUM_CHUNK_ROWS]].sum(axis=0, dtype=np.float64)
+            if folder in positions:
+                i = positions[folder]
+                count = self.counts[i]
+                self.centroids[i] = (self.centroids[i] * count + total) / (count + len(members))
+                self.counts[i] = count + len(members)
+            else:
+                centroid = (total / len(members)).astype(np.float32)
+                if self.centroids.size:
+                    self.centroids = np.vstack([self.centroids, centroid])
+                else:
+                    self.centroids = centroid[np.newaxis, :]
+                self.counts = np.append(self.counts, len(members))
+                positions[folder] = len(self.names)
+                self.names.append(folder)
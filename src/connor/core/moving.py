@@ -1,45 +1,328 @@
+import errno
 import os
 import shutil
-from typing import Dict, Union, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Union, List, NamedTuple, Optional, Tuple
 
-from connor.core.setup.defaults import MISCELLANEOUS_FOLDER_NAME
+from connor.core.profiling import Stage
+from connor.core.setup.defaults import MOVE_WORKERS
 
 
-def move_file(file_name, source_path, destination_path):
+class MoveStats(NamedTuple):
     """
-    Move a file from source to destination
+    Outcome of a move run.
+
+    copied counts the files moved across devices by copy, verify and unlink.
+    missing counts the planned files that were no longer in the folder.
+    renamed counts the files given another free name because a file took
+    their target after planning.
     """
-    source_file = os.path.join(source_path, file_name)
-    destination_file = os.path.join(destination_path, file_name)
+    moved: int
+    copied: int
+    missing: int
+    bytes_copied: int
+    seconds: float
+    renamed: int = 0
 
-    if os.path.exists(source_file):
-        shutil.move(source_file, destination_file)
+    @property
+    def files_per_second(self) -> float:
+        return self.moved / self.seconds if self.seconds > 0 else 0.0
 
 
-def organize(path: str, renamed_dict: Dict[str, Union[List[str], Dict]]) -> None:
+def plan_moves(
+    path: str,
+    renamed_dict: Dict[str, Union[List[str], Dict]],
+    destination: Optional[str] = None,
+) -> List[Tuple[str, str]]:
     """
-    Organize files into folders based on a renamed folder dictionary.
-    Handles nested folders and miscellaneous files.
+    List the (source, destination) path of every file to move.
+
+    Files are listed by their path relative to the root folder, possibly
+    inside nested folders, and go by their file name to the folder, or
+    nested folder, they are listed under.
 
     Args:
         path: Path to the root folder.
         renamed_dict: Dictionary mapping folder names to lists of files or subfolders.
+        destination: Folder the dictionary is laid out in, the root folder by default.
+
+    Returns:
+        List of (source, destination) file paths.
     """
+    destination = os.path.normpath(path) if destination is None else destination
+    moves = []
     for folder, folder_content in renamed_dict.items():
-        folder_path = os.path.join(path, folder)
-
-        if not os.path.exists(folder_path):
-            os.mkdir(folder_path)
-        
+        folder_path = os.path.join(destination, folder)
         if isinstance(folder_content, dict):
-            organize(folder_path, folder_content)
+            moves.extend(plan_moves(path, folder_content, folder_path))
+        else:
+            for file_name in folder_content:
+                source = os.path.normpath(os.path.join(path, file_name))
+                moves.append((source, os.path.join(folder_path, os.path.basename(file_name))))
+    return moves
 
-        # For misc folder
-        if isinstance(folder_content, dict) and folder == MISCELLANEOUS_FOLDER_NAME:
-            for sub_folder, file_names in folder_content.items():
-                for file_name in file_names:
-                    move_file(path, file_name, os.path.join(folder_path, sub_folder))
 
-        if isinstance(folder_content, list):
-            for file_name in folder_content:
-                move_file(file_name, path, folder_path)
+def _numbered(name: str, count: int) -> str:
+    stem, ext = os.path.splitext(name)
+    return f"{stem}_{count}{ext}"
+
+
+def free_target(target: str) -> str:
+    """
+    Return the first name of the _2, _3... series of target that is not taken on disk.
+    """
+    directory, name = os.path.split(target)
+    count = 2
+    while os.path.lexists(os.path.join(directory, _numbered(name, count))):
+        count += 1
+    return os.path.join(directory, _numbered(name, count))
+
+
+def resolve_collisions(moves: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """
+    Give every destination a free name and drop the files already in place.
+
+    Two files with the same name coming from different nested folders, or
+    a file landing next to an existing one, would overwrite each other.
+    Such files get a _2, _3... suffix instead. Each destination folder is
+    listed once, so no file is checked on disk one by one.
+
+    Args:
+        moves: List of (source, destination) file paths.
+
+    Returns:
+        List of (source, destination) file paths with unique destinations.
+    """
+    taken: Dict[str, set] = {}
+
+    def names_in(directory: str) -> set:
+        if directory not in taken:
+            try:
+                taken[directory] = set(os.listdir(directory))
+            except OSError:
+                taken[directory] = set()
+        return taken[directory]
+
+    resolved = []
+    for source, target in moves:
+        if source == target:
+            continue
+        directory, name = os.path.split(target)
+        names = names_in(directory)
+        original, count = name, 1
+        while name in names:
+            count += 1
+            name = _numbered(original, count)
+        names.add(name)
+        resolved.append((source, os.path.join(directory, name)))
+    return resolved
+
+
+def remove_empty_folders(path: str, moves: List[Tuple[str, str]]) -> None:
+    """
+    Remove the nested folders left empty by a move plan, deepest first.
+    """
+    root = os.path.normpath(path)
+    folders = set()
+    for source, _ in moves:
+        folder = os.path.dirname(source)
+        while folder != root and folder.startswith(root + os.sep):
+            folders.add(folder)
+            folder = os.path.dirname(folder)
+
+    for folder in sorted(folders, key=lambda f: f.count(os.sep), reverse=True):
+        try:
+            os.rmdir(folder)
+        except OSError:
+            pass
+
+
+def make_directories(moves: List[Tuple[str, str]]) -> None:
+    """
+    Create every destination folder of a move plan, parents first.
+    """
+    for directory in sorted({os.path.dirname(target) for _, target in moves}):
+        os.makedirs(directory, exist_ok=True)
+
+
+def rename_no_replace(source: str, target: str) -> None:
+    """
+    Rename a file, failing with FileExistsError instead of replacing an existing target.
+
+    The file is hard-linked to its target, which fails if the target
+    exists, then unlinked from its source. On file systems without hard
+    links the target is checked just before a plain rename.
+
+    Raises:
+        FileExistsError: If the target exists.
+        FileNotFoundError: If the source does not exist.
+        OSError: With errno EXDEV if source and target are on different devices.
+    """
+    try:
+        os.link(source, target, follow_symlinks=False)
+    except (FileExistsError, FileNotFoundError):
+        raise
+    except OSError as e:
+        if e.errno == errno.EXDEV:
+            raise
+        if os.path.lexists(target):
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), target)
+        os.rename(source, target)
+        return
+    os.unlink(source)
+
+
+def copy_verify_unlink(source: str, target: str) -> Optional[int]:
+    """
+    Move a file across devices: copy it, check the copy, then remove the source.
+
+    The target is created exclusively, so an existing file is never replaced.
+
+    Returns:
+        Number of bytes copied, or None if the source no longer exists.
+
+    Raises:
+        FileExistsError: If the target exists.
+    """
+    try:
+        size = os.stat(source).st_size
+    except FileNotFoundError:
+        return None
+    try:
+        with open(source, "rb") as src, open(target, "xb") as dst:
+            shutil.copyfileobj(src, dst)
+    except FileNotFoundError:
+        return None
+    shutil.copystat(source, target)
+    copied = os.stat(target).st_size
+    if copied != size:
+        os.unlink(target)
+        raise OSError(f"Copy of '{source}' is {copied} bytes, expected {size}")
+    os.unlink(source)
+    return size
+
+
+def _without_replacing(
+    move: Callable[[str, str], Any],
+    source: str,
+    target: str,
+) -> Tuple[Any, str, bool]:
+    """
+    Run move(source, target), going to the next free name while the target is taken.
+
+    Returns:
+        Tuple containing:
+            Result of move
+            Target the file went to
+            True if that is not the planned target
+    """
+    planned = target
+    while True:
+        try:
+            return move(source, target), target, target != planned
+        except FileExistsError:
+            target = free_target(planned)
+
+
+def move_files(
+    moves: List[Tuple[str, str]],
+    workers: int = MOVE_WORKERS,
+    progress: Optional[Stage] = None,
+    on_moved: Optional[Callable[[str, str], None]] = None,
+) -> MoveStats:
+    """
+    Execute a move plan.
+
+    Files are renamed in place, which only updates directory entries. Files
+    whose destination is on another device are copied in a thread pool,
+    checked and unlinked. An existing file is never replaced: a file whose
+    target was taken after planning goes to the next free _2, _3... name.
+
+    Args:
+        moves: List of (source, destination) file paths.
+        workers: Number of copy threads for moves across devices.
+        progress: Optional stage to report moved files on.
+        on_moved: Called with (source, destination) after each completed move.
+
+    Returns:
+        Counts and duration of the moves.
+    """
+    start = time.perf_counter()
+    if progress is not None:
+        progress.set_total(len(moves))
+    make_directories(moves)
+
+    moved = missing = renamed = 0
+    cross_device = []
+    for source, target in moves:
+        try:
+            _, target, was_renamed = _without_replacing(rename_no_replace, source, target)
+        except FileNotFoundError:
+            missing += 1
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            cross_device.append((source, target))
+            continue
+        else:
+            moved += 1
+            renamed += was_renamed
+            if on_moved is not None:
+                on_moved(source, target)
+        if progress is not None:
+            progress.advance()
+
+    copied = bytes_copied = 0
+    if cross_device:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            results = executor.map(lambda move: _without_replacing(copy_verify_unlink, *move), cross_device)
+            for (source, _), (size, target, was_renamed) in zip(cross_device, results):
+                if size is None:
+                    missing += 1
+                else:
+                    copied += 1
+                    renamed += was_renamed
+                    bytes_copied += size
+                    if on_moved is not None:
+                        on_moved(source, target)
+                if progress is not None:
+                    progress.advance()
+        moved += copied
+
+    stats = MoveStats(moved, copied, missing, bytes_copied, time.perf_counter() - start, renamed)
+    if progress is not None:
+        progress.count("files_moved", stats.moved)
+        progress.count("files_copied", stats.copied)
+        progress.count("bytes_copied", stats.bytes_copied)
+        progress.count("files_missing", stats.missing)
+        progress.count("files_renamed", stats.renamed)
+    return stats
+
+
+def organize(
+    path: str,
+    renamed_dict: Dict[str, Union[List[str], Dict]],
+    progress: Optional[Stage] = None,
+    workers: int = MOVE_WORKERS,
+) -> MoveStats:
+    """
+    Organize files into folders based on a renamed folder dictionary.
+    Handles nested folders and miscellaneous files.
+
+    Each file is moved once, straight from where it is in the nested tree
+    to its folder. Folders emptied by the moves are removed.
+
+    Args:
+        path: Path to the root folder.
+        renamed_dict: Dictionary mapping folder names to lists of files or subfolders.
+        progress: Optional stage to report moved files on.
+        workers: Number of copy threads for moves across devices.
+
+    Returns:
+        Counts and duration of the moves.
+    """
+    moves = resolve_collisions(plan_moves(path, renamed_dict))
+    stats = move_files(moves, workers, progress)
+    remove_empty_folders(path, moves)
+    return stats
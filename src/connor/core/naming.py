@@ -1,9 +1,40 @@
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Mapping, Tuple, Union
 from collections import defaultdict
 
+import numpy as np
+
 from connor.core.setup.defaults import MISCELLANEOUS_FOLDER_NAME
 
+# Max cells of the dense score block ranked at once by name_clusters
+NAMING_BLOCK_CELLS = 1 << 24
+# Max texts transformed at once by rename_groups
+NAMING_BATCH_TEXTS = 50000
+
+
+def fit_vectorizer(vectorizer: Any, texts: List[str]) -> Any:
+    """
+    Fit the TF-IDF vectorizer, relaxing its document frequency bounds
+    when the corpus is too small for them.
+
+    Args:
+        vectorizer: TD-IDF.
+        texts: Corpus to fit on.
+
+    Returns:
+        The fitted vectorizer (a relaxed copy if the bounds had to change).
+    """
+    if not texts:
+        return vectorizer
+
+    try:
+        return vectorizer.fit(texts)
+    except ValueError:
+        from sklearn.base import clone
+
+        relaxed = clone(vectorizer).set_params(min_df=1, max_df=1.0)
+        return relaxed.fit(texts)
+
 
 def name_category(
     vectorizer: Any,
@@ -23,19 +54,135 @@ def name_category(
     Returns:
         Generated folder name.
     """
-    if not content_list:
-        return "Untitled"
+    return name_clusters(vectorizer, [content_list], folder_word_limit, delimiter)[0]
+
+
+def name_clusters(
+    vectorizer: Any,
+    clusters: List[List[str]],
+    folder_word_limit: int = 5,
+    delimiter: str = "_",
+) -> List[str]:
+    """
+    Generate a folder name for every cluster in one pass.
+
+    All texts are transformed at once and named by top_terms.
+
+    Args:
+        vectorizer: Fitted TD-IDF.
+        clusters: Contents of the files of each cluster.
+        folder_word_limit: Maximum number of words in folder names.
+        delimiter: Delimiter between words.
+
+    Returns:
+        Generated folder name of each cluster, "Untitled" if it has no terms.
+    """
+    texts = [text for contents in clusters for text in contents]
+    if not texts or folder_word_limit <= 0:
+        return ["Untitled"] * len(clusters)
+
+    bounds = np.cumsum([0] + [len(contents) for contents in clusters])
+    return top_terms(
+        vectorizer.transform(texts),
+        vectorizer.get_feature_names_out(),
+        [range(start, end) for start, end in zip(bounds[:-1], bounds[1:])],
+        folder_word_limit,
+        delimiter,
+    )
+
+
+def top_terms(
+    tfidf: Any,
+    feature_names: np.ndarray,
+    groups: List[Iterable[int]],
+    folder_word_limit: int = 5,
+    delimiter: str = "_",
+) -> List[str]:
+    """
+    Name groups of rows of a TF-IDF matrix by their top mean-scoring terms.
+
+    The mean scores of all groups come from a single product with a sparse
+    group indicator matrix, and the top terms are picked with one partial
+    sort per block of groups. Terms that do not occur in a group are never
+    used in its name.
+
+    Args:
+        tfidf: Sparse TF-IDF matrix, one row per file.
+        feature_names: Term of each column of the matrix.
+        groups: Row indices of each group.
+        folder_word_limit: Maximum number of words in folder names.
+        delimiter: Delimiter between words.
+
+    Returns:
+        Generated folder name of each group, "Untitled" if it has no terms.
+    """
+    names = ["Untitled"] * len(groups)
+    groups = [np.fromiter(rows, dtype=np.int64) for rows in groups]
+    n_features = tfidf.shape[1]
+    if not any(len(rows) for rows in groups) or folder_word_limit <= 0 or n_features == 0:
+        return names
+
+    from scipy import sparse
 
-    X = vectorizer.transform(content_list)
+    labels = np.repeat(np.arange(len(groups)), [len(rows) for rows in groups])
+    sizes = np.bincount(labels, minlength=len(groups))
+    indicator = sparse.csr_matrix(
+        (1.0 / sizes[labels], (labels, np.concatenate(groups))),
+        shape=(len(groups), tfidf.shape[0]),
+    )
+    scores = (indicator @ tfidf).tocsr()
 
-    scores = X.mean(axis=0).A1
-    feature_names = vectorizer.get_feature_names_out()
+    k = min(folder_word_limit, n_features)
+    block = max(1, NAMING_BLOCK_CELLS // n_features)
+    for start in range(0, len(groups), block):
+        dense = scores[start:start + block].toarray()
+        # argpartition breaks ties arbitrarily, so the terms tied with the
+        # k-th best score are picked from the right, as argsort()[-k:] did
+        kth = np.partition(dense, n_features - k, axis=1)[:, n_features - k, np.newaxis]
+        above = dense > kth
+        tied = dense == kth
+        needed = k - above.sum(axis=1, keepdims=True)
+        from_right = np.cumsum(tied[:, ::-1], axis=1)[:, ::-1]
+        top = np.nonzero(above | (tied & (from_right <= needed)))[1].reshape(-1, k)
+        top_scores = np.take_along_axis(dense, top, axis=1)
+        # Highest score first, ties to the later term as argsort()[::-1] did
+        order = np.lexsort((-top, -top_scores), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
 
-    top_indices = scores.argsort()[-folder_word_limit:][::-1]
-    top_words = [feature_names[i].capitalize() for i in top_indices]
+        for row, (indices, values) in enumerate(zip(top, top_scores)):
+            words = [feature_names[i].capitalize() for i, value in zip(indices, values) if value > 0]
+            if words:
+                names[start + row] = delimiter.join(words)
+    return names
 
-    folder_name = delimiter.join(top_words)
-    return folder_name if folder_name else "Untitled"
+
+def unique_names(base_names: List[str], existing_names: Iterable[str] = ()) -> List[str]:
+    """
+    Suffix repeated names with _2, _3... so that no two folders collide.
+
+    Args:
+        base_names: Generated name of each folder.
+        existing_names: Folder names already taken.
+
+    Returns:
+        Unique name of each folder.
+    """
+    name_counts: Dict[str, int] = defaultdict(int)
+    taken = set(existing_names)
+    names = []
+    for base_name in base_names:
+        name_counts[base_name] += 1
+        if name_counts[base_name] > 1:
+            folder_name = f"{base_name}_{name_counts[base_name]}"
+        else:
+            folder_name = base_name
+        while folder_name in taken:
+            name_counts[base_name] += 1
+            folder_name = f"{base_name}_{name_counts[base_name]}"
+        taken.add(folder_name)
+        names.append(folder_name)
+    return names
 
 
 def misc_handler(
@@ -67,14 +214,38 @@ def misc_handler(
     return misc_dir
 
 
+def cluster_contents(
+    clusters: List[List[str]],
+    content_lookup: Mapping[str, str],
+    max_texts: int = NAMING_BATCH_TEXTS,
+) -> Iterator[List[List[str]]]:
+    """
+    Fetch the contents of consecutive clusters, about max_texts texts at a time.
+
+    Yields:
+        Contents of the files of each cluster of a batch.
+    """
+    batch: List[List[str]] = []
+    n_texts = 0
+    for similar_files in clusters:
+        batch.append([content_lookup[f] for f in similar_files if f in content_lookup])
+        n_texts += len(batch[-1])
+        if n_texts >= max_texts:
+            yield batch
+            batch, n_texts = [], 0
+    if batch:
+        yield batch
+
+
 def rename_groups(
     vectorizer: Any,
     folder_dict: Dict[Any, List[str]],
-    files_list: List[List[str]],
+    files_list: Union[List[Tuple[str, str]], Mapping[str, str]],
     folder_word_limit: int,
     misc_files: List[str],
     exts: Dict[str, str],
     misc_folder_name: str = MISCELLANEOUS_FOLDER_NAME,
+    existing_names: Iterable[str] = (),
 ) -> Dict[str, List[str]]:
     """
     Rename clusters using TF-IDF-based keyword extraction.
@@ -86,40 +257,27 @@ def rename_groups(
     Args:
         vectorizer: TD-IDF.
         folder_dict: Mapping of clusters to file lists.
-        files_list: List of (file_path, content).
+        files_list: List of (file_path, content), or a mapping of file_path
+            to content such as a TextStore, read one batch of clusters at a time.
         folder_word_limit: Max words in folder names.
         misc_files: List of miscellaneous files.
         exts: Mapping of categories to extensions.
         misc_folder_name: Name of miscellaneous folder.
+        existing_names: Folder names already taken in the target folder.
 
     Returns:
         Dictionary of folder_name -> list of files.
     """
-    renamed_dict: Dict[str, List[str]] = {}
-    name_counts: Dict[str, int] = defaultdict(int)
-
-    content_lookup = {file_path: content for file_path, content in files_list}
-
-    for _, similar_files in folder_dict.items():
-        content = [
-            content_lookup[f]
-            for f in similar_files
-            if f in content_lookup
-        ]
-
-        base_name = name_category(
-            vectorizer,
-            content,
-            folder_word_limit,
-        )
-
-        name_counts[base_name] += 1
-        if name_counts[base_name] > 1:
-            folder_name = f"{base_name}_{name_counts[base_name]}"
-        else:
-            folder_name = base_name
+    if isinstance(files_list, Mapping):
+        content_lookup = files_list
+    else:
+        content_lookup = {file_path: content for file_path, content in files_list}
 
-        renamed_dict[folder_name] = similar_files
+    clusters = list(folder_dict.values())
+    base_names = []
+    for batch in cluster_contents(clusters, content_lookup):
+        base_names.extend(name_clusters(vectorizer, batch, folder_word_limit))
+    renamed_dict = dict(zip(unique_names(base_names, existing_names), clusters))
 
     misc_dict = misc_handler(misc_files, exts, misc_folder_name)
 
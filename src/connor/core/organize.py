@@ -1,11 +1,80 @@
-from typing import Tuple, Dict, Any, List
+import tempfile
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Tuple, Dict, Any, List, Optional
 
-from connor.core.prepare import get_files_list
-from connor.core.naming import rename_groups
+import numpy as np
+
+from connor.core.cache import EmbeddingCache
+from connor.core.dedup import DedupOptions, group_duplicates
+from connor.core.encoding import encode_texts, EncodingOptions
+from connor.core.index import FolderIndex
+
+from connor.core.prepare import get_files_list, preprocess
+from connor.core.reader import iter_files
+from connor.core.spill import (
+    EmbeddingSpill, MemoryOptions, TextStore, sample_texts, spill_embeddings
+)
+from connor.core.naming import rename_groups, fit_vectorizer
+from connor.core.pipeline import PipelineOptions, read_and_encode
 from connor.core.tree_builder import make_tree_string
-from connor.core.reader import prep_files
-from connor.core.group import group_files_into_dict
-from connor.core.moving import organize
+from connor.core.group import cluster_files, split_large_folders, ClusteringOptions
+from connor.core.moving import organize, MoveStats
+from connor.core.profiling import RunProfile, optional_stage
+from connor.core.setup.defaults import (
+    APP_NAME, SIMILARITY_THRESHOLD, MOVE_WORKERS, TREE_PREVIEW_FILES
+)
+
+
+def _tree_string(
+    folder_to_organize: str,
+    renamed_dict: Dict[str, List[str]],
+    preview_files: Optional[int],
+    build_tree: bool,
+    profile: Optional[RunProfile],
+) -> str:
+    """
+    Format the folder tree of a run, or return an empty string if build_tree is False.
+    """
+    if not build_tree:
+        return ""
+    with optional_stage(profile, "make_tree_string"):
+        return make_tree_string(
+            path_name=folder_to_organize,
+            file_dict=renamed_dict,
+            max_files=preview_files,
+        )
+
+
+def encode_deduplicated(
+    model: Any,
+    texts: List[str],
+    cache: Optional[EmbeddingCache] = None,
+    encoding: EncodingOptions = EncodingOptions(),
+    dedup: DedupOptions = DedupOptions(),
+    profile: Optional[RunProfile] = None,
+) -> np.ndarray:
+    """
+    Encode texts, encoding identical and near-identical texts only once.
+
+    Every text of a duplicate group gets the embedding of the group's
+    first text, so duplicates end up in the same folder.
+    """
+    with optional_stage(profile, "dedup", total=len(texts)) as stage:
+        groups = group_duplicates(texts, dedup)
+        stage.advance(len(texts))
+        stage.count("exact_duplicates", groups.exact)
+        stage.count("near_duplicates", groups.near)
+    if groups.saved:
+        print(
+            f"{groups.exact} identical and {groups.near} near-identical files "
+            f"reuse another file's embedding: {groups.saved} encodes saved"
+        )
+
+    with optional_stage(profile, "encode") as stage:
+        X = encode_texts(model, [texts[i] for i in groups.unique], cache, encoding, stage)
+        stage.count("encodes_saved", groups.saved)
+    return X[groups.inverse]
 
 
 def start_run(
@@ -16,14 +85,28 @@ def start_run(
     model: Any,
     stop_words: set[str],
     vectorizer: Any,
-) -> Tuple[Dict[str, List[str]], str]:
+    cache: Optional[EmbeddingCache] = None,
+    read_workers: int = 1,
+    clustering: ClusteringOptions = ClusteringOptions(),
+    encoding: EncodingOptions = EncodingOptions(),
+    profile: Optional[RunProfile] = None,
+    dedup: DedupOptions = DedupOptions(),
+    preview_files: Optional[int] = TREE_PREVIEW_FILES,
+    memory: MemoryOptions = MemoryOptions(),
+    files: Optional[Tuple[List[Tuple[str, str]], List[str]]] = None,
+    pipeline: PipelineOptions = PipelineOptions(),
+    read_executor: Optional[Executor] = None,
+    build_tree: bool = True,
+) -> Tuple[Dict[str, List[str]], str, FolderIndex]:
     """
     Start the folder organization workflow.
-        1. Flatten folder.
-        2. Read files and create groups as a dict.
-        3. Fit vectorizer.
-        4. Rename file groups.
-        5. Return renamed dict and tree string.
+        1. Read the files of the whole nested tree and create groups as a dict.
+        2. Fit vectorizer.
+        3. Rename file groups, splitting oversized ones into subfolders.
+        4. Return renamed dict, tree string and folder index.
+
+    Files are named by their path relative to the folder. They are only
+    moved, once each, by confirm_run.
 
     Args:
         folder_to_organize: Path to the folder to organize.
@@ -33,41 +116,329 @@ def start_run(
         model: Clustering/model object for grouping.
         stop_words: Set of stop words to ignore.
         vectorizer: TD-IDF.
+        cache: Optional persistent embedding cache.
+        read_workers: Number of extraction processes. 0 uses every CPU, 1 reads serially.
+        clustering: Clustering engine settings.
+        encoding: Batching and truncation settings of the model.
+        profile: Optional run profile to time each stage on.
+        preview_files: Files listed per folder in the tree string, None lists all.
+        dedup: Duplicate detection settings.
+        memory: Low-memory mode settings, see start_low_memory_run.
+        files: Files of the whole tree already read by get_files_list, such
+            as by a reader thread working ahead. Read now if None.
+        pipeline: Settings of the overlapped read, preprocess and encode stages.
+        read_executor: Process pool shared with other runs to extract files in,
+            instead of starting one for this run.
+        build_tree: Format the tree string. Callers that write the tree
+            themselves pass False and get an empty string.
 
     Returns:
         Tuple containing:
             Renamed folder dictionary
             Formatted folder tree string
+            Folder centroid index, saved by confirm_run
     """
+    if memory.low_memory and files is None:
+        return start_low_memory_run(
+            folder_to_organize, reading_word_limit, folder_word_limit, exts, model, stop_words, vectorizer,
+            cache, read_workers, clustering, encoding, profile, dedup, preview_files, memory,
+            read_executor, build_tree,
+        )
+
     folder_dict = {}
-    prep_files(folder_to_organize)
 
-    # Make file groups
-    files_list, misc_list = get_files_list(folder_to_organize, reading_word_limit, stop_words)
-    folder_dict = group_files_into_dict(model, files_list)
+    # Make file groups over the whole nested tree, nothing is moved yet
+    if files is None and pipeline.enabled:
+        files_list, misc_list, X = read_and_encode(
+            Path(folder_to_organize), reading_word_limit, stop_words, model, cache, read_workers,
+            encoding, dedup, pipeline, profile, recursive=True, read_executor=read_executor,
+        )
+    else:
+        if files is None:
+            files = get_files_list(
+                Path(folder_to_organize), reading_word_limit, stop_words, read_workers, profile,
+                recursive=True, skip_duplicates=dedup.exact, executor=read_executor,
+            )
+        files_list, misc_list = files
+        X = encode_deduplicated(model, [content for _, content in files_list], cache, encoding, dedup, profile)
+    file_names = [file_name for file_name, _ in files_list]
+    with optional_stage(profile, "cluster", total=len(file_names)) as stage:
+        folder_dict = cluster_files(file_names, X, clustering, stage)
 
     # Fit vectorizer
-    all_texts = [content for _, content in files_list if content]
-    vectorizer.fit(all_texts)
+    with optional_stage(profile, "tfidf_fit"):
+        all_texts = [content for _, content in files_list if content]
+        vectorizer = fit_vectorizer(vectorizer, all_texts)
 
     # Name each file group
-    renamed_dict = rename_groups(
-        vectorizer,
-        folder_dict, 
-        files_list, 
-        folder_word_limit, 
-        misc_list,
-        exts
-    )
-
-    return renamed_dict, make_tree_string(
-        path_name=folder_to_organize, 
-        file_dict=renamed_dict
-    )
-
-
-def confirm_run(folder_to_organize: str, renamed_dict: Dict[str, List[str]]) -> None:
+    with optional_stage(profile, "rename_groups", total=len(folder_dict)) as stage:
+        renamed_dict = rename_groups(
+            vectorizer,
+            folder_dict,
+            files_list,
+            folder_word_limit,
+            misc_list,
+            exts
+        )
+        stage.advance(len(folder_dict))
+
+    # Split oversized folders with the embeddings and vectorizer at hand
+    with optional_stage(profile, "split_folders"):
+        renamed_dict = split_large_folders(
+            renamed_dict, file_names, X, vectorizer, files_list, folder_word_limit, clustering
+        )
+
+    index = FolderIndex.from_groups(renamed_dict, file_names, X)
+
+    tree = _tree_string(folder_to_organize, renamed_dict, preview_files, build_tree, profile)
+    return renamed_dict, tree, index
+
+
+def start_low_memory_run(
+    folder_to_organize: str,
+    reading_word_limit: int,
+    folder_word_limit: int,
+    exts: List[str],
+    model: Any,
+    stop_words: set[str],
+    vectorizer: Any,
+    cache: Optional[EmbeddingCache] = None,
+    read_workers: int = 1,
+    clustering: ClusteringOptions = ClusteringOptions(),
+    encoding: EncodingOptions = EncodingOptions(),
+    profile: Optional[RunProfile] = None,
+    dedup: DedupOptions = DedupOptions(),
+    preview_files: Optional[int] = TREE_PREVIEW_FILES,
+    memory: MemoryOptions = MemoryOptions(),
+    read_executor: Optional[Executor] = None,
+    build_tree: bool = True,
+) -> Tuple[Dict[str, List[str]], str, FolderIndex]:
+    """
+    Organize a folder too large to keep in memory, with the same result
+    layout as start_run.
+        1. Stream the files through reading, preprocessing and encoding,
+           spilling texts to disk and embeddings to a float16 memory map.
+        2. Cluster out of core with the streaming engine.
+        3. Fit the vectorizer on a sample of the texts.
+        4. Name each batch of clusters from its texts, read back from disk.
+
+    Near-duplicate detection needs every text at once and is skipped,
+    identical texts still share one embedding. The spill files are removed
+    before returning.
+
+    Args:
+        folder_to_organize: Path to the folder to organize.
+        reading_word_limit: Max words to read from each file.
+        folder_word_limit: Max words to use for folder naming.
+        exts: List of allowed file extensions.
+        model: Clustering/model object for grouping.
+        stop_words: Set of stop words to ignore.
+        vectorizer: TD-IDF.
+        cache: Optional persistent embedding cache.
+        read_workers: Number of extraction processes. 0 uses every CPU, 1 reads serially.
+        clustering: Clustering settings, the engine is always streaming.
+        encoding: Batching and truncation settings of the model.
+        profile: Optional run profile to time each stage on.
+        dedup: Duplicate detection settings.
+        preview_files: Files listed per folder in the tree string, None lists all.
+        memory: Chunk size, memory ceiling and vectorizer sample size.
+        read_executor: Process pool shared with other runs to extract files in,
+            instead of starting one for this run.
+        build_tree: Format the tree string. Callers that write the tree
+            themselves pass False and get an empty string.
+
+    Returns:
+        Tuple containing:
+            Renamed folder dictionary
+            Formatted folder tree string
+            Folder centroid index, saved by confirm_run
+    """
+    clustering = clustering._replace(engine="streaming")
+    misc_list: List[str] = []
+
+    with tempfile.TemporaryDirectory(prefix=f"{APP_NAME}-") as spill_dir:
+        store = TextStore(Path(spill_dir) / "texts")
+        spill = EmbeddingSpill(Path(spill_dir) / "embeddings")
+
+        with optional_stage(profile, "read_encode") as stage:
+            def text_files():
+                for name, content in iter_files(
+                    Path(folder_to_organize), reading_word_limit, read_workers, stage,
+                    recursive=True, skip_duplicates=dedup.exact, window=memory.chunk_size,
+                    executor=read_executor,
+                ):
+                    if content is None:
+                        misc_list.append(name)
+                    elif content:
+                        yield name, preprocess(content, stop_words)
+
+            X, saved = spill_embeddings(
+                model, text_files(), store, spill, cache, encoding, memory, dedup.exact, stage
+            )
+        if saved:
+            print(f"{saved} identical files reuse another file's embedding: {saved} encodes saved")
+
+        file_names = list(store)
+        with optional_stage(profile, "cluster", total=len(file_names)) as stage:
+            folder_dict = cluster_files(file_names, X, clustering, stage)
+
+        with optional_stage(profile, "tfidf_fit"):
+            vectorizer = fit_vectorizer(vectorizer, sample_texts(store, memory.tfidf_sample))
+
+        with optional_stage(profile, "rename_groups", total=len(folder_dict)) as stage:
+            renamed_dict = rename_groups(vectorizer, folder_dict, store, folder_word_limit, misc_list, exts)
+            stage.advance(len(folder_dict))
+
+        with optional_stage(profile, "split_folders"):
+            renamed_dict = split_large_folders(
+                renamed_dict, file_names, X, vectorizer, store, folder_word_limit, clustering
+            )
+
+        index = FolderIndex.from_groups(renamed_dict, file_names, X)
+        store.close()
+        del X
+
+    tree = _tree_string(folder_to_organize, renamed_dict, preview_files, build_tree, profile)
+    return renamed_dict, tree, index
+
+
+def start_incremental_run(
+    folder_to_organize: str,
+    reading_word_limit: int,
+    folder_word_limit: int,
+    exts: List[str],
+    model: Any,
+    stop_words: set[str],
+    vectorizer: Any,
+    index: FolderIndex,
+    cache: Optional[EmbeddingCache] = None,
+    read_workers: int = 1,
+    clustering: ClusteringOptions = ClusteringOptions(),
+    similarity_threshold: float = SIMILARITY_THRESHOLD,
+    encoding: EncodingOptions = EncodingOptions(),
+    profile: Optional[RunProfile] = None,
+    dedup: DedupOptions = DedupOptions(),
+    preview_files: Optional[int] = TREE_PREVIEW_FILES,
+    files: Optional[Tuple[List[Tuple[str, str]], List[str]]] = None,
+    pipeline: PipelineOptions = PipelineOptions(),
+    read_executor: Optional[Executor] = None,
+    build_tree: bool = True,
+) -> Tuple[Dict[str, List[str]], str, FolderIndex]:
     """
-    Execute the folder organization by moving files.
+    Place the unorganized files of an already organized folder.
+        1. Read the loose files at the top of the folder (no flattening).
+        2. Match each file to the nearest existing folder by cosine similarity.
+        3. Cluster and name the files below the similarity threshold as new folders.
+        4. Return renamed dict, tree string and updated folder index.
+
+    Args:
+        folder_to_organize: Path to the organized folder.
+        reading_word_limit: Max words to read from each file.
+        folder_word_limit: Max words to use for folder naming.
+        exts: List of allowed file extensions.
+        model: Clustering/model object for grouping.
+        stop_words: Set of stop words to ignore.
+        vectorizer: TD-IDF.
+        index: Folder centroid index saved by the previous run.
+        cache: Optional persistent embedding cache.
+        read_workers: Number of extraction processes. 0 uses every CPU, 1 reads serially.
+        clustering: Clustering engine settings.
+        similarity_threshold: Min cosine similarity to join an existing folder.
+        encoding: Batching and truncation settings of the model.
+        profile: Optional run profile to time each stage on.
+        preview_files: Files listed per folder in the tree string, None lists all.
+        dedup: Duplicate detection settings.
+        files: Top-level files already read by get_files_list. Read now if None.
+        pipeline: Settings of the overlapped read, preprocess and encode stages.
+        read_executor: Process pool shared with other runs to extract files in,
+            instead of starting one for this run.
+        build_tree: Format the tree string. Callers that write the tree
+            themselves pass False and get an empty string.
+
+    Returns:
+        Tuple containing:
+            Renamed folder dictionary
+            Formatted folder tree string
+            Updated folder centroid index, saved by confirm_run
+    """
+    if files is None and pipeline.enabled:
+        files_list, misc_list, X = read_and_encode(
+            Path(folder_to_organize), reading_word_limit, stop_words, model, cache, read_workers,
+            encoding, dedup, pipeline, profile, read_executor=read_executor,
+        )
+    else:
+        if files is None:
+            files = get_files_list(
+                Path(folder_to_organize), reading_word_limit, stop_words, read_workers, profile,
+                skip_duplicates=dedup.exact, executor=read_executor,
+            )
+        files_list, misc_list = files
+        X = encode_deduplicated(model, [content for _, content in files_list], cache, encoding, dedup, profile)
+    file_names = [file_name for file_name, _ in files_list]
+
+    # Join existing folders
+    with optional_stage(profile, "match_index", total=len(file_names)) as stage:
+        best, similarity = index.match(X)
+        matched_dict: Dict[str, List[str]] = {}
+        unmatched = []
+        for i, file_name in enumerate(file_names):
+            if similarity[i] >= similarity_threshold:
+                matched_dict.setdefault(index.names[best[i]], []).append(file_name)
+            else:
+                unmatched.append(i)
+        stage.advance(len(file_names))
+        stage.count("matched", len(file_names) - len(unmatched))
+
+    # Open new folders for the rest
+    new_files_list = [files_list[i] for i in unmatched]
+    with optional_stage(profile, "cluster", total=len(unmatched)) as stage:
+        folder_dict = cluster_files([file_names[i] for i in unmatched], X[unmatched], clustering, stage)
+
+    with optional_stage(profile, "tfidf_fit"):
+        all_texts = [content for _, content in files_list if content]
+        vectorizer = fit_vectorizer(vectorizer, all_texts)
+
+    existing_names = set(index.names)
+    existing_names.update(p.name for p in Path(folder_to_organize).iterdir() if p.is_dir())
+    with optional_stage(profile, "rename_groups", total=len(folder_dict)) as stage:
+        new_dict = rename_groups(
+            vectorizer,
+            folder_dict,
+            new_files_list,
+            folder_word_limit,
+            misc_list,
+            exts,
+            existing_names=existing_names,
+        )
+        stage.advance(len(folder_dict))
+
+    with optional_stage(profile, "split_folders"):
+        new_dict = split_large_folders(
+            new_dict, file_names, X, vectorizer, files_list, folder_word_limit, clustering
+        )
+
+    renamed_dict = {**matched_dict, **new_dict}
+    index.update(renamed_dict, file_names, X)
+
+    tree = _tree_string(folder_to_organize, renamed_dict, preview_files, build_tree, profile)
+    return renamed_dict, tree, index
+
+
+def confirm_run(
+    folder_to_organize: str,
+    renamed_dict: Dict[str, List[str]],
+    index: Optional[FolderIndex] = None,
+    profile: Optional[RunProfile] = None,
+    move_workers: int = MOVE_WORKERS,
+) -> MoveStats:
+    """
+    Execute the folder organization by moving files, then save the folder index.
+
+    Returns:
+        Counts and duration of the moves.
     """
-    organize(folder_to_organize, renamed_dict)
+    with optional_stage(profile, "confirm_run") as stage:
+        stats = organize(folder_to_organize, renamed_dict, stage, move_workers)
+    if index is not None:
+        index.save(Path(folder_to_organize))
+    return stats
@@ -0,0 +1,379 @@
+import asyncio
+import configparser
+import functools
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Mapping, NamedTuple, Optional, Set, Union
+
+from connor.core.cache import open_embedding_cache
+from connor.core.dedup import DedupOptions
+from connor.core.encoding import EncodingOptions, close_encode_pool, seq_length_for_budget
+from connor.core.group import ClusteringOptions
+from connor.core.index import FolderIndex
+from connor.core.organize import start_run, start_incremental_run
+from connor.core.pipeline import PipelineOptions
+from connor.core.plan import ApplyStats, OrganizationPlan, apply_plan
+from connor.core.profiling import RunProfile, Stage
+from connor.core.spill import MemoryOptions
+from connor.core.setup.defaults import (
+    EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, EMBEDDING_QUANTIZATION, EMBEDDING_CACHE_MAX_SIZE_MB,
+    CLUSTERING_ENGINE, CLUSTERING_LARGE_THRESHOLD,
+    CLUSTERING_BATCH_SIZE, CLUSTERING_SAMPLE_SIZE,
+    K_SELECTION, K_MIN, K_MAX, K_SELECTION_SAMPLE_SIZE, K_SELECTION_CANDIDATES,
+    CLUSTERING_MAX_DEPTH, CLUSTERING_MAX_FOLDER_SIZE,
+    SIMILARITY_THRESHOLD, ENCODE_BATCH_SIZE, ENCODE_PROCESSES, ENCODE_THREADS_PER_PROCESS, ENCODE_MIN_POOL_TEXTS,
+    TOKENS_PER_WORD, MOVE_WORKERS,
+    DEDUP_EXACT, DEDUP_NEAR, NEAR_DUPLICATE_THRESHOLD,
+    LOW_MEMORY, MAX_RSS_MB, SPILL_CHUNK_SIZE, TFIDF_SAMPLE_SIZE,
+    PIPELINE_ENABLED, PIPELINE_READ_QUEUE, PIPELINE_ENCODE_QUEUE, PIPELINE_BATCH_TEXTS
+)
+
+
+class OrganizerSettings(NamedTuple):
+    """
+    Settings of an Organizer, the library counterpart of config.ini.
+
+    exts maps misc categories to space-separated extensions, as in the
+    [Extension_Map] section.
+    """
+    reading_word_limit: int = 200
+    folder_word_limit: int = 2
+    exts: Mapping[str, str] = MappingProxyType({})
+    read_workers: int = 0
+    encoding: EncodingOptions = EncodingOptions()
+    pipeline: PipelineOptions = PipelineOptions()
+    dedup: DedupOptions = DedupOptions()
+    clustering: ClusteringOptions = ClusteringOptions()
+    memory: MemoryOptions = MemoryOptions()
+    similarity_threshold: float = SIMILARITY_THRESHOLD
+    move_workers: int = MOVE_WORKERS
+    cache_max_size_mb: int = EMBEDDING_CACHE_MAX_SIZE_MB
+
+    @classmethod
+    def from_config(cls, settings: configparser.ConfigParser) -> "OrganizerSettings":
+        """
+        Read the settings from a parsed config.ini, with defaults for missing keys.
+        """
+        reading_word_limit = settings.getint("Parameters", "reading_word_limit", fallback=200)
+        max_seq_length = settings.getint("Encoding", "max_seq_length", fallback=0)
+        return cls(
+            reading_word_limit=reading_word_limit,
+            folder_word_limit=settings.getint("Parameters", "folder_word_limit", fallback=2),
+            exts=MappingProxyType(dict(settings["Extension_Map"]) if settings.has_section("Extension_Map") else {}),
+            read_workers=settings.getint("Reading", "workers", fallback=0),
+            encoding=EncodingOptions(
+                batch_size=settings.getint("Encoding", "batch_size", fallback=ENCODE_BATCH_SIZE),
+                length_buckets=settings.getboolean("Encoding", "length_buckets", fallback=True),
+                processes=settings.getint("Encoding", "processes", fallback=ENCODE_PROCESSES),
+                threads_per_process=settings.getint("Encoding", "threads_per_process", fallback=ENCODE_THREADS_PER_PROCESS),
+                min_pool_texts=settings.getint("Encoding", "min_pool_texts", fallback=ENCODE_MIN_POOL_TEXTS),
+                max_seq_length=max_seq_length or seq_length_for_budget(
+                    reading_word_limit,
+                    settings.getfloat("Encoding", "tokens_per_word", fallback=TOKENS_PER_WORD),
+                ),
+            ),
+            pipeline=PipelineOptions(
+                enabled=settings.getboolean("Pipeline", "enabled", fallback=PIPELINE_ENABLED),
+                read_queue=settings.getint("Pipeline", "read_queue", fallback=PIPELINE_READ_QUEUE),
+                encode_queue=settings.getint("Pipeline", "encode_queue", fallback=PIPELINE_ENCODE_QUEUE),
+                batch_texts=settings.getint("Pipeline", "batch_texts", fallback=PIPELINE_BATCH_TEXTS),
+            ),
+            dedup=DedupOptions(
+                exact=settings.getboolean("Dedup", "exact", fallback=DEDUP_EXACT),
+                near=settings.getboolean("Dedup", "near", fallback=DEDUP_NEAR),
+                near_threshold=settings.getfloat("Dedup", "near_threshold", fallback=NEAR_DUPLICATE_THRESHOLD),
+            ),
+            clustering=ClusteringOptions(
+                engine=settings.get("Clustering", "engine", fallback=CLUSTERING_ENGINE),
+                large_threshold=settings.getint("Clustering", "large_threshold", fallback=CLUSTERING_LARGE_THRESHOLD),
+                batch_size=settings.getint("Clustering", "batch_size", fallback=CLUSTERING_BATCH_SIZE),
+                sample_size=settings.getint("Clustering", "sample_size", fallback=CLUSTERING_SAMPLE_SIZE),
+                k_selection=settings.get("Clustering", "k_selection", fallback=K_SELECTION),
+                k_min=settings.getint("Clustering", "k_min", fallback=K_MIN),
+                k_max=settings.getint("Clustering", "k_max", fallback=K_MAX),
+                selection_sample_size=settings.getint("Clustering", "selection_sample_size", fallback=K_SELECTION_SAMPLE_SIZE),
+                selection_candidates=settings.getint("Clustering", "selection_candidates", fallback=K_SELECTION_CANDIDATES),
+                max_depth=settings.getint("Clustering", "max_depth", fallback=CLUSTERING_MAX_DEPTH),
+                max_folder_size=settings.getint("Clustering", "max_folder_size", fallback=CLUSTERING_MAX_FOLDER_SIZE),
+            ),
+            memory=MemoryOptions(
+                low_memory=settings.getboolean("Memory", "low_memory", fallback=LOW_MEMORY),
+                max_rss_mb=settings.getint("Memory", "max_rss_mb", fallback=MAX_RSS_MB),
+                chunk_size=settings.getint("Memory", "chunk_size", fallback=SPILL_CHUNK_SIZE),
+                tfidf_sample=settings.getint("Memory", "tfidf_sample", fallback=TFIDF_SAMPLE_SIZE),
+            ),
+            similarity_threshold=settings.getfloat("Incremental", "similarity_threshold", fallback=SIMILARITY_THRESHOLD),
+            move_workers=settings.getint("Moving", "workers", fallback=MOVE_WORKERS),
+            cache_max_size_mb=settings.getint("Cache", "max_size_mb", fallback=EMBEDDING_CACHE_MAX_SIZE_MB),
+        )
+
+
+class _SerializedTokenizer:
+    """
+    Tokenizer wrapper that shares the lock of its _SerializedModel.
+
+    A fast tokenizer changes its truncation settings on every call and
+    raises "Already borrowed" when called from two threads at once.
+    """
+
+    def __init__(self, tokenizer: Any, lock: threading.Lock):
+        self._tokenizer = tokenizer
+        self._lock = lock
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            return self._tokenizer(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._tokenizer, name)
+
+
+class _SerializedModel:
+    """
+    Model wrapper that lets one encode or tokenizer call run at a time.
+
+    Folders planned concurrently still read, cluster and name in parallel,
+    while their encode batches take turns on the shared model instead of
+    oversubscribing its threads.
+    """
+
+    def __init__(self, model: Any, lock: threading.Lock):
+        object.__setattr__(self, "_model", model)
+        object.__setattr__(self, "_lock", lock)
+
+    @property
+    def __wrapped__(self) -> Any:
+        return self._model
+
+    @property
+    def tokenizer(self) -> Any:
+        tokenizer = getattr(self._model, "tokenizer", None)
+        return None if tokenizer is None else _SerializedTokenizer(tokenizer, self._lock)
+
+    def encode(self, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            return self._model.encode(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._model, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._model, name, value)
+
+
+class Organizer:
+    """
+    Library entry point to plan and apply folder organizations.
+
+    An Organizer holds the settings and one set of loaded models, and
+    neither asks for confirmation nor prints the tree: plan returns an
+    OrganizationPlan, which apply carries out. The async variants run
+    the blocking work in an executor, so that an asyncio service can
+    organize several folders at once on one warm model.
+
+    Example:
+        organizer = Organizer.load(OrganizerSettings(read_workers=4))
+        plans = await asyncio.gather(*(organizer.plan_async(root) for root in roots))
+        for plan in plans:
+            await organizer.apply_async(plan)
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        stop_words: Set[str],
+        vectorizer: Any,
+        settings: OrganizerSettings = OrganizerSettings(),
+        cache_path: Optional[Path] = None,
+        model_id: str = EMBEDDING_MODEL_NAME,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        Args:
+            model: SentenceTransformer model, shared by every run.
+            stop_words: Set of stop words to ignore.
+            vectorizer: Unfitted TF-IDF vectorizer, cloned for every run.
+            settings: Organization settings.
+            cache_path: SQLite file of the embedding cache, None disables it.
+            model_id: Name of the model, part of the cache keys.
+            executor: Executor of the async variants. By default a thread
+                pool owned by the Organizer.
+        """
+        self.model = _SerializedModel(model, threading.Lock())
+        self.stop_words = stop_words
+        self.vectorizer = vectorizer
+        self.settings = settings
+        self.cache_path = cache_path
+        self.model_id = model_id
+        self._owns_executor = executor is None
+        self.executor = executor if executor is not None else ThreadPoolExecutor(thread_name_prefix="connor")
+        self._read_executor: Optional[ProcessPoolExecutor] = None
+        self._read_executor_lock = threading.Lock()
+
+    @classmethod
+    def load(
+        cls,
+        settings: OrganizerSettings = OrganizerSettings(),
+        backend: str = EMBEDDING_BACKEND,
+        quantization: str = EMBEDDING_QUANTIZATION,
+        cache_path: Optional[Path] = None,
+        snapshot_dir: Optional[Path] = None,
+    ) -> "Organizer":
+        """
+        Load the embedding model, stop words and vectorizer and build an Organizer.
+
+        The model comes from the snapshot written by `connor model prepare`
+        when there is one (see initialize_models).
+        """
+        from connor.core.setup.dependencies import get_embedding_model_id, initialize_models
+
+        model, stop_words, vectorizer = initialize_models(backend, quantization, snapshot_dir)
+        return cls(
+            model, stop_words, vectorizer, settings, cache_path,
+            model_id=get_embedding_model_id(backend, quantization),
+        )
+
+    def _extraction_pool(self) -> Optional[ProcessPoolExecutor]:
+        """
+        Return the process pool every run extracts files in, starting it on first use.
+
+        Sharing one pool keeps concurrent runs to settings.read_workers
+        extraction processes in total. Returns None when reading serially.
+        """
+        workers = self.settings.read_workers if self.settings.read_workers > 0 else os.cpu_count() or 1
+        if workers <= 1:
+            return None
+        with self._read_executor_lock:
+            if self._read_executor is None:
+                self._read_executor = ProcessPoolExecutor(max_workers=workers)
+            return self._read_executor
+
+    def plan(
+        self,
+        folder: Union[str, Path],
+        incremental: bool = False,
+        profile: Optional[RunProfile] = None,
+    ) -> OrganizationPlan:
+        """
+        Compute how a folder will be organized, without moving anything.
+
+        Args:
+            folder: Folder to organize.
+            incremental: Only place the loose top-level files into the
+                folders of an earlier organization, if there is one.
+            profile: Optional run profile to time each stage on.
+
+        Returns:
+            The plan, with its moves and folder tree (see OrganizationPlan.tree).
+        """
+        from sklearn.base import clone
+
+        folder = Path(folder)
+        if not folder.is_dir():
+            raise FileNotFoundError(f"The folder '{folder}' does not exist")
+
+        settings = self.settings
+        index = FolderIndex.load(folder) if incremental else None
+        cache = None
+        if self.cache_path is not None:
+            cache = open_embedding_cache(
+                self.cache_path,
+                f"{self.model_id}@{settings.encoding.max_seq_length}",
+                settings.reading_word_limit,
+                settings.cache_max_size_mb,
+            )
+
+        args = dict(
+            folder_to_organize=str(folder),
+            reading_word_limit=settings.reading_word_limit,
+            folder_word_limit=settings.folder_word_limit,
+            exts=settings.exts,
+            model=self.model,
+            stop_words=self.stop_words,
+            # Runs fit their own copy, so concurrent runs never share a fitted state
+            vectorizer=clone(self.vectorizer),
+            cache=cache,
+            read_workers=settings.read_workers,
+            clustering=settings.clustering,
+            encoding=settings.encoding,
+            profile=profile,
+            dedup=settings.dedup,
+            build_tree=False,
+            pipeline=settings.pipeline,
+            read_executor=self._extraction_pool(),
+        )
+        try:
+            if index is not None:
+                renamed_dict, _, index = start_incremental_run(
+                    index=index, similarity_threshold=settings.similarity_threshold, **args
+                )
+            else:
+                renamed_dict, _, index = start_run(memory=settings.memory, **args)
+        finally:
+            if cache is not None:
+                cache.close()
+        return OrganizationPlan.build(folder, renamed_dict, index)
+
+    def apply(
+        self,
+        plan: OrganizationPlan,
+        journal_path: Optional[Path] = None,
+        progress: Optional[Stage] = None,
+    ) -> ApplyStats:
+        """
+        Move the files of a plan and save its folder index.
+
+        Args:
+            plan: Plan returned by plan, or loaded from a file.
+            journal_path: Optional journal that lets an interrupted apply resume.
+            progress: Optional stage to report moved files on.
+
+        Returns:
+            Counts of the moves done now, resumed and skipped.
+        """
+        return apply_plan(plan, journal_path, self.settings.move_workers, progress)
+
+    async def plan_async(
+        self,
+        folder: Union[str, Path],
+        incremental: bool = False,
+        profile: Optional[RunProfile] = None,
+    ) -> OrganizationPlan:
+        """
+        Run plan in the executor.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(self.plan, folder, incremental, profile))
+
+    async def apply_async(
+        self,
+        plan: OrganizationPlan,
+        journal_path: Optional[Path] = None,
+        progress: Optional[Stage] = None,
+    ) -> ApplyStats:
+        """
+        Run apply in the executor.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(self.apply, plan, journal_path, progress))
+
+    def close(self) -> None:
+        """
+        Shut down the encode and extraction processes, and the executor if
+        the Organizer created it.
+        """
+        close_encode_pool(self.model)
+        if self._read_executor is not None:
+            self._read_executor.shutdown()
+            self._read_executor = None
+        if self._owns_executor:
+            self.executor.shutdown()
+
+    def __enter__(self) -> "Organizer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,222 @@
+import queue
+import threading
+import time
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any, Callable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from connor.core.cache import EmbeddingCache
+from connor.core.dedup import DedupOptions, DuplicateIndex
+from connor.core.encoding import encode_texts, EncodingOptions
+from connor.core.prepare import preprocess
+from connor.core.profiling import RunProfile, Stage, optional_stage
+from connor.core.reader import iter_files
+from connor.core.setup.defaults import (
+    PIPELINE_ENABLED, PIPELINE_READ_QUEUE, PIPELINE_ENCODE_QUEUE, PIPELINE_BATCH_TEXTS
+)
+
+# Seconds between checks for a stopped pipeline while blocked on a queue
+POLL_INTERVAL = 0.1
+
+# Marks the end of a queue
+_DONE = object()
+
+
+class PipelineOptions(NamedTuple):
+    """
+    Settings of the overlapped read, preprocess and encode stages.
+
+    Each stage runs in its own thread and hands its output to the next
+    through a bounded queue: read_queue extracted files, encode_queue
+    batches of batch_texts preprocessed texts. A stage that gets ahead
+    blocks on its full queue instead of piling work up in memory. With
+    enabled False the stages run one after the other.
+    """
+    enabled: bool = PIPELINE_ENABLED
+    read_queue: int = PIPELINE_READ_QUEUE
+    encode_queue: int = PIPELINE_ENCODE_QUEUE
+    batch_texts: int = PIPELINE_BATCH_TEXTS
+
+
+class _Stopped(Exception):
+    """
+    Raised in a stage thread when another stage failed.
+    """
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event, stage: Stage) -> None:
+    """
+    Put an item, counting the time spent blocked on a full queue.
+    """
+    start = time.perf_counter()
+    while True:
+        try:
+            q.put(item, timeout=POLL_INTERVAL)
+            break
+        except queue.Full:
+            if stop.is_set():
+                raise _Stopped()
+    stage.count("blocked_seconds", time.perf_counter() - start)
+    stage.counters["queue_peak"] = max(stage.counters["queue_peak"], q.qsize())
+
+
+def _get(q: queue.Queue, stop: threading.Event, stage: Stage) -> Any:
+    """
+    Get an item, counting the time spent starved on an empty queue.
+    """
+    start = time.perf_counter()
+    while True:
+        try:
+            item = q.get(timeout=POLL_INTERVAL)
+            break
+        except queue.Empty:
+            if stop.is_set():
+                raise _Stopped()
+    stage.count("starved_seconds", time.perf_counter() - start)
+    return item
+
+
+def read_and_encode(
+    folder_path: Path,
+    word_limit: int,
+    stop_words: Set[str],
+    model: Any,
+    cache: Optional[EmbeddingCache] = None,
+    read_workers: int = 1,
+    encoding: EncodingOptions = EncodingOptions(),
+    dedup: DedupOptions = DedupOptions(),
+    options: PipelineOptions = PipelineOptions(),
+    profile: Optional[RunProfile] = None,
+    recursive: bool = False,
+    read_executor: Optional[Executor] = None,
+) -> Tuple[List[Tuple[str, str]], List[str], np.ndarray]:
+    """
+    Read, preprocess and encode the files of a folder in overlapping stages.
+
+    Extraction, preprocessing with duplicate detection, and encoding each
+    run in their own thread, so encoding starts with the first batch of
+    texts and the wall time approaches that of the slowest stage. Each
+    stage reports blocked_seconds (output queue full) and starved_seconds
+    (input queue empty) on the profile, which shows the bottleneck.
+
+    Args:
+        folder_path: Folder to read.
+        word_limit: Maximum words to read in each file.
+        stop_words: Set of stop words to ignore.
+        model: SentenceTransformer model.
+        cache: Optional persistent embedding cache.
+        read_workers: Number of extraction processes. 0 uses every CPU, 1 reads serially.
+        encoding: Batching and truncation settings of the model.
+        dedup: Duplicate detection settings.
+        options: Queue depths and batch size.
+        profile: Optional run profile to time each stage on.
+        recursive: Also read the files of nested folders.
+        read_executor: Process pool shared with other runs to extract files in,
+            instead of starting one for this run.
+
+    Returns:
+        Tuple containing:
+            List of tuples (relative path, processed content)
+            List of miscellaneous relative paths
+            Embedding matrix, one row per processed file
+    """
+    read_queue: queue.Queue = queue.Queue(max(1, options.read_queue))
+    encode_queue: queue.Queue = queue.Queue(max(1, options.encode_queue))
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    files_list: List[Tuple[str, str]] = []
+    misc_list: List[str] = []
+    groups: List[int] = []
+    duplicates = DuplicateIndex(dedup)
+
+    def run_stage(body: Callable[[], None]) -> Callable[[], None]:
+        def target() -> None:
+            try:
+                body()
+            except _Stopped:
+                pass
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+        return target
+
+    def read() -> None:
+        with optional_stage(profile, "read_files", display=False) as stage:
+            for item in iter_files(
+                folder_path, word_limit, read_workers, stage, recursive,
+                skip_duplicates=dedup.exact, window=options.read_queue, executor=read_executor,
+            ):
+                _put(read_queue, item, stop, stage)
+            _put(read_queue, _DONE, stop, stage)
+
+    def prepare() -> None:
+        with optional_stage(profile, "preprocess", display=False) as stage:
+            batch: List[str] = []
+            while True:
+                item = _get(read_queue, stop, stage)
+                if item is _DONE:
+                    break
+                name, content = item
+                if content is None:
+                    misc_list.append(name)
+                    continue
+                if not content:
+                    continue
+
+                text = preprocess(content, stop_words)
+                files_list.append((name, text))
+                group, new = duplicates.add(text)
+                groups.append(group)
+                if new:
+                    batch.append(text)
+                stage.advance()
+                stage.count("words_kept", len(text.split()))
+
+                if len(batch) >= options.batch_texts:
+                    _put(encode_queue, batch, stop, stage)
+                    batch = []
+            if batch:
+                _put(encode_queue, batch, stop, stage)
+            _put(encode_queue, _DONE, stop, stage)
+            stage.count("exact_duplicates", duplicates.exact)
+            stage.count("near_duplicates", duplicates.near)
+
+    threads = [
+        threading.Thread(target=run_stage(read), name="connor-read", daemon=True),
+        threading.Thread(target=run_stage(prepare), name="connor-preprocess", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    vectors: List[np.ndarray] = []
+    try:
+        with optional_stage(profile, "encode") as stage:
+            while True:
+                batch = _get(encode_queue, stop, stage)
+                if batch is _DONE:
+                    break
+                vectors.append(encode_texts(model, batch, cache, encoding))
+                stage.advance(len(batch))
+                stage.count("encoded", len(batch))
+            stage.count("encodes_saved", duplicates.saved)
+    except _Stopped:
+        pass
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+
+    if duplicates.saved:
+        print(
+            f"{duplicates.exact} identical and {duplicates.near} near-identical files "
+            f"reuse another file's embedding: {duplicates.saved} encodes saved"
+        )
+
+    if not vectors:
+        return files_list, misc_list, np.empty((0, 0), dtype=np.float32)
+    return files_list, misc_list, np.vstack(vectors)[np.array(groups, dtype=np.int64)]
@@ -0,0 +1,257 @@
+import json
+import os
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from connor.core.index import FolderIndex
+from connor.core.moving import (
+    MoveStats, move_files, plan_moves, remove_empty_folders, resolve_collisions
+)
+from connor.core.profiling import Stage
+from connor.core.setup.defaults import MOVE_WORKERS, TREE_PREVIEW_FILES
+from connor.core.tree_builder import make_tree_string
+
+PLAN_VERSION = 1
+
+
+class PlannedMove(NamedTuple):
+    """
+    One file move of a plan, with the state of the file when it was planned.
+
+    Paths are relative to the organized folder.
+    """
+    source: str
+    target: str
+    size: int
+    mtime_ns: int
+
+
+class ApplyStats(NamedTuple):
+    """
+    Outcome of applying a plan.
+
+    resumed counts the moves already done by an earlier, interrupted apply.
+    changed lists the files that were modified or removed since planning.
+    """
+    moves: MoveStats
+    resumed: int
+    changed: List[str]
+
+
+class OrganizationPlan:
+    """
+    A computed organization, saved so it can be applied later.
+
+    The plan holds every move with the size and mtime its file had when it
+    was planned, the folder tree shown to the user and the folder index to
+    save once applied. Applying it needs no reading or encoding.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        renamed_dict: Dict[str, Union[List[str], Dict]],
+        moves: List[PlannedMove],
+        index: Optional[FolderIndex] = None,
+    ):
+        """
+        Args:
+            root: Folder to organize.
+            renamed_dict: Dictionary mapping folder names to lists of files or subfolders.
+            moves: File moves, relative to root.
+            index: Folder index to save once the plan is applied.
+        """
+        self.root = Path(root)
+        self.renamed_dict = renamed_dict
+        self.moves = moves
+        self.index = index
+
+    @classmethod
+    def build(
+        cls,
+        root: Path,
+        renamed_dict: Dict[str, Union[List[str], Dict]],
+        index: Optional[FolderIndex] = None,
+    ) -> "OrganizationPlan":
+        """
+        Resolve the moves of a folder dictionary and record the state of each file.
+        """
+        root = Path(root).resolve()
+        moves = []
+        for source, target in resolve_collisions(plan_moves(str(root), renamed_dict)):
+            try:
+                stat = os.stat(source)
+            except FileNotFoundError:
+                continue
+            moves.append(PlannedMove(
+                os.path.relpath(source, root),
+                os.path.relpath(target, root),
+                stat.st_size,
+                stat.st_mtime_ns,
+            ))
+        return cls(root, renamed_dict, moves, index)
+
+    def save(self, path: Path) -> None:
+        """
+        Write the plan as JSON.
+        """
+        data: Dict[str, Any] = {
+            "version": PLAN_VERSION,
+            "root": str(self.root),
+            "folders": self.renamed_dict,
+            "moves": [move._asdict() for move in self.moves],
+            "index": None,
+        }
+        if self.index is not None:
+            data["index"] = {
+                "names": self.index.names,
+                "centroids": self.index.centroids.tolist(),
+                "counts": self.index.counts.tolist(),
+            }
+        Path(path).write_text(json.dumps(data) + "\n")
+
+    @classmethod
+    def load(cls, path: Path) -> "OrganizationPlan":
+        """
+        Read a plan written by save.
+        """
+        data = json.loads(Path(path).read_text())
+        if data.get("version") != PLAN_VERSION:
+            raise ValueError(f"Unsupported plan version {data.get('version')} in '{path}'")
+
+        index = None
+        if data["index"] is not None:
+            index = FolderIndex(
+                names=data["index"]["names"],
+                centroids=np.array(data["index"]["centroids"], dtype=np.float32),
+                counts=np.array(data["index"]["counts"], dtype=np.int64),
+            )
+        moves = [PlannedMove(**move) for move in data["moves"]]
+        return cls(Path(data["root"]), data["folders"], moves, index)
+
+    def renames(self) -> Dict[str, str]:
+        """
+        Return the new name of every file renamed to avoid a collision, by its relative path.
+        """
+        return {
+            Path(move.source).as_posix(): os.path.basename(move.target)
+            for move in self.moves
+            if os.path.basename(move.source) != os.path.basename(move.target)
+        }
+
+    def tree(self, max_files: Optional[int] = TREE_PREVIEW_FILES) -> str:
+        """
+        Format the planned folder tree, listing max_files files per folder (None lists all).
+
+        Files renamed to avoid a collision show their new name.
+        """
+        return make_tree_string(str(self.root), self.renamed_dict, max_files, self.renames())
+
+    @staticmethod
+    def journal_path(path: Path) -> Path:
+        return Path(f"{path}.journal")
+
+
+def read_journal(journal_path: Path) -> Set[str]:
+    """
+    Return the sources of the moves recorded in an apply journal.
+
+    A line cut short by an interruption is ignored.
+    """
+    done = set()
+    if not journal_path.exists():
+        return done
+    with journal_path.open() as journal:
+        for line in journal:
+            try:
+                done.add(json.loads(line)["source"])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def check_moves(root: Path, moves: List[PlannedMove]) -> Tuple[List[Tuple[str, str]], List[str], int]:
+    """
+    Split planned moves into those still valid and the files that changed.
+
+    A file counts as changed if its size or mtime differ from the plan. A
+    file whose source is gone but whose target has the planned size was
+    moved by an apply that stopped before journaling it, and counts as
+    done. A target taken by another file since planning is left to
+    move_files, which moves the file to the next free name.
+
+    Returns:
+        Tuple containing:
+            List of (source, destination) absolute paths to move
+            Relative paths of the files changed since planning
+            Number of moves found already done
+    """
+    valid, changed, done = [], [], 0
+    for move in moves:
+        source, target = os.path.join(root, move.source), os.path.join(root, move.target)
+        try:
+            stat = os.stat(source)
+        except FileNotFoundError:
+            try:
+                if os.stat(target).st_size == move.size:
+                    done += 1
+                    continue
+            except FileNotFoundError:
+                pass
+            changed.append(move.source)
+            continue
+
+        if stat.st_size != move.size or stat.st_mtime_ns != move.mtime_ns:
+            changed.append(move.source)
+        else:
+            valid.append((source, target))
+    return valid, changed, done
+
+
+def apply_plan(
+    plan: OrganizationPlan,
+    journal_path: Optional[Path],
+    workers: int = MOVE_WORKERS,
+    progress: Optional[Stage] = None,
+) -> ApplyStats:
+    """
+    Apply a saved plan, resuming where an earlier apply stopped.
+
+    Every completed move is appended to the journal, so an interrupted
+    apply can be run again and skips the moves already done. The journal is
+    deleted once the apply completes. Files changed since planning, by size
+    or mtime, are left where they are. A file whose target was taken since
+    planning goes to the next free _2, _3... name, as in connor run.
+
+    Args:
+        plan: Plan to apply.
+        journal_path: Append-only journal of the completed moves, or None
+            to apply without one.
+        workers: Number of copy threads for moves across devices.
+        progress: Optional stage to report moved files on.
+
+    Returns:
+        Counts of the moves done now, resumed and skipped.
+    """
+    done = read_journal(journal_path) if journal_path is not None else set()
+    pending = [move for move in plan.moves if move.source not in done]
+    moves, changed, found_done = check_moves(plan.root, pending)
+
+    with journal_path.open("a") if journal_path is not None else nullcontext() as journal:
+        def record(source: str, target: str) -> None:
+            journal.write(json.dumps({"source": os.path.relpath(source, plan.root)}) + "\n")
+            journal.flush()
+
+        stats = move_files(moves, workers, progress, on_moved=record if journal is not None else None)
+
+    remove_empty_folders(str(plan.root), [
+        (os.path.join(plan.root, move.source), os.path.join(plan.root, move.target)) for move in plan.moves
+    ])
+    if plan.index is not None:
+        plan.index.save(plan.root)
+    if journal_path is not None:
+        journal_path.unlink(missing_ok=True)
+    return ApplyStats(stats, len(plan.moves) - len(pending) + found_done, changed)
@@ -1,7 +1,9 @@
 import string
+from concurrent.futures import Executor
 from pathlib import Path
-from typing import Set
+from typing import Optional, Set
 
+from connor.core.profiling import RunProfile, optional_stage
 from connor.core.reader import read_files
 
 
@@ -29,7 +31,16 @@ def preprocess(text: str, stop_words: Set[str]) -> str:
     return ' '.join(preprocessed)
 
 
-def get_files_list(folder_to_organize: Path, word_limit: int, stop_words):
+def get_files_list(
+    folder_to_organize: Path,
+    word_limit: int,
+    stop_words,
+    workers: int = 1,
+    profile: Optional[RunProfile] = None,
+    recursive: bool = False,
+    skip_duplicates: bool = False,
+    executor: Optional[Executor] = None,
+):
     """
     Get list of files with processed content and list of miscellaneous files.
 
@@ -37,12 +48,24 @@ def get_files_list(folder_to_organize: Path, word_limit: int, stop_words):
         folder_to_organize: Path to folder.
         word_limit: Maximum number of words to extract.
         stop_words: Set of stop words to ignore.
+        workers: Number of extraction processes. 0 uses every CPU, 1 reads serially.
+        profile: Optional run profile to time the read and preprocess stages on.
+        recursive: Also read the files of nested folders.
+        skip_duplicates: Read byte-identical files only once.
+        executor: Process pool to extract in instead of starting one.
 
     Returns:
         Tuple containing:
-            List of tuples (filename, processed content)
-            List of miscellaneous filenames
+            List of tuples (relative path, processed content)
+            List of miscellaneous relative paths
     """
-    text_files_list, misc_files_list = read_files(folder_to_organize, word_limit)
-    text_files_list = [(file, preprocess(content, stop_words)) for file, content in text_files_list if content]
-    return text_files_list, misc_files_list
\ No newline at end of file
+    with optional_stage(profile, "read_files") as stage:
+        text_files_list, misc_files_list = read_files(
+            folder_to_organize, word_limit, workers, stage, recursive, skip_duplicates, executor
+        )
+
+    with optional_stage(profile, "preprocess", total=len(text_files_list)) as stage:
+        text_files_list = [(file, preprocess(content, stop_words)) for file, content in text_files_list if content]
+        stage.advance(len(text_files_list))
+        stage.count("words_kept", sum(len(content.split()) for _, content in text_files_list))
+    return text_files_list, misc_files_list
@@ -0,0 +1,168 @@
+import cProfile
+import json
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+
+class Stage:
+    """
+    Timing, progress and counters of one pipeline stage.
+    """
+
+    def __init__(self, name: str, display: Optional[TextIO] = None, total: Optional[int] = None):
+        """
+        Args:
+            name: Stage name.
+            display: Stream to draw the live progress line on, or None.
+            total: Number of items the stage will process, if known.
+        """
+        self.name = name
+        self.display = display
+        self.total = total
+        self.done = 0
+        self.counters: Dict[str, float] = defaultdict(int)
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+        self.last_draw = 0.0
+
+    def set_total(self, total: int) -> None:
+        self.total = total
+        self.draw(force=True)
+
+    def advance(self, n: int = 1) -> None:
+        """
+        Mark n more items as processed.
+        """
+        self.done += n
+        self.draw()
+
+    def count(self, key: str, n: float = 1) -> None:
+        """
+        Add n to a named counter of this stage.
+        """
+        self.counters[key] += n
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def draw(self, force: bool = False) -> None:
+        """
+        Redraw the progress line, at most ten times per second.
+        """
+        if self.display is None:
+            return
+        now = time.perf_counter()
+        if not force and now - self.last_draw < 0.1:
+            return
+        self.last_draw = now
+
+        elapsed = self.elapsed()
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        line = f"{self.name:<18} {self.done}"
+        if self.total:
+            line += f"/{self.total} {100 * self.done / self.total:5.1f}%"
+        line += f" {rate:9.1f}/s"
+        if self.total and rate > 0:
+            line += f"  ETA {max(self.total - self.done, 0) / rate:6.1f}s"
+        self.display.write(f"\r{line:<79}")
+        self.display.flush()
+
+    def finish(self) -> None:
+        self.seconds = self.elapsed()
+        if self.display is not None:
+            self.draw(force=True)
+            self.display.write(f"\r{self.name:<18} done in {self.seconds:.2f}s{'':<40}\n")
+            self.display.flush()
+
+    def report(self) -> Dict[str, Any]:
+        report: Dict[str, Any] = {
+            "seconds": self.seconds,
+            "items": self.done,
+            "items_per_second": self.done / self.seconds if self.seconds > 0 else None,
+        }
+        report.update(self.counters)
+        return report
+
+
+class RunProfile:
+    """
+    Collects per-stage timings and counters of a run.
+
+    Optionally draws a live progress line per stage and runs cProfile
+    over one chosen stage.
+    """
+
+    def __init__(
+        self,
+        display: bool = False,
+        cprofile_stage: Optional[str] = None,
+        cprofile_path: Optional[Path] = None,
+    ):
+        """
+        Args:
+            display: Draw live progress on stderr.
+            cprofile_stage: Name of the stage to run under cProfile.
+            cprofile_path: Where to write the cProfile stats of that stage.
+        """
+        self.display = sys.stderr if display else None
+        self.cprofile_stage = cprofile_stage
+        self.cprofile_path = cprofile_path
+        self.stages: Dict[str, Stage] = {}
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, total: Optional[int] = None, display: bool = True) -> Iterator[Stage]:
+        """
+        Time a stage. Yields the Stage to report progress and counters on.
+
+        Stages running next to others in background threads pass display
+        False so that only one progress line is drawn at a time.
+        """
+        stage = Stage(name, self.display if display else None, total)
+        self.stages[name] = stage
+
+        profiler = None
+        if name == self.cprofile_stage:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            yield stage
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                if self.cprofile_path is not None:
+                    profiler.dump_stats(str(self.cprofile_path))
+            stage.finish()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "total_seconds": time.perf_counter() - self.start,
+            "stages": {name: stage.report() for name, stage in self.stages.items()},
+        }
+
+    def dump(self, path: Path) -> None:
+        """
+        Write the report as JSON.
+        """
+        Path(path).write_text(json.dumps(self.report(), indent=2) + "\n")
+
+
+@contextmanager
+def optional_stage(
+    profile: Optional[RunProfile],
+    name: str,
+    total: Optional[int] = None,
+    display: bool = True,
+) -> Iterator[Stage]:
+    """
+    Time a stage on the profile if there is one, else on a throwaway Stage.
+    """
+    if profile is None:
+        yield Stage(name)
+    else:
+        with profile.stage(name, total, display) as stage:
+            yield stage
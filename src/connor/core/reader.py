@@ -1,94 +1,158 @@
-import shutil
 import os
+import zipfile
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
 from typing import (
-    Callable, List, Tuple, Dict
+    Callable, Iterable, Iterator, List, Tuple, Dict, NamedTuple, Optional
 )
+from xml.etree.ElementTree import Element, iterparse
 
-from openpyxl import load_workbook
-from odf.opendocument import load as load_odf
-from odf import text, teletype
-from pptx import Presentation
-from docx import Document
-import PyPDF2
+from connor.core.dedup import find_exact_duplicates
+from connor.core.profiling import Stage
+from connor.core.setup.defaults import STATE_DIR_NAME
 
+# Format libraries are imported inside each reader so that only the
+# parsers for file types actually present get loaded.
 
-def read_text(file_path: Path, word_limit: int) -> str:
-    try:
-        with file_path.open('r', encoding='utf-8', errors='ignore') as file:
-            content = file.read().split()
-            return ' '.join(content[:word_limit])
-    except Exception as e:
-        return f"Error reading {file_path.name}: {e}"
+TEXT_CHUNK_SIZE = 64 * 1024
+ODF_TEXT_NS = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
 
 
-def read_pdf(file_path: Path, word_limit: int) -> str:
-    try:
-        with file_path.open('rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            content = []
-            for page in pdf_reader.pages:
-                text = page.extract_text()
-                if text:
-                    content.extend(text.split())
-            return ' '.join(content[:word_limit])
-    except Exception as e:
-        return f"Error reading {file_path.name}: {e}"
+def take_words(chunks: Iterable[str], word_limit: int) -> str:
+    """
+    Collect words from a stream of text chunks until the word limit is met.
 
+    The stream is not consumed past the chunk that fills the budget, so
+    readers only parse as much of a document as is actually kept.
 
-def read_odf(file_path: Path, word_limit: int) -> str:
-    try:
-        odf_file = load_odf(file_path)
-        paras = odf_file.getElementsByType(text.P)
-        content = []
-        for para in paras:
-            text_data = teletype.extractText(para)
-            if text_data:
-                content.extend(text_data.split())
-        return ' '.join(content[:word_limit])
-    except Exception as e:
-        return f"Error reading {file_path.name}: {e}"
+    Args:
+        chunks: Text chunks, each ending on a word boundary.
+        word_limit: Maximum words to keep.
 
+    Returns:
+        The first word_limit words joined by spaces.
+    """
+    words: List[str] = []
+    if word_limit <= 0:
+        return ''
 
-def read_doc(file_path: Path, word_limit: int) -> str:
-    try:
-        doc = Document(file_path)
-        content = []
-        for para in doc.paragraphs:
-            content.extend(para.text.split())
-        return ' '.join(content[:word_limit])
-    except Exception as e:
-        return f"Error reading {file_path.name}: {e}"
+    for chunk in chunks:
+        words.extend(chunk.split())
+        if len(words) >= word_limit:
+            break
+    return ' '.join(words[:word_limit])
+
+
+def read_text(file_path: Path) -> Iterator[str]:
+    with file_path.open('r', encoding='utf-8', errors='ignore') as file:
+        carry = ''
+        while True:
+            chunk = file.read(TEXT_CHUNK_SIZE)
+            if not chunk:
+                break
+            chunk = carry + chunk
+
+            # Hold back a trailing partial word for the next chunk
+            cut = len(chunk)
+            while cut > 0 and not chunk[cut - 1].isspace():
+                cut -= 1
+            if cut == 0 and len(chunk) < TEXT_CHUNK_SIZE * 2:
+                carry = chunk
+                continue
+
+            cut = cut or len(chunk)
+            carry = chunk[cut:]
+            yield chunk[:cut]
+        yield carry
+
+
+def read_pdf(file_path: Path) -> Iterator[str]:
+    import PyPDF2
+
+    with file_path.open('rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for page in pdf_reader.pages:
+            text = page.extract_text()
+            if text:
+                yield text
+
+
+def _odf_element_text(element: Element) -> str:
+    """
+    Extract the text of an ODF element, unwrapping spaces, tabs and line breaks.
+    """
+    result = [element.text or '']
+    for child in element:
+        if child.tag in (ODF_TEXT_NS + 's', ODF_TEXT_NS + 'tab', ODF_TEXT_NS + 'line-break'):
+            result.append(' ')
+        else:
+            result.append(_odf_element_text(child))
+        result.append(child.tail or '')
+    return ''.join(result)
 
 
-def read_xlsx(file_path: Path, word_limit: int) -> str:
+def read_odf(file_path: Path) -> Iterator[str]:
+    # Paragraphs can nest, e.g. in a text box anchored in a paragraph: the
+    # text is taken once, from the outermost one. Every element finished
+    # outside a paragraph is cleared and detached from its parent, so only
+    # the open elements and the current paragraph are held in memory.
+    paragraph = ODF_TEXT_NS + 'p'
+    with zipfile.ZipFile(file_path) as archive, archive.open('content.xml') as content:
+        depth = 0
+        open_elements: List[Element] = []
+        for event, element in iterparse(content, events=('start', 'end')):
+            if event == 'start':
+                open_elements.append(element)
+                if element.tag == paragraph:
+                    depth += 1
+                continue
+
+            open_elements.pop()
+            if element.tag == paragraph:
+                depth -= 1
+                if depth == 0:
+                    text_data = _odf_element_text(element)
+                    if text_data:
+                        yield text_data
+            if depth == 0:
+                element.clear()
+                if open_elements:
+                    open_elements[-1].remove(element)
+
+
+def read_doc(file_path: Path) -> Iterator[str]:
+    from docx import Document
+
+    doc = Document(file_path)
+    for para in doc.paragraphs:
+        yield para.text
+
+
+def read_xlsx(file_path: Path) -> Iterator[str]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
     try:
-        workbook = load_workbook(file_path)
         sheet = workbook.active
-        content = []
         for row in sheet.iter_rows(values_only=True):
-            for cell in row:
-                if cell is not None:
-                    content.extend(str(cell).split())
-        return ' '.join(content[:word_limit])
-    except Exception as e:
-        return f"Error reading {file_path.name}: {e}"
+            yield ' '.join(str(cell) for cell in row if cell is not None)
+    finally:
+        workbook.close()
 
 
-def read_ppt(file_path: Path, word_limit: int) -> str:
-    try:
-        presentation = Presentation(file_path)
-        content = []
-        for slide in presentation.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text:
-                    content.extend(shape.text.split())
-        return ' '.join(content[:word_limit])
-    except Exception as e:
-        return f"Error reading {file_path.name}: {e}"
+def read_ppt(file_path: Path) -> Iterator[str]:
+    from pptx import Presentation
+
+    presentation = Presentation(file_path)
+    for slide in presentation.slides:
+        for shape in slide.shapes:
+            if hasattr(shape, "text") and shape.text:
+                yield shape.text
 
 
-FUNC_MAP: Dict[str, Callable[[Path, int], str]] = {
+FUNC_MAP: Dict[str, Callable[[Path], Iterator[str]]] = {
     '.txt': read_text,
     '.html': read_text,
     '.md': read_text,
@@ -103,50 +167,260 @@ FUNC_MAP: Dict[str, Callable[[Path, int], str]] = {
 }
 
 
-def prep_files(directory: Path) -> None:
+def list_files(directory: Path, recursive: bool = True) -> List[Path]:
     """
-    Flattens the directory.
+    List the files to organize as paths relative to the directory.
+
+    Nested folders are walked in place instead of being flattened, so
+    nothing is moved before the user confirms. Connor's own state folder
+    is left out.
+
+    Args:
+        directory: Folder to organize.
+        recursive: Also list the files of nested folders.
+
+    Returns:
+        Sorted relative file paths.
     """
-    for root, _, files in os.walk(directory):
+    directory = Path(directory)
+    relative_paths = []
+    for root, folders, files in os.walk(directory):
         root_path = Path(root)
-        for file_name in files:
-            file_path = root_path / file_name
-            destination = directory / file_name
-            if file_path != destination:
-                shutil.move(str(file_path), str(destination))
+        if root_path == directory:
+            if STATE_DIR_NAME in folders:
+                folders.remove(STATE_DIR_NAME)
+            if not recursive:
+                folders.clear()
+        relative_root = root_path.relative_to(directory)
+        relative_paths.extend(relative_root / file_name for file_name in files)
+    return sorted(relative_paths)
 
-    for root, folders, _ in os.walk(directory, topdown=False):
-        root_path = Path(root)
-        for folder in folders:
-            folder_path = root_path / folder
-            try:
-                folder_path.rmdir()
-            except OSError:
-                print(f"Could not delete folder {folder_path}")
+
+class ReadResult(NamedTuple):
+    """
+    Outcome of extracting text from one file.
+    """
+    name: str
+    content: str
+    error: Optional[str] = None
+    size: int = 0
 
 
-def read_files(folder_path: Path, word_limit: int) -> Tuple[List[Tuple[str, str]], List[str]]:
+def extract_file(file_path: Path, word_limit: int) -> ReadResult:
+    """
+    Extract text from a single file, capturing parse failures.
+
+    Args:
+        file_path: Path of the file to read.
+        word_limit: Maximum words to read.
+
+    Returns:
+        ReadResult with the content, or with the error message if parsing failed.
+    """
+    reader = FUNC_MAP[file_path.suffix.lower()]
+    try:
+        size = file_path.stat().st_size
+        chunks = reader(file_path)
+        try:
+            return ReadResult(file_path.name, take_words(chunks, word_limit), size=size)
+        finally:
+            chunks.close()
+    except Exception as e:
+        return ReadResult(file_path.name, "", f"{type(e).__name__}: {e}")
+
+
+def _extract_file_star(args: Tuple[Path, int]) -> ReadResult:
+    return extract_file(*args)
+
+
+def iter_extract_files(
+    file_paths: List[Path],
+    word_limit: int,
+    workers: int = 1,
+    window: int = 0,
+    executor: Optional[Executor] = None,
+) -> Iterator[ReadResult]:
+    """
+    Extract text from many files, optionally in a process pool, yielding
+    results in the same order as file_paths.
+
+    Args:
+        file_paths: Paths of readable files.
+        word_limit: Maximum words to read in each file.
+        workers: Number of worker processes. 0 uses every CPU, 1 reads serially.
+        window: Files handed to the pool at once, 0 hands them all. A window
+            bounds how many extracted texts wait in memory to be consumed.
+        executor: Process pool to extract in instead of starting one, left
+            running afterwards. workers then only sets how work is chunked.
+
+    Yields:
+        ReadResult of each path.
+    """
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(file_paths))
+
+    if workers <= 1:
+        for file_path in file_paths:
+            yield extract_file(file_path, word_limit)
+        return
+
+    window = window if window > 0 else len(file_paths)
+    with ProcessPoolExecutor(max_workers=workers) if executor is None else nullcontext(executor) as executor:
+        for start in range(0, len(file_paths), window):
+            batch = file_paths[start:start + window]
+            yield from executor.map(
+                _extract_file_star,
+                [(file_path, word_limit) for file_path in batch],
+                chunksize=max(1, len(batch) // (workers * 4)),
+            )
+
+
+def extract_files(
+    file_paths: List[Path],
+    word_limit: int,
+    workers: int = 1,
+    progress: Optional[Stage] = None,
+) -> List[ReadResult]:
+    """
+    Extract text from many files, optionally in a process pool.
+
+    Results are returned in the same order as file_paths.
+
+    Args:
+        file_paths: Paths of readable files.
+        word_limit: Maximum words to read in each file.
+        workers: Number of worker processes. 0 uses every CPU, 1 reads serially.
+        progress: Optional stage to report each extracted file on.
+
+    Returns:
+        List of ReadResult, one per path.
+    """
+    collected = []
+    for result in iter_extract_files(file_paths, word_limit, workers):
+        collected.append(result)
+        if progress is not None:
+            progress.advance()
+    return collected
+
+
+def iter_files(
+    folder_path: Path,
+    word_limit: int,
+    workers: int = 1,
+    progress: Optional[Stage] = None,
+    recursive: bool = False,
+    skip_duplicates: bool = False,
+    window: int = 0,
+    executor: Optional[Executor] = None,
+) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Read the files in the folder one at a time, as read_files does.
+
+    Miscellaneous files come first, then readable files in path order.
+
+    Args:
+        folder_path: Path object of the selected folder to read.
+        word_limit: Maximum words to read in each file.
+        workers: Number of extraction processes. 0 uses every CPU, 1 reads serially.
+        progress: Optional stage to report progress and read counters on.
+        recursive: Also read the files of nested folders.
+        skip_duplicates: Read byte-identical files once and give the copies
+            the content of the first one.
+        window: Files extracted ahead of the consumer, 0 extracts them all.
+        executor: Process pool to extract in instead of starting one.
+
+    Yields:
+        Tuple (relative path, content), with None as content for
+        miscellaneous and unreadable files.
+    """
+    readable_paths = []
+    for relative_path in list_files(folder_path, recursive):
+        if relative_path.suffix.lower() in FUNC_MAP:
+            readable_paths.append(relative_path)
+        else:
+            yield relative_path.as_posix(), None
+
+    if progress is not None:
+        progress.set_total(len(readable_paths))
+
+    full_paths = [folder_path / path for path in readable_paths]
+    duplicates = find_exact_duplicates(full_paths) if skip_duplicates else {}
+    # Results of the files that have copies, kept until their last copy comes up
+    originals: Dict[int, ReadResult] = {}
+    copies_left = Counter(duplicates.values())
+    results = iter_extract_files(
+        [full_paths[i] for i in range(len(full_paths)) if i not in duplicates], word_limit, workers, window, executor
+    )
+    if progress is not None:
+        progress.count("duplicates_skipped", len(duplicates))
+
+    for i, relative_path in enumerate(readable_paths):
+        if i in duplicates:
+            original = duplicates[i]
+            result = originals[original]
+            copies_left[original] -= 1
+            if not copies_left[original]:
+                del originals[original]
+        else:
+            result = next(results)
+            if i in copies_left:
+                originals[i] = result
+        name = relative_path.as_posix()
+
+        if progress is not None:
+            progress.advance()
+            progress.count(f"files_read{relative_path.suffix.lower()}")
+            if i not in duplicates:
+                progress.count("bytes_read", result.size)
+                progress.count("words_read", len(result.content.split()))
+            if result.error is not None:
+                progress.count("read_errors")
+
+        if result.error is not None:
+            print(f"Error reading {name}: {result.error}")
+            yield name, None
+        else:
+            yield name, result.content
+
+
+def read_files(
+    folder_path: Path,
+    word_limit: int,
+    workers: int = 1,
+    progress: Optional[Stage] = None,
+    recursive: bool = False,
+    skip_duplicates: bool = False,
+    executor: Optional[Executor] = None,
+) -> Tuple[List[Tuple[str, str]], List[str]]:
     """
     Reads files in the folder by reading words till the word limit.
 
+    Files are named by their path relative to the folder, in POSIX form,
+    which is just the file name for files at the top of the folder.
+
     Args:
         folder_path: Path object of the selected folder to read.
         word_limit: Maximum words to read in each file.
+        workers: Number of extraction processes. 0 uses every CPU, 1 reads serially.
+        progress: Optional stage to report progress and read counters on.
+        recursive: Also read the files of nested folders.
+        skip_duplicates: Read byte-identical files once and give the copies
+            the content of the first one.
+        executor: Process pool to extract in instead of starting one.
 
     Returns:
         Tuple containing:
-            List of tuples (filename, content) for processed text files
-            List of filenames for miscellaneous/unreadable files
+            List of tuples (relative path, content) for processed text files
+            List of relative paths for miscellaneous/unreadable files
     """
     text_files_list = []
     misc_files_list = []
-    for file_path in folder_path.iterdir():
-        if file_path.is_file():
-            extension = file_path.suffix.lower()
-            if extension in FUNC_MAP:
-                reader = FUNC_MAP[extension]
-                content = reader(file_path, word_limit)
-                text_files_list.append((file_path.name, content))
-            else:
-                misc_files_list.append(file_path.name)
+    for name, content in iter_files(
+        folder_path, word_limit, workers, progress, recursive, skip_duplicates, executor=executor
+    ):
+        if content is None:
+            misc_files_list.append(name)
+        else:
+            text_files_list.append((name, content))
     return text_files_list, misc_files_list
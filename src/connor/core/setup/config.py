@@ -1,13 +1,17 @@
 import configparser
+import os
+import secrets
 import shutil
 import sys
 from pathlib import Path
-from typing import Set
+from typing import Optional, Set
 import json
 
-from platformdirs import user_config_dir
+from platformdirs import user_cache_dir, user_config_dir, user_runtime_dir
 
-from .defaults import APP_NAME
+from .defaults import (
+    APP_NAME, EMBEDDING_CACHE_FILE, DAEMON_SOCKET_FILE, DAEMON_AUTHKEY_FILE, EMBEDDING_MODEL_NAME
+)
 
 
 def get_base_path() -> Path:
@@ -84,6 +88,57 @@ def get_model_cache_dir() -> Path:
     return cache_dir
 
 
+def get_model_snapshot_dir(root: Optional[Path] = None) -> Path:
+    """
+    Return the location of the prepared model snapshot.
+
+    Args:
+        root: Directory holding snapshots, the model cache by default.
+    """
+    if root is None:
+        root = get_model_cache_dir() / 'snapshot'
+    return Path(root) / EMBEDDING_MODEL_NAME.replace('/', '--')
+
+
+def get_embedding_cache_path() -> Path:
+    """
+    Return the path of the on-disk embedding cache.
+    """
+    cache_dir = Path(user_cache_dir(APP_NAME))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir / EMBEDDING_CACHE_FILE
+
+
+def get_daemon_address() -> str:
+    """
+    Return the address the watch process listens on for handed-off runs.
+    """
+    if sys.platform == "win32":
+        return rf"\\.\pipe\{APP_NAME}"
+
+    runtime_dir = Path(user_runtime_dir(APP_NAME))
+    runtime_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+    return str(runtime_dir / DAEMON_SOCKET_FILE)
+
+
+def get_daemon_authkey() -> bytes:
+    """
+    Return the shared key that authenticates clients of the watch process,
+    creating it (readable by the current user only) if missing.
+    """
+    key_path = Path(user_config_dir(APP_NAME)) / DAEMON_AUTHKEY_FILE
+    if not key_path.exists():
+        key_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, "w") as file:
+                file.write(secrets.token_hex(32))
+    return key_path.read_text().strip().encode()
+
+
 def load_stopwords() -> Set[str]:
     """
     Loads the stopwords file from src/connor/resources/.
@@ -1,2 +1,44 @@
 MISCELLANEOUS_FOLDER_NAME = "_misc"
 APP_NAME = "connor"
+STATE_DIR_NAME = ".connor"
+INDEX_FILE = "index.npz"
+EMBEDDING_MODEL_NAME = "BAAI/bge-base-en-v1.5"
+EMBEDDING_BACKEND = "torch"
+EMBEDDING_QUANTIZATION = "none"
+EMBEDDING_CACHE_FILE = "embeddings.sqlite3"
+EMBEDDING_CACHE_MAX_SIZE_MB = 512
+CLUSTERING_ENGINE = "auto"
+CLUSTERING_LARGE_THRESHOLD = 20000
+CLUSTERING_BATCH_SIZE = 4096
+CLUSTERING_SAMPLE_SIZE = 20000
+K_SELECTION = "sqrt"
+K_MIN = 2
+K_MAX = 0
+K_SELECTION_SAMPLE_SIZE = 2000
+K_SELECTION_CANDIDATES = 8
+SIMILARITY_THRESHOLD = 0.6
+WATCH_POLL_INTERVAL = 2.0
+WATCH_DEBOUNCE = 5.0
+WATCH_MAX_WAIT = 60.0
+DAEMON_SOCKET_FILE = "connor.sock"
+DAEMON_AUTHKEY_FILE = "daemon.key"
+ENCODE_BATCH_SIZE = 32
+ENCODE_PROCESSES = 1
+ENCODE_THREADS_PER_PROCESS = 0
+ENCODE_MIN_POOL_TEXTS = 256
+TOKENS_PER_WORD = 1.3
+MOVE_WORKERS = 8
+TREE_PREVIEW_FILES = 10
+CLUSTERING_MAX_DEPTH = 1
+CLUSTERING_MAX_FOLDER_SIZE = 0
+DEDUP_EXACT = True
+DEDUP_NEAR = True
+NEAR_DUPLICATE_THRESHOLD = 0.9
+LOW_MEMORY = False
+MAX_RSS_MB = 0
+SPILL_CHUNK_SIZE = 4096
+TFIDF_SAMPLE_SIZE = 50000
+PIPELINE_ENABLED = True
+PIPELINE_READ_QUEUE = 256
+PIPELINE_ENCODE_QUEUE = 4
+PIPELINE_BATCH_TEXTS = 1024
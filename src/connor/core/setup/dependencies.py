@@ -1,12 +1,32 @@
+import functools
+import json
+import mmap
 import os
+import shutil
+import struct
 import warnings
 from pathlib import Path
-from typing import Any, Set, Tuple
+from typing import Any, Dict, Optional, Set, Tuple, TYPE_CHECKING
 
-from sentence_transformers import SentenceTransformer
-from sklearn.feature_extraction.text import TfidfVectorizer
+from ..encoding import set_model_loader
+from .config import get_model_cache_dir, get_model_snapshot_dir, load_stopwords
+from .defaults import (
+    EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, EMBEDDING_QUANTIZATION
+)
 
-from .config import get_model_cache_dir, load_stopwords
+EMBEDDING_BACKENDS = ("torch", "onnx")
+ONNX_QUANTIZATIONS = ("none", "arm64", "avx2", "avx512", "avx512_vnni")
+SNAPSHOT_WEIGHTS_FILE = "model.safetensors"
+SAFETENSORS_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool",
+}
+
+# sentence-transformers (torch) and scikit-learn are slow to import, so
+# they are only loaded once a run actually needs the models.
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+    from sklearn.feature_extraction.text import TfidfVectorizer
 
 
 def _setup_cache_environment(cache_dir: Path) -> None:
@@ -22,29 +42,247 @@ def _setup_cache_environment(cache_dir: Path) -> None:
     os.environ["HF_HUB_CACHE"] = str(cache_dir)
 
 
-def _load_embedding_model(cache_dir: Path) -> SentenceTransformer:
+def get_embedding_model_id(
+    backend: str = EMBEDDING_BACKEND,
+    quantization: str = EMBEDDING_QUANTIZATION,
+) -> str:
+    """
+    Return a name identifying the embedding model and how it is run.
+
+    Used to key cached embeddings, since quantized models give slightly
+    different vectors.
+    """
+    if backend == "torch":
+        return EMBEDDING_MODEL_NAME
+    if quantization == "none":
+        return f"{EMBEDDING_MODEL_NAME}:{backend}"
+    return f"{EMBEDDING_MODEL_NAME}:{backend}-qint8_{quantization}"
+
+
+def _onnx_model_dir(cache_dir: Path) -> Path:
+    return cache_dir / "onnx" / EMBEDDING_MODEL_NAME.replace("/", "--")
+
+
+def _load_onnx_model(cache_dir: Path, quantization: str) -> "SentenceTransformer":
+    """
+    Load the embedding model on the ONNX Runtime CPU backend.
+
+    The model is exported to ONNX (and optionally int8-quantized) on first
+    use and the export is kept in the cache directory for later runs.
+
+    Args:
+        cache_dir: Directory for caching model files.
+        quantization: Quantization target, or "none" for float32.
+
+    Returns:
+        Loaded SentenceTransformer model.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    model_dir = _onnx_model_dir(cache_dir)
+    if not (model_dir / "onnx" / "model.onnx").exists():
+        print("Exporting embedding model to ONNX...")
+        model = SentenceTransformer(
+            EMBEDDING_MODEL_NAME,
+            cache_folder=str(cache_dir),
+            backend="onnx",
+        )
+        model.save_pretrained(str(model_dir))
+
+    file_name = "onnx/model.onnx"
+    if quantization != "none":
+        file_name = f"onnx/model_qint8_{quantization}.onnx"
+        if not (model_dir / file_name).exists():
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+
+            print(f"Quantizing ONNX model for {quantization}...")
+            model = SentenceTransformer(str(model_dir), backend="onnx")
+            export_dynamic_quantized_onnx_model(model, quantization, str(model_dir))
+
+    return SentenceTransformer(
+        str(model_dir),
+        backend="onnx",
+        model_kwargs={"file_name": file_name, "provider": "CPUExecutionProvider"},
+    )
+
+
+def has_model_snapshot(snapshot_dir: Path) -> bool:
+    return (snapshot_dir / "modules.json").exists() and (snapshot_dir / SNAPSHOT_WEIGHTS_FILE).exists()
+
+
+def prepare_model_snapshot(root: Optional[Path] = None) -> Path:
+    """
+    Write a self-contained local copy of the embedding model.
+
+    The snapshot holds the safetensors weights, tokenizer and pooling
+    configuration, so later runs load it offline without any hub lookup.
+    It goes into its own subdirectory of root, is written next to it and
+    moved into place, so processes starting meanwhile never see a partial
+    snapshot. An existing directory is only replaced if it is empty or an
+    earlier snapshot.
+
+    Args:
+        root: Directory holding snapshots, the model cache by default.
+
+    Returns:
+        The snapshot directory.
+
+    Raises:
+        FileExistsError: If the snapshot directory exists and holds anything else.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    snapshot_dir = get_model_snapshot_dir(root)
+    if snapshot_dir.exists() and not has_model_snapshot(snapshot_dir) and any(snapshot_dir.iterdir()):
+        raise FileExistsError(f"'{snapshot_dir}' exists and is not a model snapshot")
+
+    cache_dir = get_model_cache_dir()
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME, cache_folder=str(cache_dir), device="cpu")
+
+    snapshot_dir.parent.mkdir(parents=True, exist_ok=True)
+    partial_dir = snapshot_dir.with_name(f"{snapshot_dir.name}.partial-{os.getpid()}")
+    shutil.rmtree(partial_dir, ignore_errors=True)
+    model.save(str(partial_dir), safe_serialization=True)
+    if not has_model_snapshot(partial_dir):
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        raise RuntimeError(f"Saving the model did not produce {SNAPSHOT_WEIGHTS_FILE} and modules.json")
+
+    if snapshot_dir.exists():
+        shutil.rmtree(snapshot_dir)
+    os.replace(partial_dir, snapshot_dir)
+    return snapshot_dir
+
+
+def _map_safetensors(weights_path: Path) -> Dict[str, Any]:
+    """
+    Map the tensors of a safetensors file into memory without reading them.
+
+    The file is mapped copy-on-write, so the pages stay shared with the page
+    cache and with every other process mapping the same file.
+
+    Returns:
+        Dictionary of tensor name to a tensor backed by the mapping.
+    """
+    import torch
+
+    with open(weights_path, "rb") as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    # Layout: 8-byte little-endian header size, JSON header, tensor data
+    header_size = struct.unpack("<Q", mapping[:8])[0]
+    header = json.loads(mapping[8:8 + header_size])
+    data_start = 8 + header_size
+
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = getattr(torch, SAFETENSORS_DTYPES[info["dtype"]])
+        start, end = info["data_offsets"]
+        if end == start:
+            tensors[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        tensors[name] = torch.frombuffer(
+            mapping, dtype=dtype, count=(end - start) // dtype.itemsize, offset=data_start + start,
+        ).view(info["shape"])
+    return tensors
+
+
+def _load_model_snapshot(snapshot_dir: Path) -> "SentenceTransformer":
+    """
+    Load the embedding model from a prepared snapshot, offline and with
+    memory-mapped weights.
+
+    The transformer is built from its config without initializing its
+    weights, and its parameters are then pointed at the mapped file, so
+    the weights are never copied and concurrent Connor processes share
+    one copy of them.
+
+    Raises:
+        RuntimeError: If the snapshot's weights do not match the model.
+    """
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Transformer
+    from sentence_transformers.util import import_from_string
+    from transformers import AutoModel
+    from transformers.modeling_utils import no_init_weights
+
+    class MappedTransformer(Transformer):
+        def _load_model(self, model_name_or_path, config, cache_dir, backend, **model_args):
+            with no_init_weights():
+                self.auto_model = AutoModel.from_config(config)
+            result = self.auto_model.load_state_dict(
+                _map_safetensors(Path(model_name_or_path) / SNAPSHOT_WEIGHTS_FILE), strict=False, assign=True,
+            )
+            if result.missing_keys or result.unexpected_keys:
+                raise RuntimeError(
+                    f"The model snapshot in '{model_name_or_path}' does not match the model "
+                    f"(missing: {result.missing_keys}, unexpected: {result.unexpected_keys}), "
+                    "run <connor model prepare> again"
+                )
+
+    with open(snapshot_dir / "modules.json") as file:
+        module_configs = json.load(file)
+
+    modules = []
+    for module_config in module_configs:
+        module_class = import_from_string(module_config["type"])
+        if issubclass(module_class, Transformer):
+            module_class = MappedTransformer
+        modules.append(module_class.load(str(snapshot_dir / module_config["path"])))
+    return SentenceTransformer(modules=modules, device="cpu")
+
+
+def _load_embedding_model(
+    cache_dir: Path,
+    backend: str = EMBEDDING_BACKEND,
+    quantization: str = EMBEDDING_QUANTIZATION,
+) -> "SentenceTransformer":
     """
     Load the sentence embedding model with caching.
 
     Args:
         cache_dir: Directory for caching model files.
+        backend: "torch" or "onnx".
+        quantization: ONNX quantization target, or "none" for float32.
 
     Returns:
         Loaded SentenceTransformer model.
     """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(
+            f"Unknown embedding backend '{backend}', expected one of {', '.join(EMBEDDING_BACKENDS)}"
+        )
+    if quantization not in ONNX_QUANTIZATIONS:
+        raise ValueError(
+            f"Unknown quantization '{quantization}', expected one of {', '.join(ONNX_QUANTIZATIONS)}"
+        )
+
+    if backend == "onnx":
+        try:
+            return _load_onnx_model(cache_dir, quantization)
+        except ImportError as e:
+            raise ImportError(
+                "The ONNX backend needs optimum and onnxruntime: pip install optimum[onnxruntime]"
+            ) from e
+
+    from sentence_transformers import SentenceTransformer
+
     return SentenceTransformer(
-        "BAAI/bge-base-en-v1.5",
+        EMBEDDING_MODEL_NAME,
         cache_folder=str(cache_dir),
     )
 
 
-def _initialize_vectorizer() -> TfidfVectorizer:
+def _initialize_vectorizer() -> "TfidfVectorizer":
     """
     Initialize TF-IDF vectorizer.
 
     Returns:
         Configured TfidfVectorizer instance.
     """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
     return TfidfVectorizer(
         max_df=0.8,
         min_df=2,
@@ -52,7 +290,36 @@ def _initialize_vectorizer() -> TfidfVectorizer:
     )
 
 
-def initialize_models() -> Tuple[Any, Set[str], TfidfVectorizer]:
+def load_embedding_model(
+    backend: str = EMBEDDING_BACKEND,
+    quantization: str = EMBEDDING_QUANTIZATION,
+    snapshot_dir: Optional[Path] = None,
+) -> "SentenceTransformer":
+    """
+    Load the sentence embedding model, from a prepared snapshot if there is one.
+
+    Args:
+        backend: Embedding backend, "torch" or "onnx".
+        quantization: ONNX quantization target, or "none" for float32.
+        snapshot_dir: Directory holding model snapshots, the model cache by default.
+
+    Returns:
+        SentenceTransformer instance.
+    """
+    snapshot = get_model_snapshot_dir(snapshot_dir)
+    if backend == "torch" and has_model_snapshot(snapshot):
+        return _load_model_snapshot(snapshot)
+
+    cache_dir = get_model_cache_dir()
+    _setup_cache_environment(cache_dir)
+    return _load_embedding_model(cache_dir, backend, quantization)
+
+
+def initialize_models(
+    backend: str = EMBEDDING_BACKEND,
+    quantization: str = EMBEDDING_QUANTIZATION,
+    snapshot_dir: Optional[Path] = None,
+) -> Tuple[Any, Set[str], "TfidfVectorizer"]:
     """
     Initialize all models and dependencies required for the pipeline.
 
@@ -61,6 +328,15 @@ def initialize_models() -> Tuple[Any, Set[str], TfidfVectorizer]:
     - Stopwords
     - TF-IDF vectorizer
 
+    A snapshot written by prepare_model_snapshot is used by the torch
+    backend when there is one: it loads offline, without touching the
+    HF_* environment variables.
+
+    Args:
+        backend: Embedding backend, "torch" or "onnx".
+        quantization: ONNX quantization target, or "none" for float32.
+        snapshot_dir: Directory holding model snapshots, the model cache by default.
+
     Returns:
         Tuple containing:
             model: SentenceTransformer instance
@@ -71,13 +347,16 @@ def initialize_models() -> Tuple[Any, Set[str], TfidfVectorizer]:
 
     print("Initializing models...")
 
-    cache_dir = get_model_cache_dir()
-    _setup_cache_environment(cache_dir)
-
-    print(f"Cache directory: {cache_dir}")
+    snapshot = get_model_snapshot_dir(snapshot_dir)
+    if backend == "torch" and has_model_snapshot(snapshot):
+        print(f"Model snapshot: {snapshot}")
+    else:
+        print(f"Cache directory: {get_model_cache_dir()}")
 
-    model = _load_embedding_model(cache_dir)
-    print("Embedding model loaded")
+    model = load_embedding_model(backend, quantization, snapshot_dir)
+    # Encode processes load their own copy the same way, sharing the mapped snapshot
+    set_model_loader(model, functools.partial(load_embedding_model, backend, quantization, snapshot_dir))
+    print(f"Embedding model loaded ({get_embedding_model_id(backend, quantization)})")
 
     stop_words = load_stopwords()
     print("Stopwords loaded")
@@ -0,0 +1,250 @@
+import gc
+import hashlib
+import os
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from connor.core.cache import EmbeddingCache
+from connor.core.encoding import encode_texts, EncodingOptions
+from connor.core.profiling import Stage
+from connor.core.setup.defaults import (
+    LOW_MEMORY, MAX_RSS_MB, SPILL_CHUNK_SIZE, TFIDF_SAMPLE_SIZE
+)
+
+# Smallest number of texts encoded at once when shrinking chunks under a memory ceiling
+MIN_SPILL_CHUNK_SIZE = 64
+
+
+class MemoryOptions(NamedTuple):
+    """
+    Settings of the low-memory mode.
+
+    With low_memory, texts are spilled to disk as they are read and
+    embeddings are written to a float16 memory map that clustering streams
+    over. chunk_size texts are encoded at once, and chunk_size is halved
+    whenever the resident set grows past max_rss_mb (0 sets no ceiling).
+    The vectorizer is fitted on at most tfidf_sample texts.
+    """
+    low_memory: bool = LOW_MEMORY
+    max_rss_mb: int = MAX_RSS_MB
+    chunk_size: int = SPILL_CHUNK_SIZE
+    tfidf_sample: int = TFIDF_SAMPLE_SIZE
+
+
+def current_rss_mb() -> Optional[float]:
+    """
+    Return the resident set size of this process in MB.
+
+    Where /proc is not available psutil is used if it is installed, else
+    None is returned. The peak resident set size would never go back down
+    once a chunk is freed, so it is not used instead.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / 2 ** 20
+
+
+class TextStore(Mapping[str, str]):
+    """
+    Append-only file of texts, read back by file name.
+
+    Only the names and the byte offset of each text stay in memory, so a
+    store can stand in for a (file_name, content) list of any size.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: File to write the texts to.
+        """
+        self.path = Path(path)
+        self._writer = self.path.open("wb")
+        self._reader = None
+        self._offsets = array("q", [0])
+        self._rows: Dict[str, int] = {}
+
+    def append(self, name: str, text: str) -> int:
+        """
+        Store the text of a file.
+
+        Returns:
+            Row of the text, in insertion order.
+        """
+        data = text.encode("utf-8")
+        self._writer.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+        row = self._rows[name] = len(self._rows)
+        return row
+
+    def text(self, row: int) -> str:
+        """
+        Read back the text of a row.
+        """
+        self._writer.flush()
+        if self._reader is None:
+            self._reader = self.path.open("rb")
+        self._reader.seek(self._offsets[row])
+        return self._reader.read(self._offsets[row + 1] - self._offsets[row]).decode("utf-8")
+
+    def texts(self, rows: Optional[Iterable[int]] = None) -> Iterator[str]:
+        """
+        Read back the texts of some rows, all of them by default.
+        """
+        for row in range(len(self)) if rows is None else rows:
+            yield self.text(int(row))
+
+    def __getitem__(self, name: str) -> str:
+        return self.text(self._rows[name])
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def close(self) -> None:
+        self._writer.close()
+        if self._reader is not None:
+            self._reader.close()
+
+
+class EmbeddingSpill:
+    """
+    Embeddings appended to a file in float16 as they are computed, then
+    read back as a memory map.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: File to write the embeddings to.
+        """
+        self.path = Path(path)
+        self._file = self.path.open("wb")
+        self.rows = 0
+        self.dim: Optional[int] = None
+
+    def append(self, vectors: np.ndarray) -> None:
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        self._file.write(np.ascontiguousarray(vectors, dtype=np.float16).tobytes())
+        self.rows += vectors.shape[0]
+
+    def open(self) -> np.ndarray:
+        """
+        Close the file for writing and map it, one row per appended vector.
+        """
+        self._file.close()
+        if not self.rows:
+            return np.empty((0, 0), dtype=np.float16)
+        return np.memmap(self.path, dtype=np.float16, mode="r+", shape=(self.rows, self.dim))
+
+
+def spill_embeddings(
+    model: Any,
+    files: Iterable[Tuple[str, str]],
+    store: TextStore,
+    spill: EmbeddingSpill,
+    cache: Optional[EmbeddingCache] = None,
+    encoding: EncodingOptions = EncodingOptions(),
+    memory: MemoryOptions = MemoryOptions(),
+    exact_duplicates: bool = True,
+    progress: Optional[Stage] = None,
+) -> Tuple[np.ndarray, int]:
+    """
+    Encode a stream of texts chunk by chunk, spilling texts and embeddings to disk.
+
+    Only the current chunk of texts is held in memory. Identical texts are
+    encoded once and share their embedding. After each chunk the resident
+    set is checked against memory.max_rss_mb, and the chunk size is halved
+    while it is over.
+
+    Args:
+        model: SentenceTransformer model.
+        files: Stream of (file_name, preprocessed text).
+        store: Store receiving every text.
+        spill: Spill receiving every embedding, in the same order.
+        cache: Optional persistent embedding cache.
+        encoding: Batching and truncation settings of the model.
+        memory: Chunk size and memory ceiling.
+        exact_duplicates: Encode identical texts only once.
+        progress: Optional stage to report encode counters on.
+
+    Returns:
+        Tuple containing:
+            Memory-mapped embedding matrix, one row per text of the store
+            Number of encodes saved by identical texts
+    """
+    chunk_size = max(MIN_SPILL_CHUNK_SIZE, memory.chunk_size)
+    first_by_digest: Dict[bytes, int] = {}
+    copies: List[Tuple[int, int]] = []
+    # Text of each row of the current chunk, None for copies of earlier rows
+    pending: List[Optional[str]] = []
+    warned = False
+
+    def flush() -> None:
+        texts = [text for text in pending if text is not None]
+        chunk = np.zeros((len(pending), spill.dim or 0), dtype=np.float16)
+        if texts:
+            vectors = encode_texts(model, texts, cache, encoding)
+            if not chunk.shape[1]:
+                chunk = np.zeros((len(pending), vectors.shape[1]), dtype=np.float16)
+            chunk[[i for i, text in enumerate(pending) if text is not None]] = vectors
+            if progress is not None:
+                progress.count("encoded", len(texts))
+        spill.append(chunk)
+        pending.clear()
+
+    for name, text in files:
+        row = store.append(name, text)
+        if exact_duplicates:
+            first = first_by_digest.setdefault(hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest(), row)
+            if first != row:
+                copies.append((row, first))
+                pending.append(None)
+                continue
+        pending.append(text)
+
+        if len(pending) >= chunk_size:
+            flush()
+            rss = current_rss_mb() if memory.max_rss_mb > 0 else None
+            if rss is not None and rss > memory.max_rss_mb:
+                gc.collect()
+                if chunk_size > MIN_SPILL_CHUNK_SIZE:
+                    chunk_size = max(MIN_SPILL_CHUNK_SIZE, chunk_size // 2)
+                elif not warned:
+                    print(f"Memory use of {rss:.0f} MB is above the {memory.max_rss_mb} MB ceiling")
+                    warned = True
+    if pending:
+        flush()
+
+    X = spill.open()
+    for start in range(0, len(copies), chunk_size):
+        rows, firsts = zip(*copies[start:start + chunk_size])
+        X[list(rows)] = X[list(firsts)]
+    if progress is not None:
+        progress.count("encodes_saved", len(copies))
+        progress.count("chunk_size", chunk_size)
+    return X, len(copies)
+
+
+def sample_texts(store: TextStore, size: int) -> List[str]:
+    """
+    Read back at most size non-empty texts, evenly spread over the store.
+    """
+    rows = np.unique(np.linspace(0, len(store) - 1, num=min(size, len(store))).astype(np.int64))
+    return [text for text in store.texts(rows) if text]
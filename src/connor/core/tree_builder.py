@@ -1,36 +1,97 @@
-from typing import Dict, List, Generator
+import io
+import sys
+from typing import Dict, List, Generator, Mapping, Optional, TextIO, Union
 
-BRANCH = "│   " 
+BRANCH = "│   "
 CONNECTOR = "├── "
 END = "└── "
 SPACE =  "    "
 
-def make_tree(file_dict: Dict[str, List[str]], indent: str = '') -> Generator[str, None, None]:
+FileDict = Dict[str, Union[List[str], Dict]]
+
+
+def count_files(file_dict: FileDict) -> int:
+    """
+    Count the files of a folder dictionary, nested folders included.
+    """
+    return sum(
+        count_files(files) if isinstance(files, dict) else len(files)
+        for files in file_dict.values()
+    )
+
+
+def _with_count(folder_name: str, count: int) -> str:
+    return f"{folder_name} ({count} file{'' if count == 1 else 's'})"
+
+
+def make_tree(
+    file_dict: FileDict,
+    indent: str = '',
+    max_files: Optional[int] = None,
+    renames: Optional[Mapping[str, str]] = None,
+) -> Generator[str, None, None]:
     """
     Generates the organization summary (tree structure) recursively
 
     Args:
         file_dict: Dictionary of the organized folder
         indent: Current indentation level. Defaults to ''.
-    
+        max_files: Files listed per folder, the rest are summarized. None lists all.
+        renames: New name of the files that get one to avoid a collision.
+
     Yields:
         A line of the tree structure of the folder.
     """
     for folder_name, files in file_dict.items():
-        yield indent + folder_name
-        
-        if files:
-            pointers = [CONNECTOR] * (len(files) - 1) + [END]
-            for pointer, file in zip(pointers, files):
-                yield indent + pointer + file
+        if isinstance(files, dict):
+            yield indent + _with_count(folder_name, count_files(files))
+            yield from make_tree(files, indent + SPACE, max_files, renames)
+            continue
+
+        yield indent + _with_count(folder_name, len(files))
 
+        shown = files if max_files is None else files[:max_files]
+        hidden = len(files) - len(shown)
+        for i, file in enumerate(shown):
+            last = i == len(shown) - 1 and not hidden
+            if renames and file in renames:
+                file = f"{file} -> {renames[file]}"
+            yield indent + (END if last else CONNECTOR) + file
+        if hidden:
+            yield indent + END + f"... {hidden} more"
 
-def make_tree_string(path_name: str, file_dict: Dict[str, List[str]]) -> str:
+
+def write_tree(
+    path_name: str,
+    file_dict: FileDict,
+    out: TextIO = sys.stdout,
+    max_files: Optional[int] = None,
+    renames: Optional[Mapping[str, str]] = None,
+) -> None:
     """
-    Generates a formatted string of the folder tree 
+    Writes the folder tree line by line to a stream, such as stdout or a file.
+
+    Args:
+        path_name: Path of the organized folder.
+        file_dict: Dictionary of the organized folder.
+        out: Stream to write to.
+        max_files: Files listed per folder, the rest are summarized. None lists all.
+        renames: New name of the files that get one to avoid a collision.
     """
-    structure = f"Organized Folder:\n{path_name}\n"
-    for line in make_tree(file_dict):
-        structure += f" {line}\n"
+    out.write(f"Organized Folder:\n{path_name}\n")
+    for line in make_tree(file_dict, max_files=max_files, renames=renames):
+        out.write(f" {line}\n")
+
 
-    return structure
\ No newline at end of file
+def make_tree_string(
+    path_name: str,
+    file_dict: FileDict,
+    max_files: Optional[int] = None,
+    renames: Optional[Mapping[str, str]] = None,
+) -> str:
+    """
+    Generates a formatted string of the folder tree
+    """
+    buffer = io.StringIO()
+    write_tree(path_name, file_dict, buffer, max_files, renames)
+    return buffer.getvalue()
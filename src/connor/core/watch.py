@@ -0,0 +1,92 @@
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+class FolderWatcher:
+    """
+    Polls the top level of a folder for new or changed files.
+
+    Arrivals are debounced: a batch is released once no file has changed
+    for `debounce` seconds, or once the burst has lasted `max_wait` seconds.
+    """
+
+    def __init__(
+        self,
+        folder: Path,
+        poll_interval: float,
+        debounce: float,
+        max_wait: float,
+    ):
+        """
+        Args:
+            folder: Folder to watch.
+            poll_interval: Seconds between scans.
+            debounce: Quiet seconds required before a batch is released.
+            max_wait: Max seconds a batch can be delayed by ongoing arrivals.
+        """
+        self.folder = Path(folder)
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.known: Dict[str, Tuple[int, int]] = {}
+
+    def snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """
+        Return (size, mtime) of every file at the top of the folder.
+        """
+        files = {}
+        for file_path in self.folder.iterdir():
+            try:
+                stat = file_path.stat()
+            except OSError:
+                continue
+            if file_path.is_file():
+                files[file_path.name] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def pending(self, snapshot: Dict[str, Tuple[int, int]]) -> Dict[str, Tuple[int, int]]:
+        return {
+            name: state
+            for name, state in snapshot.items()
+            if self.known.get(name) != state
+        }
+
+    def wait_for_batch(self, stop: threading.Event) -> Optional[List[str]]:
+        """
+        Block until a debounced batch of new files is ready.
+
+        Args:
+            stop: Event that ends the wait early.
+
+        Returns:
+            Names of the new files, or None if stopped.
+        """
+        previous: Dict[str, Tuple[int, int]] = {}
+        first_seen = last_change = None
+
+        while not stop.is_set():
+            pending = self.pending(self.snapshot())
+            now = time.monotonic()
+
+            if pending != previous:
+                last_change = now
+                if not previous:
+                    first_seen = now
+                previous = pending
+
+            if pending and (
+                now - last_change >= self.debounce
+                or now - first_seen >= self.max_wait
+            ):
+                return sorted(pending)
+
+            stop.wait(self.poll_interval)
+        return None
+
+    def mark_done(self) -> None:
+        """
+        Remember the current folder state so only later arrivals are reported.
+        """
+        self.known = self.snapshot()
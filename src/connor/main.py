@@ -1,7 +1,23 @@
 import argparse
+from pathlib import Path
+from typing import List
+
 from connor.cli import ConnorCLI
 
 
+def read_manifest(manifest: str) -> List[str]:
+    """
+    Read the folder paths of a manifest file, one per line.
+    Blank lines and lines starting with # are ignored.
+    """
+    paths = []
+    for line in Path(manifest).read_text().splitlines():
+        line = line.strip()
+        if line and not line.startswith('#'):
+            paths.append(line)
+    return paths
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Connor: Fast file classifier and organizer using NLP"
@@ -12,8 +28,31 @@ def main():
     settings_parser.add_argument('-f', '--folder_word_limit', type=int, help="Set folder word limit.")
     settings_parser.add_argument('-r', '--reading_word_limit', type=int, help="Set reading word limit.")
 
-    organize_parser = subparsers.add_parser('run', help="Organize a folder.")
-    organize_parser.add_argument('path', type=str, help="Path to the folder to organize.")
+    organize_parser = subparsers.add_parser('run', help="Organize one or more folders.")
+    organize_parser.add_argument('path', type=str, nargs='*', help="Paths to the folders to organize.")
+    organize_parser.add_argument('-m', '--manifest', type=str, help="File listing more folders to organize, one per line.")
+    organize_parser.add_argument('-y', '--yes', action='store_true', help="Apply the organization without asking.")
+    organize_parser.add_argument('-i', '--incremental', action='store_true', help="Only place new files into the existing folders.")
+    organize_parser.add_argument('--full', action='store_true', help="List every file in the tree preview.")
+    organize_parser.add_argument('--profile', type=str, metavar='PATH', help="Write per-stage timings and counters as JSON.")
+    organize_parser.add_argument('--cprofile', type=str, metavar='STAGE', help="Run one stage under cProfile, next to the --profile file.")
+
+    plan_parser = subparsers.add_parser('plan', help="Compute how a folder will be organized and save the plan.")
+    plan_parser.add_argument('path', type=str, help="Path to the folder to organize.")
+    plan_parser.add_argument('-o', '--output', type=str, default="plan.json", help="Plan file to write (default: plan.json).")
+    plan_parser.add_argument('-i', '--incremental', action='store_true', help="Only place new files into the existing folders.")
+    plan_parser.add_argument('--full', action='store_true', help="List every file in the tree preview.")
+
+    apply_parser = subparsers.add_parser('apply', help="Apply a saved plan, resuming it if it was interrupted.")
+    apply_parser.add_argument('plan', type=str, help="Plan file written by <connor plan>.")
+
+    watch_parser = subparsers.add_parser('watch', help="Keep the model loaded and organize new files as they arrive.")
+    watch_parser.add_argument('path', type=str, help="Path to the folder to watch.")
+
+    model_parser = subparsers.add_parser('model', help="Manage the embedding model.")
+    model_subparsers = model_parser.add_subparsers(dest='model_command', required=True)
+    prepare_parser = model_subparsers.add_parser('prepare', help="Write a local model snapshot that loads offline and fast.")
+    prepare_parser.add_argument('-o', '--output', type=str, help="Directory to write the snapshot into (default: the model cache).")
 
     args = parser.parse_args()
     cli = ConnorCLI()
@@ -28,7 +67,42 @@ def main():
             cli.show_settings()
 
     elif args.command == 'run':
-        cli.organize_folder(args.path)
+        if args.cprofile and not args.profile:
+            parser.error("--cprofile requires --profile")
+        paths = list(args.path)
+        if args.manifest:
+            try:
+                paths.extend(read_manifest(args.manifest))
+            except OSError as e:
+                parser.error(f"cannot read manifest: {e}")
+        if not paths:
+            parser.error("give at least one path or a --manifest")
+
+        if len(paths) == 1:
+            cli.organize_folder(
+                paths[0],
+                incremental=args.incremental,
+                profile_path=args.profile,
+                cprofile_stage=args.cprofile,
+                full=args.full,
+                assume_yes=args.yes,
+            )
+        else:
+            if args.profile:
+                parser.error("--profile works with a single folder")
+            cli.organize_folders(paths, incremental=args.incremental, full=args.full, assume_yes=args.yes)
+
+    elif args.command == 'plan':
+        cli.save_plan(args.path, args.output, incremental=args.incremental, full=args.full)
+
+    elif args.command == 'apply':
+        cli.apply_saved_plan(args.plan)
+
+    elif args.command == 'watch':
+        cli.watch_folder(args.path)
+
+    elif args.command == 'model':
+        cli.prepare_model(args.output)
 
 
 if __name__ == "__main__":
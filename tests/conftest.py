@@ -0,0 +1,83 @@
+import hashlib
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+
+class HashModel:
+    """
+    Stand-in for the embedding model: each text gets a fixed random unit vector.
+    """
+
+    def __init__(self, dimensions: int = 16):
+        self.dimensions = dimensions
+        self.encoded = 0
+
+    def encode(self, texts, normalize_embeddings=True, **kwargs):
+        self.encoded += len(texts)
+        vectors = []
+        for text in texts:
+            rng = np.random.default_rng(int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little"))
+            vector = rng.standard_normal(self.dimensions).astype(np.float32)
+            vectors.append(vector / np.linalg.norm(vector))
+        return np.array(vectors)
+
+
+@pytest.fixture
+def model() -> HashModel:
+    return HashModel()
+
+
+TOPICS = {
+    "finance": "budget invoice tax payment account balance loan interest bank expense revenue audit",
+    "cooking": "recipe flour sugar oven bake butter garlic onion simmer sauce dough spice",
+    "medicine": "patient doctor symptom diagnosis treatment dose clinic fever therapy nurse vaccine",
+    "software": "python compiler function variable thread server database query deploy kernel bug",
+}
+
+
+def write_corpus(root: Path, files_per_topic: int = 5, seed: int = 0) -> Path:
+    """
+    Write text files on a few distinct topics, some in nested folders, and two misc files.
+    """
+    rng = random.Random(seed)
+    (root / "nested" / "deeper").mkdir(parents=True, exist_ok=True)
+    for topic, vocabulary in TOPICS.items():
+        words = vocabulary.split()
+        for i in range(files_per_topic):
+            folder = root / ["", "nested", "nested/deeper"][i % 3]
+            text = " ".join(rng.choice(words) for _ in range(60))
+            (folder / f"{topic}_{i}.txt").write_text(text)
+    (root / "photo.jpg").write_bytes(b"not read")
+    (root / "nested" / "archive.zip").write_bytes(b"not read")
+    return root
+
+
+@pytest.fixture
+def corpus(tmp_path) -> Path:
+    return write_corpus(tmp_path / "corpus")
+
+
+@pytest.fixture
+def cli(monkeypatch, model):
+    """
+    ConnorCLI on the default config.ini, with the stand-in model and no cache.
+    """
+    import connor.cli.commands as commands
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    config = Path(__file__).resolve().parents[1] / "config" / "config.ini"
+    monkeypatch.setattr(commands, "get_config_file", lambda *args: config)
+    cli = commands.ConnorCLI()
+    cli.model = model
+    cli.stop_words = set()
+    cli.vectorizer = TfidfVectorizer(max_df=0.8, min_df=2)
+    cli.cache_enabled = False
+    cli.daemon_handoff = False
+    cli.read_workers = 1
+    return cli
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from connor.core.cache import EmbeddingCache, open_embedding_cache
+
+DIMENSIONS = 256
+# Bytes of one stored float32 vector
+VECTOR_BYTES = DIMENSIONS * 4
+
+
+def vector(seed):
+    return np.random.default_rng(seed).standard_normal(DIMENSIONS).astype(np.float32)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = EmbeddingCache(tmp_path / "cache.db", "model", 200, max_size_mb=1)
+    yield cache
+    cache.close()
+
+
+def test_keys_depend_on_model_and_word_limit(tmp_path):
+    caches = [
+        EmbeddingCache(tmp_path / "cache.db", "model", 200, 1),
+        EmbeddingCache(tmp_path / "cache.db", "other", 200, 1),
+        EmbeddingCache(tmp_path / "cache.db", "model", 300, 1),
+    ]
+
+    assert len({cache.key("same text") for cache in caches}) == 3
+    assert caches[0].key("same text") == caches[0].key("same text")
+    for cache in caches:
+        cache.close()
+
+
+def test_put_and_get_round_trip(cache):
+    items = {cache.key(f"text {i}"): vector(i) for i in range(5)}
+    cache.put_many(items)
+
+    found = cache.get_many(list(items))
+
+    assert found.keys() == items.keys()
+    for key, value in items.items():
+        assert np.array_equal(found[key], value)
+
+
+def test_get_many_counts_hits_and_misses(cache):
+    cache.put_many({"a": vector(0), "b": vector(1)})
+
+    found = cache.get_many(["a", "missing", "b", "a", "other"])
+
+    assert set(found) == {"a", "b"}
+    assert (cache.hits, cache.misses) == (3, 2)
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    # Room for 4 vectors
+    cache = EmbeddingCache(tmp_path / "cache.db", "model", 200, max_size_mb=1)
+    cache.max_size = 4 * VECTOR_BYTES
+    cache.put_many({f"k{i}": vector(i) for i in range(4)})
+    # k1 was used longest ago, then k2 and k3, and k0 most recently
+    cache.connection.execute("UPDATE embeddings SET last_used = last_used - 10 WHERE key != 'k0'")
+    cache.connection.execute("UPDATE embeddings SET last_used = last_used - 20 WHERE key = 'k1'")
+
+    cache.put_many({"k4": vector(4)})
+
+    assert set(cache.get_many([f"k{i}" for i in range(5)])) == {"k0", "k2", "k3", "k4"}
+    assert cache.size() <= cache.max_size
+    cache.close()
+
+
+def test_running_total_matches_the_table(tmp_path):
+    cache = EmbeddingCache(tmp_path / "cache.db", "model", 200, max_size_mb=1)
+    cache.max_size = 10 * VECTOR_BYTES
+
+    def real_size():
+        (total,) = cache.connection.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()
+        return total
+
+    cache.put_many({f"k{i}": vector(i) for i in range(6)})
+    assert cache._stored == real_size() == 6 * VECTOR_BYTES
+
+    # Overwrites replace the stored bytes instead of adding to them
+    cache.put_many({f"k{i}": vector(i + 100) for i in range(3)})
+    assert cache._stored == real_size() == 6 * VECTOR_BYTES
+
+    # Past the limit, eviction brings the total back under it
+    cache.put_many({f"n{i}": vector(i + 200) for i in range(8)})
+    assert cache._stored == real_size() <= cache.max_size
+
+    stored = cache._stored
+    cache.close()
+    reopened = EmbeddingCache(tmp_path / "cache.db", "model", 200, max_size_mb=1)
+    assert reopened.size() == stored
+    reopened.close()
+
+
+def test_unusable_cache_is_disabled(tmp_path, capsys):
+    (tmp_path / "cache.db").mkdir()
+
+    assert open_embedding_cache(tmp_path / "cache.db", "model", 200, 1) is None
+    assert "Embedding cache disabled" in capsys.readouterr().out
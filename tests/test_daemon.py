@@ -0,0 +1,28 @@
+from connor.cli.daemon import WatchDaemon
+from connor.core.index import FolderIndex
+
+
+def test_batch_leaves_other_loose_files_out_of_the_index(cli, corpus):
+    cli.organize_folder(str(corpus), assume_yes=True)
+    before = FolderIndex.load(corpus)
+    (corpus / "stray.txt").write_text("loose file that was never part of a batch " * 10)
+    (corpus / "new.txt").write_text("budget invoice tax payment account balance loan " * 10)
+
+    daemon = WatchDaemon(cli, corpus, poll_interval=1, debounce=1, max_wait=1)
+    daemon.organize_batch(["new.txt"])
+
+    after = FolderIndex.load(corpus)
+    assert (corpus / "stray.txt").exists()
+    assert not (corpus / "new.txt").exists()
+    assert after.counts.sum() == before.counts.sum() + 1
+    assert len(after) <= len(before) + 1
+    assert after.names[:len(before)] == before.names
+
+
+def test_batch_refuses_a_folder_never_organized(cli, corpus, capsys):
+    daemon = WatchDaemon(cli, corpus, poll_interval=1, debounce=1, max_wait=1)
+    daemon.organize_batch(["photo.jpg"])
+
+    assert "No previous organization" in capsys.readouterr().out
+    assert (corpus / "photo.jpg").exists()
+    assert (corpus / "nested" / "finance_1.txt").exists()
@@ -0,0 +1,80 @@
+from connor.core.dedup import DedupOptions, DuplicateIndex, find_exact_duplicates, group_duplicates
+
+WORDS = [f"word{i}" for i in range(200)]
+TEXT = " ".join(WORDS)
+# One word in 200 differs: about 97% of the word shingles are shared
+NEAR_TEXT = " ".join(WORDS[:100] + ["changed"] + WORDS[101:])
+OTHER_TEXT = " ".join(f"other{i}" for i in range(200))
+
+
+def test_find_exact_duplicates(tmp_path):
+    contents = {
+        "a.txt": "same bytes",
+        "b.txt": "same bytes",
+        "c.md": "same bytes",
+        "d.txt": "diff bytes",
+        "e.txt": "same bytes",
+    }
+    paths = []
+    for name, content in contents.items():
+        (tmp_path / name).write_text(content)
+        paths.append(tmp_path / name)
+    paths.append(tmp_path / "missing.txt")
+
+    # Same size but different bytes, or another extension, is no duplicate
+    assert find_exact_duplicates(paths) == {1: 0, 4: 0}
+
+
+def test_exact_duplicates_share_a_group():
+    groups = group_duplicates([TEXT, OTHER_TEXT, TEXT], DedupOptions(exact=True, near=False))
+
+    assert groups.unique.tolist() == [0, 1]
+    assert groups.inverse.tolist() == [0, 1, 0]
+    assert (groups.exact, groups.near) == (1, 0)
+
+
+def test_near_duplicates_only_group_when_enabled():
+    texts = [TEXT, NEAR_TEXT, OTHER_TEXT]
+
+    exact_only = group_duplicates(texts, DedupOptions(exact=True, near=False))
+    assert exact_only.inverse.tolist() == [0, 1, 2]
+    assert exact_only.saved == 0
+
+    near = group_duplicates(texts, DedupOptions(exact=True, near=True))
+    assert near.unique.tolist() == [0, 2]
+    assert near.inverse.tolist() == [0, 0, 1]
+    assert (near.exact, near.near) == (0, 1)
+
+
+def test_near_threshold_is_respected():
+    groups = group_duplicates([TEXT, NEAR_TEXT], DedupOptions(near=True, near_threshold=1.0))
+
+    assert groups.inverse.tolist() == [0, 1]
+
+
+def test_exact_copy_of_a_near_duplicate_follows_its_chain():
+    # 2 is an exact copy of 1, which is a near duplicate of 0: all three
+    # must map to 0, not to 1, which is not encoded
+    groups = group_duplicates([TEXT, NEAR_TEXT, NEAR_TEXT, OTHER_TEXT], DedupOptions(exact=True, near=True))
+
+    assert groups.unique.tolist() == [0, 3]
+    assert groups.inverse.tolist() == [0, 0, 0, 1]
+    assert (groups.exact, groups.near) == (1, 1)
+
+
+def test_duplicate_index_matches_group_duplicates():
+    texts = [TEXT, OTHER_TEXT, NEAR_TEXT, TEXT, NEAR_TEXT]
+    index = DuplicateIndex(DedupOptions(exact=True, near=True))
+
+    added = [index.add(text) for text in texts]
+
+    assert added == [(0, True), (1, True), (0, False), (0, False), (0, False)]
+    assert (index.exact, index.near) == (2, 1)
+    assert index.saved == group_duplicates(texts).saved
+
+
+def test_duplicate_index_without_detection():
+    index = DuplicateIndex(DedupOptions(exact=False, near=False))
+
+    assert [index.add(text) for text in (TEXT, TEXT)] == [(0, True), (1, True)]
+    assert index.saved == 0
@@ -0,0 +1,166 @@
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+import connor.core.encoding as encoding
+from conftest import HashModel
+from connor.core.encoding import EncodingOptions, encode_texts
+
+
+class LimitedModel(HashModel):
+    """
+    HashModel with a token limit, recording the limit each encode call saw.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.max_seq_length = 512
+        self.seen = []
+
+    def encode(self, texts, **kwargs):
+        self.seen.append(self.max_seq_length)
+        return super().encode(texts, **kwargs)
+
+
+TEXTS = [f"text number {i}" for i in range(10)]
+
+
+def test_token_limit_is_put_back_after_a_capped_call():
+    model = LimitedModel()
+
+    encode_texts(model, TEXTS, options=EncodingOptions(batch_size=4, max_seq_length=16))
+    assert set(model.seen) == {16}
+    assert model.max_seq_length == 512
+
+    model.seen.clear()
+    encode_texts(model, TEXTS, options=EncodingOptions(batch_size=4))
+    assert set(model.seen) == {512}
+
+
+def test_concurrent_calls_keep_their_own_token_limit():
+    model = LimitedModel()
+    barrier = threading.Barrier(2)
+    results = {}
+
+    def run(limit):
+        barrier.wait()
+        for _ in range(20):
+            encode_texts(model, TEXTS, options=EncodingOptions(batch_size=2, max_seq_length=limit))
+        results[limit] = True
+
+    threads = [threading.Thread(target=run, args=(limit,)) for limit in (16, 0)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {16: True, 0: True}
+    assert model.max_seq_length == 512
+    # Every batch saw either the cap or the model's own limit, in runs of whole calls
+    assert set(model.seen) == {16, 512}
+    calls = [model.seen[i:i + 5] for i in range(0, len(model.seen), 5)]
+    assert all(len(set(call)) == 1 for call in calls)
+
+
+def test_limit_does_not_change_the_embeddings_of_a_model_without_one(model):
+    vectors = encode_texts(model, TEXTS, options=EncodingOptions(max_seq_length=16))
+
+    assert np.array_equal(vectors, encode_texts(model, TEXTS))
+
+
+class FakePool:
+    """
+    Stands in for a ProcessPoolExecutor, recording its settings.
+    """
+
+    def __init__(self, processes, mp_context=None, initializer=None, initargs=()):
+        self.processes = processes
+        self.threads = initargs[1]
+        self.broken = False
+        self.closed = False
+
+    def submit(self, function, *args):
+        future = Future()
+        if self.broken:
+            future.set_exception(BrokenProcessPool("a worker died"))
+        else:
+            future.set_result(HashModel().encode(args[0]))
+        return future
+
+    def shutdown(self, wait=True):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_pools(monkeypatch, model):
+    pools = []
+
+    def start(*args, **kwargs):
+        pools.append(FakePool(*args, **kwargs))
+        return pools[-1]
+
+    monkeypatch.setattr(encoding, "ProcessPoolExecutor", start)
+    encoding.set_model_loader(model, HashModel)
+    yield pools
+    encoding.close_encode_pool(model)
+
+
+def pool_options(processes, threads):
+    return EncodingOptions(batch_size=4, processes=processes, threads_per_process=threads, min_pool_texts=2)
+
+
+def test_each_pool_setting_gets_its_own_pool(model, fake_pools):
+    expected = encode_texts(HashModel(), TEXTS)
+
+    first = encode_texts(model, TEXTS, options=pool_options(2, 1))
+    again = encode_texts(model, TEXTS, options=pool_options(2, 1))
+    other = encode_texts(model, TEXTS, options=pool_options(3, 2))
+
+    assert [(pool.processes, pool.threads) for pool in fake_pools] == [(2, 1), (3, 2)]
+    assert model.encoded == 0
+    for vectors in (first, again, other):
+        assert np.array_equal(vectors, expected)
+
+    encoding.close_encode_pool(model)
+    assert all(pool.closed for pool in fake_pools)
+
+
+def test_broken_pool_falls_back_to_this_process(model, fake_pools, capsys):
+    encode_texts(model, TEXTS, options=pool_options(2, 1))
+    fake_pools[0].broken = True
+
+    vectors = encode_texts(model, TEXTS, options=pool_options(2, 1))
+    assert "encode processes failed" in capsys.readouterr().out
+    assert np.array_equal(vectors, encode_texts(HashModel(), TEXTS))
+    assert model.encoded == len(TEXTS)
+    assert fake_pools[0].closed
+
+    # The broken setting stays in this process, other settings still get a pool
+    encode_texts(model, TEXTS, options=pool_options(2, 1))
+    assert len(fake_pools) == 1
+    assert model.encoded == 2 * len(TEXTS)
+    encode_texts(model, TEXTS, options=pool_options(3, 1))
+    assert len(fake_pools) == 2
+
+
+def test_model_without_loader_encodes_in_this_process(model, capsys):
+    vectors = encode_texts(model, TEXTS, options=pool_options(2, 1))
+
+    assert "was not loaded by initialize_models" in capsys.readouterr().out
+    assert model.encoded == len(TEXTS)
+    assert np.array_equal(vectors, encode_texts(HashModel(), TEXTS))
+    encoding.close_encode_pool(model)
+
+
+def test_spawned_workers_match_this_process(model):
+    encoding.set_model_loader(model, HashModel)
+    try:
+        vectors = encode_texts(model, TEXTS * 4, options=pool_options(2, 1))
+    finally:
+        encoding.close_encode_pool(model)
+
+    assert model.encoded == 0
+    assert np.array_equal(vectors, encode_texts(HashModel(), TEXTS * 4))
@@ -0,0 +1,66 @@
+import warnings
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from connor.core.group import ClusteringOptions, choose_n_clusters, split_large_folders
+from connor.core.setup.defaults import MISCELLANEOUS_FOLDER_NAME
+
+
+@pytest.mark.parametrize("mode", ["silhouette", "elbow"])
+@pytest.mark.parametrize("n_files", range(1, 9))
+def test_small_folders_get_a_valid_cluster_count(mode, n_files):
+    X = np.random.default_rng(n_files).standard_normal((n_files, 8)).astype(np.float32)
+    X /= np.linalg.norm(X, axis=1, keepdims=True)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        k = choose_n_clusters(X, ClusteringOptions(k_selection=mode))
+
+    assert 1 <= k <= max(1, n_files - 1)
+
+
+def topic_files(topic, words, n, axis, rng):
+    files = [(f"{topic}_{i}.txt", " ".join(rng.permutation(words.split()))) for i in range(n)]
+    X = np.zeros((n, 8), dtype=np.float32)
+    X[:, axis] = 1.0
+    X += rng.normal(scale=0.01, size=X.shape)
+    return files, X / np.linalg.norm(X, axis=1, keepdims=True)
+
+
+def test_large_folders_are_split_into_named_subfolders():
+    rng = np.random.default_rng(0)
+    finance, X_finance = topic_files("finance", "budget invoice tax loan", 6, 0, rng)
+    cooking, X_cooking = topic_files("cooking", "recipe flour oven sauce", 6, 1, rng)
+    small, X_small = topic_files("small", "kernel thread server", 3, 2, rng)
+    files_list = finance + cooking + small
+    file_names = [name for name, _ in files_list]
+    X = np.vstack([X_finance, X_cooking, X_small])
+    vectorizer = TfidfVectorizer().fit([content for _, content in files_list])
+    renamed_dict = {
+        "Big": [name for name, _ in finance + cooking],
+        "Small": [name for name, _ in small],
+        MISCELLANEOUS_FOLDER_NAME: {"zip": ["a.zip"] * 20},
+    }
+
+    split = split_large_folders(
+        renamed_dict, file_names, X, vectorizer, files_list, 2,
+        ClusteringOptions(k_selection="silhouette", max_depth=2, max_folder_size=5),
+    )
+
+    assert split["Small"] == renamed_dict["Small"]
+    assert split[MISCELLANEOUS_FOLDER_NAME] == renamed_dict[MISCELLANEOUS_FOLDER_NAME]
+    subfolders = split["Big"]
+    assert sorted(map(sorted, subfolders.values())) == sorted([
+        sorted(name for name, _ in cooking), sorted(name for name, _ in finance),
+    ])
+    for name, files in subfolders.items():
+        topic_words = set(dict(files_list)[files[0]].split())
+        assert {word.lower() for word in name.split("_")} <= topic_words
+
+
+def test_folders_are_not_split_without_a_size_limit():
+    renamed_dict = {"Big": [f"{i}.txt" for i in range(50)]}
+
+    assert split_large_folders(renamed_dict, [], np.empty((0, 8)), None, [], 2, ClusteringOptions(max_folder_size=0)) is renamed_dict
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from connor.core.index import FolderIndex
+from connor.core.organize import start_incremental_run
+from connor.core.setup.defaults import MISCELLANEOUS_FOLDER_NAME
+
+AXES = {"finance": 0, "cooking": 1, "software": 2}
+
+
+class TopicModel:
+    """
+    Embeds every text on the axis of its first word, so similarities are known.
+    """
+
+    def encode(self, texts, normalize_embeddings=True, **kwargs):
+        X = np.zeros((len(texts), 4), dtype=np.float32)
+        for i, text in enumerate(texts):
+            X[i, AXES[text.split()[0]]] = 1.0
+        return X
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_match_returns_the_nearest_folder_and_its_similarity():
+    index = FolderIndex(
+        names=["Finance", "Cooking"],
+        centroids=np.array([[2.0, 0, 0], [0, 0.5, 0]], dtype=np.float32),
+        counts=np.array([1, 1]),
+    )
+    X = np.array([unit(1, 0.2, 0), unit(0.1, 1, 0), unit(0, 0, 1)])
+
+    best, similarity = index.match(X)
+
+    assert best[:2].tolist() == [0, 1]
+    assert similarity[:2] == pytest.approx([X[0, 0], X[1, 1]])
+    assert similarity[2] == pytest.approx(0)
+
+
+def test_empty_index_matches_nothing():
+    best, similarity = FolderIndex().match(np.eye(2, dtype=np.float32))
+
+    assert best.tolist() == [0, 0]
+    assert np.all(np.isneginf(similarity))
+
+
+def test_update_weights_centroids_by_file_count():
+    X = np.array([[1, 0], [3, 0], [0, 2], [0, 4]], dtype=np.float32)
+    index = FolderIndex.from_groups({"A": ["a1", "a2"], MISCELLANEOUS_FOLDER_NAME: {"zip": ["z"]}}, ["a1", "a2"], X[:2])
+
+    index.update({"A": ["a3"], "B": ["b1"], "Parent": {"Child": ["c1"]}}, ["a3", "b1", "c1"], X[1:])
+
+    assert index.names == ["A", "B", "Parent/Child"]
+    assert index.counts.tolist() == [3, 1, 1]
+    np.testing.assert_allclose(index.centroids[0], [(1 + 3 + 3) / 3, 0])
+    np.testing.assert_allclose(index.centroids[1], [0, 2])
+    np.testing.assert_allclose(index.centroids[2], [0, 4])
+
+
+def test_index_survives_a_save_load_round_trip(tmp_path):
+    index = FolderIndex.from_groups({"Finance": ["a"], "Cooking": ["b", "c"]}, ["a", "b", "c"], np.eye(3, dtype=np.float32))
+    index.save(tmp_path)
+
+    loaded = FolderIndex.load(tmp_path)
+
+    assert loaded.names == index.names
+    np.testing.assert_array_equal(loaded.centroids, index.centroids)
+    np.testing.assert_array_equal(loaded.counts, index.counts)
+    assert FolderIndex.load(tmp_path / "never organized") is None
+
+
+def test_incremental_run_splits_files_at_the_similarity_threshold(tmp_path):
+    index = FolderIndex(
+        names=["Finance", "Cooking"],
+        centroids=np.array([unit(1, 0, 0, 0), unit(0, 1, 0, 0)]),
+        counts=np.array([4, 4]),
+    )
+    files_list = [
+        ("budget.txt", "finance budget invoice tax"),
+        ("recipe.txt", "cooking recipe flour oven"),
+        ("python.txt", "software python compiler thread"),
+        ("kernel.txt", "software kernel server thread"),
+    ]
+
+    renamed_dict, _, updated = start_incremental_run(
+        str(tmp_path), 100, 2, {}, TopicModel(), set(), TfidfVectorizer(), index,
+        similarity_threshold=0.5, files=(files_list, []), build_tree=False,
+    )
+
+    assert renamed_dict["Finance"] == ["budget.txt"]
+    assert renamed_dict["Cooking"] == ["recipe.txt"]
+    new_folders = {name: files for name, files in renamed_dict.items() if name not in ("Finance", "Cooking", MISCELLANEOUS_FOLDER_NAME)}
+    assert sorted(f for files in new_folders.values() for f in files) == ["kernel.txt", "python.txt"]
+    assert updated.counts.tolist()[:2] == [5, 5]
+    assert sorted(updated.names[2:]) == sorted(new_folders)
+
+
+def test_incremental_run_with_a_strict_threshold_joins_no_folder(tmp_path):
+    index = FolderIndex(names=["Finance"], centroids=np.array([unit(1, 1, 0, 0)]), counts=np.array([2]))
+    files_list = [("budget.txt", "finance budget invoice tax"), ("bank.txt", "finance bank loan tax")]
+
+    renamed_dict, _, _ = start_incremental_run(
+        str(tmp_path), 100, 2, {}, TopicModel(), set(), TfidfVectorizer(), index,
+        similarity_threshold=0.8, files=(files_list, []), build_tree=False,
+    )
+
+    assert "Finance" not in renamed_dict
+    assert sorted(f for files in renamed_dict.values() for f in files) == ["bank.txt", "budget.txt"]
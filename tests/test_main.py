@@ -0,0 +1,67 @@
+import sys
+
+import pytest
+
+import connor.main as main_module
+from connor.core.index import FolderIndex
+from connor.main import read_manifest
+
+from conftest import write_corpus
+
+
+def run_main(monkeypatch, cli, *args):
+    monkeypatch.setattr(main_module, "ConnorCLI", lambda: cli)
+    monkeypatch.setattr(sys, "argv", ["connor", *args])
+    main_module.main()
+
+
+def test_manifest_skips_blank_lines_and_comments(tmp_path):
+    manifest = tmp_path / "folders.txt"
+    manifest.write_text("# photos\n/data/a\n\n   \n  /data/b  \n  # /data/old\n/data/c # not a comment\n")
+
+    assert read_manifest(str(manifest)) == ["/data/a", "/data/b", "/data/c # not a comment"]
+
+
+def test_each_root_is_organized_once(cli, tmp_path, monkeypatch, capsys):
+    first = write_corpus(tmp_path / "first", seed=1)
+    second = write_corpus(tmp_path / "second", seed=2)
+    manifest = tmp_path / "folders.txt"
+    manifest.write_text(f"# organized nightly\n{first}\n\n{second}/\n{tmp_path}/second/../first\n")
+    plans = []
+    plan_folder = cli.plan_folder
+    monkeypatch.setattr(cli, "plan_folder", lambda root, *args, **kwargs: plans.append(root) or plan_folder(root, *args, **kwargs))
+
+    run_main(monkeypatch, cli, "run", str(first), "-m", str(manifest), "-y")
+
+    out = capsys.readouterr().out
+    assert plans == [first.resolve(), second.resolve()]
+    assert "Organized 2 folders:" in out
+    for root in (first, second):
+        assert FolderIndex.load(root) is not None
+        assert not (root / "nested").exists()
+
+
+def test_root_inside_another_root_is_skipped(cli, tmp_path, monkeypatch, capsys):
+    outer = write_corpus(tmp_path / "outer")
+    inner = outer / "nested"
+    other = write_corpus(tmp_path / "other", seed=1)
+
+    cli.organize_folders([str(inner), str(outer), str(tmp_path / "missing"), str(other)], assume_yes=True)
+
+    out = capsys.readouterr().out
+    assert f"The folder '{inner.resolve()}' is inside '{outer.resolve()}'" in out
+    assert f"The folder '{tmp_path / 'missing'}' does not exist." in out
+    assert "Organized 2 folders:" in out
+    assert FolderIndex.load(outer) is not None
+    assert FolderIndex.load(other) is not None
+    assert not inner.exists()
+
+
+def test_run_needs_a_path_or_a_manifest(cli, tmp_path, monkeypatch):
+    manifest = tmp_path / "empty.txt"
+    manifest.write_text("# nothing yet\n\n")
+
+    with pytest.raises(SystemExit):
+        run_main(monkeypatch, cli, "run", "-m", str(manifest))
+    with pytest.raises(SystemExit):
+        run_main(monkeypatch, cli, "run", "-m", str(tmp_path / "missing.txt"))
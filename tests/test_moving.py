@@ -0,0 +1,171 @@
+import errno
+import os
+
+import pytest
+
+import connor.core.moving as moving
+from connor.core.moving import (
+    copy_verify_unlink, free_target, move_files, organize, plan_moves,
+    remove_empty_folders, rename_no_replace, resolve_collisions,
+)
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return str(path)
+
+
+@pytest.fixture
+def cross_device(monkeypatch):
+    """
+    Make every rename fail as if source and target were on different devices.
+    """
+    def link(source, target, **kwargs):
+        raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+
+    monkeypatch.setattr(os, "link", link)
+    monkeypatch.setattr(os, "rename", link)
+
+
+def test_rename_never_replaces_an_existing_file(tmp_path):
+    source = write(tmp_path / "a.txt", "new")
+    target = write(tmp_path / "b.txt", "old")
+
+    with pytest.raises(FileExistsError):
+        rename_no_replace(source, target)
+
+    assert (tmp_path / "a.txt").read_text() == "new"
+    assert (tmp_path / "b.txt").read_text() == "old"
+
+
+def test_rename_without_hard_links_still_refuses_existing_targets(tmp_path, monkeypatch):
+    def link(source, target, **kwargs):
+        raise OSError(errno.EPERM, os.strerror(errno.EPERM))
+
+    monkeypatch.setattr(os, "link", link)
+    source = write(tmp_path / "a.txt", "new")
+    target = write(tmp_path / "b.txt", "old")
+
+    with pytest.raises(FileExistsError):
+        rename_no_replace(source, target)
+    rename_no_replace(source, str(tmp_path / "c.txt"))
+
+    assert (tmp_path / "b.txt").read_text() == "old"
+    assert (tmp_path / "c.txt").read_text() == "new"
+    assert not (tmp_path / "a.txt").exists()
+
+
+def test_copy_never_replaces_an_existing_file(tmp_path):
+    source = write(tmp_path / "a.txt", "new")
+    target = write(tmp_path / "b.txt", "old")
+
+    with pytest.raises(FileExistsError):
+        copy_verify_unlink(source, target)
+
+    assert (tmp_path / "a.txt").exists()
+    assert (tmp_path / "b.txt").read_text() == "old"
+
+
+def test_free_target_skips_taken_names(tmp_path):
+    write(tmp_path / "a.txt", "1")
+    write(tmp_path / "a_2.txt", "2")
+
+    assert free_target(str(tmp_path / "a.txt")) == str(tmp_path / "a_3.txt")
+
+
+def test_same_name_collisions_get_numbered(tmp_path):
+    for folder in ("", "x", "y", "z"):
+        write(tmp_path / folder / "report.txt", folder or "top")
+    write(tmp_path / "Reports" / "report.txt", "already there")
+    renamed_dict = {"Reports": ["report.txt", "x/report.txt", "y/report.txt", "z/report.txt"]}
+
+    moves = resolve_collisions(plan_moves(str(tmp_path), renamed_dict))
+
+    assert [os.path.basename(target) for _, target in moves] == [
+        "report_2.txt", "report_3.txt", "report_4.txt", "report_5.txt",
+    ]
+
+
+def test_files_already_in_place_are_not_moved(tmp_path):
+    write(tmp_path / "Reports" / "report.txt", "in place")
+
+    assert resolve_collisions(plan_moves(str(tmp_path), {"Reports": ["Reports/report.txt"]})) == []
+
+
+def test_target_taken_after_planning_goes_to_the_next_free_name(tmp_path):
+    source = write(tmp_path / "a.txt", "planned")
+    moves = resolve_collisions([(source, str(tmp_path / "Docs" / "a.txt"))])
+    write(tmp_path / "Docs" / "a.txt", "arrived later")
+
+    stats = move_files(moves)
+
+    assert (stats.moved, stats.renamed) == (1, 1)
+    assert (tmp_path / "Docs" / "a.txt").read_text() == "arrived later"
+    assert (tmp_path / "Docs" / "a_2.txt").read_text() == "planned"
+
+
+def test_cross_device_moves_copy_verify_and_unlink(tmp_path, cross_device):
+    sources = [write(tmp_path / f"f{i}.txt", "x" * (i + 1)) for i in range(3)]
+    write(tmp_path / "Docs" / "f0.txt", "taken")
+    moved = []
+
+    stats = move_files(
+        [(source, str(tmp_path / "Docs" / os.path.basename(source))) for source in sources],
+        workers=2,
+        on_moved=lambda source, target: moved.append(os.path.basename(target)),
+    )
+
+    assert (stats.moved, stats.copied, stats.renamed, stats.bytes_copied) == (3, 3, 1, 6)
+    assert sorted(moved) == ["f0_2.txt", "f1.txt", "f2.txt"]
+    assert all(not os.path.exists(source) for source in sources)
+    assert (tmp_path / "Docs" / "f0.txt").read_text() == "taken"
+    assert (tmp_path / "Docs" / "f0_2.txt").read_text() == "x"
+    assert (tmp_path / "Docs" / "f2.txt").read_text() == "xxx"
+
+
+def test_copy_that_does_not_match_is_removed(tmp_path, monkeypatch):
+    source = write(tmp_path / "a.txt", "content")
+    target = str(tmp_path / "b.txt")
+    monkeypatch.setattr(moving.shutil, "copyfileobj", lambda src, dst: dst.write(b"cut"))
+
+    with pytest.raises(OSError, match="expected"):
+        copy_verify_unlink(source, target)
+
+    assert (tmp_path / "a.txt").read_text() == "content"
+    assert not os.path.exists(target)
+
+
+def test_missing_sources_are_counted(tmp_path, cross_device):
+    stats = move_files([(str(tmp_path / "gone.txt"), str(tmp_path / "Docs" / "gone.txt"))])
+
+    assert (stats.moved, stats.missing) == (0, 1)
+
+
+def test_remove_empty_folders_keeps_folders_with_files(tmp_path):
+    moves = [
+        (write(tmp_path / "a" / "b" / "c" / "one.txt", "1"), str(tmp_path / "Docs" / "one.txt")),
+        (write(tmp_path / "d" / "two.txt", "2"), str(tmp_path / "Docs" / "two.txt")),
+    ]
+    write(tmp_path / "d" / "stays.txt", "kept")
+    move_files(moves)
+
+    remove_empty_folders(str(tmp_path), moves)
+
+    assert not (tmp_path / "a").exists()
+    assert (tmp_path / "d" / "stays.txt").exists()
+    assert (tmp_path / "Docs").is_dir()
+
+
+def test_organize_moves_each_file_once(tmp_path):
+    write(tmp_path / "n" / "a.txt", "nested a")
+    write(tmp_path / "a.txt", "top a")
+    write(tmp_path / "b.bin", "binary")
+
+    stats = organize(str(tmp_path), {"Letters": ["a.txt", "n/a.txt"], "_misc": {"bin": ["b.bin"]}})
+
+    assert stats.moved == 3
+    assert (tmp_path / "Letters" / "a.txt").read_text() == "top a"
+    assert (tmp_path / "Letters" / "a_2.txt").read_text() == "nested a"
+    assert (tmp_path / "_misc" / "bin" / "b.bin").exists()
+    assert not (tmp_path / "n").exists()
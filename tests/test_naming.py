@@ -0,0 +1,68 @@
+import random
+
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import connor.core.naming as naming
+from connor.core.naming import name_category, name_clusters
+
+WORDS = "alpha beta gamma delta epsilon zeta eta theta iota kappa the and of".split()
+
+
+def reference_name(vectorizer, content_list, folder_word_limit=5, delimiter="_"):
+    """
+    Per-cluster naming as name_category did before clusters were named in one pass.
+
+    Terms missing from the cluster are left out rather than padding the name.
+    """
+    if not content_list:
+        return "Untitled"
+
+    scores = vectorizer.transform(content_list).mean(axis=0).A1
+    feature_names = vectorizer.get_feature_names_out()
+    top_indices = scores.argsort(kind="stable")[-folder_word_limit:][::-1]
+    top_words = [feature_names[i].capitalize() for i in top_indices if scores[i] > 0]
+    return delimiter.join(top_words) or "Untitled"
+
+
+def random_clusters(seed):
+    rng = random.Random(seed)
+    clusters = []
+    for _ in range(rng.randint(3, 12)):
+        cluster = []
+        for _ in range(rng.randint(0, 4)):
+            words = rng.sample(WORDS, rng.randint(1, 4))
+            # Repeated documents and single-word documents give tied scores
+            cluster.extend([" ".join(words)] * rng.randint(1, 2))
+        clusters.append(cluster)
+    return clusters
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("stop_words", [None, "english"])
+@pytest.mark.parametrize("limit", [1, 3, 20])
+def test_one_pass_naming_matches_per_cluster_naming(seed, stop_words, limit, monkeypatch):
+    # A tiny block ranks the clusters a few at a time
+    monkeypatch.setattr(naming, "NAMING_BLOCK_CELLS", 20)
+    clusters = random_clusters(seed)
+    vectorizer = TfidfVectorizer(stop_words=stop_words).fit(
+        [text for contents in clusters for text in contents] + ["alpha beta"]
+    )
+
+    expected = [reference_name(vectorizer, contents, limit) for contents in clusters]
+
+    assert name_clusters(vectorizer, clusters, limit) == expected
+    assert [name_category(vectorizer, contents, limit) for contents in clusters] == expected
+
+
+def test_ties_keep_the_later_term_first():
+    vectorizer = TfidfVectorizer().fit(["alpha beta gamma", "delta"])
+
+    assert name_clusters(vectorizer, [["alpha beta gamma"]], 2) == ["Gamma_Beta"]
+
+
+def test_clusters_without_terms_are_untitled():
+    vectorizer = TfidfVectorizer(stop_words="english").fit(["alpha beta", "gamma"])
+
+    assert name_clusters(vectorizer, [[], ["the and of"], ["alpha"]], 3) == ["Untitled", "Untitled", "Alpha"]
+    assert name_clusters(vectorizer, [["alpha"]], 0) == ["Untitled"]
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from connor import Organizer, OrganizerSettings
+from connor.core.index import FolderIndex
+
+from conftest import HashModel, write_corpus
+
+
+class SlowModel(HashModel):
+    """
+    HashModel that records whether two encode calls ever overlapped.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.active = 0
+        self.overlapped = False
+        self.lock = threading.Lock()
+
+    def encode(self, texts, normalize_embeddings=True, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.overlapped |= self.active > 1
+        time.sleep(0.01)
+        try:
+            return super().encode(texts, normalize_embeddings, **kwargs)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def layout(root):
+    return sorted(str(path.relative_to(root)) for path in root.rglob("*") if path.is_file() and ".connor" not in path.parts)
+
+
+def counts(stats):
+    return stats.moves._replace(seconds=0), stats.resumed, stats.changed
+
+
+def make_organizer(model):
+    return Organizer(model, set(), TfidfVectorizer(max_df=0.8, min_df=2), OrganizerSettings(read_workers=1))
+
+
+def test_concurrent_plans_match_sequential_ones(tmp_path):
+    roots = [write_corpus(tmp_path / "async" / name, seed=seed) for name, seed in (("a", 1), ("b", 2))]
+    twins = [write_corpus(tmp_path / "sync" / name, seed=seed) for name, seed in (("a", 1), ("b", 2))]
+    model = SlowModel()
+
+    async def organize(organizer):
+        plans = await asyncio.gather(*(organizer.plan_async(root) for root in roots))
+        stats = [await organizer.apply_async(plan) for plan in plans]
+        return plans, stats
+
+    with make_organizer(model) as organizer:
+        plans, stats = asyncio.run(organize(organizer))
+    with make_organizer(HashModel()) as organizer:
+        expected_plans = [organizer.plan(root) for root in twins]
+        expected_stats = [organizer.apply(plan) for plan in expected_plans]
+
+    assert not model.overlapped
+    for plan, expected in zip(plans, expected_plans):
+        assert plan.renamed_dict == expected.renamed_dict
+        assert [(m.source, m.target) for m in plan.moves] == [(m.source, m.target) for m in expected.moves]
+    assert list(map(counts, stats)) == list(map(counts, expected_stats))
+    for root, twin in zip(roots, twins):
+        assert layout(root) == layout(twin)
+        assert FolderIndex.load(root).names == FolderIndex.load(twin).names
+
+
+def test_plan_leaves_the_folder_untouched(tmp_path, model):
+    root = write_corpus(tmp_path / "corpus")
+    before = layout(root)
+
+    with make_organizer(model) as organizer:
+        plan = organizer.plan(root)
+
+    assert layout(root) == before
+    assert len(plan.moves) == len(before)
+    assert FolderIndex.load(root) is None
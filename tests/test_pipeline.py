@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+import connor.core.pipeline as pipeline_module
+from connor.core.dedup import DedupOptions
+from connor.core.organize import encode_deduplicated
+from connor.core.pipeline import PipelineOptions, read_and_encode
+from connor.core.prepare import get_files_list
+
+WORD_LIMIT = 500
+# Small queues and batches, so every stage blocks on the next one at times
+SMALL_QUEUES = PipelineOptions(enabled=True, read_queue=1, encode_queue=1, batch_texts=2)
+
+
+@pytest.fixture
+def folder(tmp_path):
+    root = tmp_path / "folder"
+    (root / "nested" / "deeper").mkdir(parents=True)
+    base = " ".join(f"topic{i}" for i in range(120))
+    files = {
+        "a.txt": base,
+        "nested/a_copy.txt": base,
+        "nested/a_near.txt": base.replace("topic60", "changed"),
+        "b.md": " ".join(f"recipe{i}" for i in range(80)),
+        "nested/deeper/c.txt": " ".join(f"invoice{i}" for i in range(90)),
+        "nested/deeper/d.csv": "name,amount\nrent,100\nfood,50",
+        "empty.txt": "",
+        "photo.jpg": "not read",
+        "nested/archive.zip": "not read",
+    }
+    for name, content in files.items():
+        (root / name).write_text(content)
+    return root
+
+
+def sequential(folder, model, dedup):
+    files_list, misc_list = get_files_list(
+        folder, WORD_LIMIT, set(), recursive=True, skip_duplicates=dedup.exact,
+    )
+    X = encode_deduplicated(model, [content for _, content in files_list], dedup=dedup)
+    return files_list, misc_list, X
+
+
+@pytest.mark.parametrize("dedup", [
+    DedupOptions(exact=False, near=False),
+    DedupOptions(exact=True, near=False),
+    DedupOptions(exact=True, near=True),
+])
+def test_same_result_as_sequential_stages(folder, model, dedup):
+    expected_files, expected_misc, expected_X = sequential(folder, model, dedup)
+
+    files_list, misc_list, X = read_and_encode(
+        folder, WORD_LIMIT, set(), model, dedup=dedup, options=SMALL_QUEUES, recursive=True,
+    )
+
+    assert files_list == expected_files
+    assert sorted(misc_list) == sorted(expected_misc)
+    assert np.array_equal(X, expected_X)
+
+
+def test_duplicates_share_embeddings_and_are_encoded_once(folder, model):
+    files_list, _, X = read_and_encode(
+        folder, WORD_LIMIT, set(), model, dedup=DedupOptions(exact=True, near=True),
+        options=SMALL_QUEUES, recursive=True,
+    )
+    row = {name: i for i, (name, _) in enumerate(files_list)}
+
+    assert np.array_equal(X[row["nested/a_copy.txt"]], X[row["a.txt"]])
+    assert np.array_equal(X[row["nested/a_near.txt"]], X[row["a.txt"]])
+    assert model.encoded == len(files_list) - 2
+
+
+def test_reading_error_is_raised(folder, model, monkeypatch):
+    def failing_iter_files(*args, **kwargs):
+        yield "photo.jpg", None
+        raise PermissionError("cannot read")
+
+    monkeypatch.setattr(pipeline_module, "iter_files", failing_iter_files)
+
+    with pytest.raises(PermissionError, match="cannot read"):
+        read_and_encode(folder, WORD_LIMIT, set(), model, options=SMALL_QUEUES, recursive=True)
+
+
+def test_preprocessing_error_is_raised(folder, model, monkeypatch):
+    def failing_preprocess(content, stop_words):
+        raise ValueError("bad text")
+
+    monkeypatch.setattr(pipeline_module, "preprocess", failing_preprocess)
+
+    with pytest.raises(ValueError, match="bad text"):
+        read_and_encode(folder, WORD_LIMIT, set(), model, options=SMALL_QUEUES, recursive=True)
+
+
+def test_encoding_error_stops_the_other_stages(folder, model, monkeypatch):
+    def failing_encode(texts, **kwargs):
+        raise RuntimeError("model failed")
+
+    monkeypatch.setattr(model, "encode", failing_encode)
+
+    with pytest.raises(RuntimeError, match="model failed"):
+        read_and_encode(folder, WORD_LIMIT, set(), model, options=SMALL_QUEUES, recursive=True)
+    assert not [thread for thread in pipeline_module.threading.enumerate() if thread.name.startswith("connor-")]
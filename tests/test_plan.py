@@ -0,0 +1,159 @@
+import json
+import os
+
+import pytest
+
+import connor.core.plan as plan_module
+from connor.core.plan import OrganizationPlan, apply_plan, read_journal
+
+
+@pytest.fixture
+def folder(tmp_path):
+    root = tmp_path / "folder"
+    (root / "nested").mkdir(parents=True)
+    for name in ("a.txt", "b.txt", "c.txt", "d.txt"):
+        (root / name).write_text(f"content of {name}")
+    (root / "nested" / "e.txt").write_text("content of e.txt")
+    return root
+
+
+def build_plan(root):
+    renamed_dict = {
+        "Letters": ["a.txt", "b.txt", "nested/e.txt"],
+        "Notes": ["c.txt", "d.txt"],
+    }
+    return OrganizationPlan.build(root, renamed_dict)
+
+
+def organized(root):
+    return sorted(
+        os.path.relpath(os.path.join(directory, name), root).replace(os.sep, "/")
+        for directory, _, names in os.walk(root)
+        for name in names
+    )
+
+
+EXPECTED = ["Letters/a.txt", "Letters/b.txt", "Letters/e.txt", "Notes/c.txt", "Notes/d.txt"]
+
+
+def interrupt_after(monkeypatch, count):
+    """
+    Make the next apply stop with KeyboardInterrupt after count moves.
+    """
+    move_files = plan_module.move_files
+
+    def interrupted(moves, workers, progress, on_moved=None):
+        move_files(moves[:count], workers, progress, on_moved=on_moved)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(plan_module, "move_files", interrupted)
+
+
+def test_apply_moves_every_file_and_deletes_journal(folder, tmp_path):
+    plan = build_plan(folder)
+    journal = tmp_path / "plan.json.journal"
+
+    stats = apply_plan(plan, journal)
+
+    assert organized(folder) == EXPECTED
+    assert stats.moves.moved == 5
+    assert stats.resumed == 0
+    assert stats.changed == []
+    assert not journal.exists()
+    assert not (folder / "nested").exists()
+
+
+def test_interrupted_apply_resumes_from_journal(folder, tmp_path, monkeypatch):
+    plan = build_plan(folder)
+    journal = tmp_path / "plan.json.journal"
+
+    interrupt_after(monkeypatch, 2)
+    with pytest.raises(KeyboardInterrupt):
+        apply_plan(plan, journal)
+    assert len(read_journal(journal)) == 2
+    monkeypatch.undo()
+
+    stats = apply_plan(plan, journal)
+
+    assert organized(folder) == EXPECTED
+    assert stats.resumed == 2
+    assert stats.moves.moved == 3
+    assert stats.changed == []
+    assert not journal.exists()
+
+
+def test_saved_plan_resumes_after_reload(folder, tmp_path, monkeypatch):
+    plan_path = tmp_path / "plan.json"
+    build_plan(folder).save(plan_path)
+    journal = OrganizationPlan.journal_path(plan_path)
+
+    interrupt_after(monkeypatch, 3)
+    with pytest.raises(KeyboardInterrupt):
+        apply_plan(OrganizationPlan.load(plan_path), journal)
+    monkeypatch.undo()
+
+    stats = apply_plan(OrganizationPlan.load(plan_path), journal)
+
+    assert organized(folder) == EXPECTED
+    assert stats.resumed == 3
+    assert stats.moves.moved == 2
+
+
+def test_move_done_but_not_journaled_counts_as_resumed(folder, tmp_path):
+    plan = build_plan(folder)
+    journal = tmp_path / "plan.json.journal"
+    # An apply stopped between the rename of a.txt and its journal line
+    (folder / "Letters").mkdir()
+    os.rename(folder / "a.txt", folder / "Letters" / "a.txt")
+
+    stats = apply_plan(plan, journal)
+
+    assert organized(folder) == EXPECTED
+    assert stats.resumed == 1
+    assert stats.moves.moved == 4
+
+
+def test_truncated_journal_line_is_ignored(tmp_path):
+    journal = tmp_path / "plan.json.journal"
+    journal.write_text(json.dumps({"source": "a.txt"}) + "\n" + '{"sour')
+
+    assert read_journal(journal) == {"a.txt"}
+
+
+def test_changed_file_is_left_in_place(folder, tmp_path):
+    plan = build_plan(folder)
+    (folder / "c.txt").write_text("edited after planning, longer than before")
+
+    stats = apply_plan(plan, tmp_path / "plan.json.journal")
+
+    assert stats.changed == ["c.txt"]
+    assert (folder / "c.txt").exists()
+    assert not (folder / "Notes" / "c.txt").exists()
+    assert (folder / "Notes" / "d.txt").exists()
+
+
+def test_collisions_are_resolved_when_planning(folder):
+    (folder / "nested" / "a.txt").write_text("another a")
+    plan = OrganizationPlan.build(folder, {"Letters": ["a.txt", "nested/a.txt"]})
+
+    assert plan.renames() == {"nested/a.txt": "a_2.txt"}
+    assert "nested/a.txt -> a_2.txt" in plan.tree()
+
+    apply_plan(plan, None)
+
+    assert (folder / "Letters" / "a.txt").read_text() == "content of a.txt"
+    assert (folder / "Letters" / "a_2.txt").read_text() == "another a"
+
+
+def test_target_taken_after_planning_gets_the_next_free_name(folder, tmp_path):
+    plan = build_plan(folder)
+    (folder / "Notes").mkdir()
+    (folder / "Notes" / "c.txt").write_text("created after planning")
+
+    stats = apply_plan(plan, tmp_path / "plan.json.journal")
+
+    assert stats.changed == []
+    assert stats.moves.renamed == 1
+    assert (folder / "Notes" / "c.txt").read_text() == "created after planning"
+    assert (folder / "Notes" / "c_2.txt").read_text() == "content of c.txt"
+    assert not (folder / "c.txt").exists()
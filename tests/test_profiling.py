@@ -0,0 +1,94 @@
+import io
+import json
+import pstats
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from connor.core.index import FolderIndex
+from connor.core.organize import start_incremental_run
+from connor.core.profiling import RunProfile, Stage, optional_stage
+
+
+def test_stage_counts_items_and_named_counters():
+    stage = Stage("read", total=10)
+    stage.advance()
+    stage.advance(4)
+    stage.count("bytes", 100)
+    stage.count("bytes", 20)
+    stage.count("skipped")
+    stage.finish()
+
+    report = stage.report()
+
+    assert (stage.done, report["items"]) == (5, 5)
+    assert report["bytes"] == 120
+    assert report["skipped"] == 1
+    assert report["seconds"] == stage.seconds > 0
+
+
+def test_stage_draws_progress_with_its_total():
+    display = io.StringIO()
+    stage = Stage("encode", display, total=4)
+    stage.advance(2)
+    stage.set_total(8)
+    stage.finish()
+
+    lines = display.getvalue().split("\r")
+    assert any(line.startswith("encode") and "2/8  25.0%" in line for line in lines)
+    assert lines[-1].startswith("encode             done in")
+
+
+def test_profile_reports_every_stage_as_json(tmp_path):
+    profile = RunProfile()
+    with profile.stage("read", total=3) as stage:
+        stage.advance(3)
+        stage.count("files_cached", 2)
+    with profile.stage("cluster"):
+        pass
+
+    profile.dump(tmp_path / "profile.json")
+    report = json.loads((tmp_path / "profile.json").read_text())
+
+    assert list(report["stages"]) == ["read", "cluster"]
+    assert report["stages"]["read"]["items"] == 3
+    assert report["stages"]["read"]["files_cached"] == 2
+    assert report["stages"]["cluster"]["items_per_second"] == 0
+    assert report["total_seconds"] >= sum(s["seconds"] for s in report["stages"].values())
+
+
+def test_only_the_chosen_stage_is_profiled(tmp_path):
+    path = tmp_path / "encode.prof"
+    profile = RunProfile(cprofile_stage="encode", cprofile_path=path)
+    with profile.stage("read"):
+        sorted(range(10))
+    with profile.stage("encode"):
+        sum(range(10))
+
+    functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+    assert "<built-in method builtins.sum>" in functions
+    assert "<built-in method builtins.sorted>" not in functions
+
+
+def test_optional_stage_without_a_profile_still_counts():
+    with optional_stage(None, "match_index", total=2) as stage:
+        stage.advance(2)
+        stage.count("matched")
+
+    assert (stage.done, stage.counters["matched"]) == (2, 1)
+
+
+def test_incremental_run_counts_matched_files_once(tmp_path, model):
+    texts = ["finance budget invoice", "cooking recipe flour", "software python compiler"]
+    index = FolderIndex(names=["Finance"], centroids=model.encode(texts[:1]), counts=np.array([3]))
+    profile = RunProfile()
+
+    start_incremental_run(
+        str(tmp_path), 100, 2, {}, model, set(), TfidfVectorizer(), index,
+        similarity_threshold=0.99, profile=profile,
+        files=([(f"{i}.txt", text) for i, text in enumerate(texts)], []), build_tree=False,
+    )
+
+    report = profile.report()["stages"]
+    assert report["match_index"]["items"] == 3
+    assert report["match_index"]["matched"] == 1
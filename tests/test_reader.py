@@ -0,0 +1,229 @@
+import tracemalloc
+import zipfile
+
+import pytest
+
+import connor.core.reader as reader
+from connor.core.reader import (
+    extract_file, read_doc, read_odf, read_pdf, read_ppt, read_text, read_xlsx, take_words
+)
+
+ODF_NAMESPACES = (
+    'xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+    'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" '
+    'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" '
+    'xmlns:draw="urn:oasis:names:tc:opendocument:xmlns:drawing:1.0"'
+)
+
+
+def write_odf(path, body):
+    content = (
+        f'<?xml version="1.0" encoding="UTF-8"?>\n<office:document-content {ODF_NAMESPACES}>'
+        f'<office:body><office:text>{body}</office:text></office:body></office:document-content>'
+    )
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("content.xml", content)
+    return path
+
+
+def write_pdf(path, lines):
+    """
+    Write a one-page PDF showing each line with a standard font.
+    """
+    text = " ".join(f"({line}) Tj 0 -14 Td" for line in lines)
+    stream = f"BT /F1 12 Tf 72 720 Td {text} ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(data)
+    return path
+
+
+def counted(chunks, consumed):
+    for chunk in chunks:
+        consumed.append(chunk)
+        yield chunk
+
+
+def test_take_words_stops_at_the_chunk_that_fills_the_budget():
+    consumed = []
+    chunks = counted(["one two three", "four five six", "seven eight", "nine"], consumed)
+
+    assert take_words(chunks, 5) == "one two three four five"
+    assert len(consumed) == 2
+
+
+def test_take_words_reads_nothing_without_a_budget():
+    consumed = []
+
+    assert take_words(counted(["one two"], consumed), 0) == ""
+    assert consumed == []
+
+
+def test_read_text_chunks_end_on_word_boundaries(tmp_path, monkeypatch):
+    monkeypatch.setattr(reader, "TEXT_CHUNK_SIZE", 8)
+    words = ["alpha", "beta", "gamma", "supercalifragilistic", "delta", "epsilon", "zeta"]
+    path = tmp_path / "notes.txt"
+    path.write_text("  ".join(words) + "\n")
+
+    chunks = list(read_text(path))
+
+    assert len(chunks) > 2
+    assert [word for chunk in chunks for word in chunk.split()] == words
+
+
+def test_extract_file_keeps_the_word_limit(tmp_path):
+    path = tmp_path / "long.txt"
+    path.write_text(" ".join(f"word{i}" for i in range(100000)))
+
+    result = extract_file(path, 3)
+
+    assert result.content == "word0 word1 word2"
+    assert result.error is None
+    assert result.size == path.stat().st_size
+
+
+def test_extract_file_reports_parse_errors(tmp_path):
+    path = tmp_path / "broken.docx"
+    path.write_bytes(b"not a zip file")
+
+    result = extract_file(path, 10)
+
+    assert result.content == ""
+    assert result.error is not None
+
+
+def test_read_odf_reads_nested_paragraphs_once(tmp_path):
+    path = write_odf(
+        tmp_path / "document.odt",
+        '<text:p>outer start <draw:frame><draw:text-box><text:p>inside a text box</text:p>'
+        '</draw:text-box></draw:frame> outer end</text:p>'
+        '<text:p>second<text:s/>paragraph<text:tab/>with<text:line-break/>breaks</text:p>'
+        '<text:p/>',
+    )
+
+    assert list(read_odf(path)) == [
+        "outer start inside a text box outer end",
+        "second paragraph with breaks",
+    ]
+
+
+def table_document(path, rows):
+    cells = "".join(
+        f"<table:table-row><table:table-cell><text:p>cell {i} of the table</text:p></table:table-cell></table:table-row>"
+        for i in range(rows)
+    )
+    return write_odf(path, f"<table:table>{cells}</table:table>")
+
+
+def peak_memory(chunks):
+    tracemalloc.start()
+    try:
+        count = sum(1 for _ in chunks)
+        return count, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_read_odf_memory_does_not_grow_with_the_document(tmp_path):
+    small_count, small_peak = peak_memory(read_odf(table_document(tmp_path / "small.odt", 2000)))
+    large_count, large_peak = peak_memory(read_odf(table_document(tmp_path / "large.odt", 20000)))
+
+    assert (small_count, large_count) == (2000, 20000)
+    assert large_peak < 2 * small_peak
+
+
+def test_read_pdf(tmp_path):
+    path = write_pdf(tmp_path / "report.pdf", ["Quarterly budget report", "Invoices and taxes"])
+
+    text = " ".join(read_pdf(path))
+
+    assert text.split() == "Quarterly budget report Invoices and taxes".split()
+
+
+def test_read_doc(tmp_path):
+    from docx import Document
+
+    document = Document()
+    document.add_paragraph("First paragraph of the letter")
+    document.add_paragraph("Second paragraph")
+    document.save(tmp_path / "letter.docx")
+
+    assert list(read_doc(tmp_path / "letter.docx")) == ["First paragraph of the letter", "Second paragraph"]
+
+
+def test_read_xlsx(tmp_path):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["item", "amount"])
+    sheet.append(["rent", 1200])
+    sheet.append([None, "empty first cell"])
+    workbook.save(tmp_path / "budget.xlsx")
+
+    assert list(read_xlsx(tmp_path / "budget.xlsx")) == ["item amount", "rent 1200", "empty first cell"]
+
+
+def test_read_ppt(tmp_path):
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    presentation = Presentation()
+    for title in ("Roadmap", "Release plan"):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[6])
+        slide.shapes.add_textbox(Inches(1), Inches(1), Inches(4), Inches(1)).text_frame.text = title
+    presentation.save(tmp_path / "slides.pptx")
+
+    assert list(read_ppt(tmp_path / "slides.pptx")) == ["Roadmap", "Release plan"]
+
+
+@pytest.mark.parametrize("suffix", [".odt", ".pdf", ".docx", ".xlsx", ".pptx", ".txt"])
+def test_every_format_honours_the_word_limit(tmp_path, suffix):
+    path = tmp_path / f"document{suffix}"
+    lines = [f"line{i} with four words" for i in range(30)]
+    if suffix == ".odt":
+        write_odf(path, "".join(f"<text:p>{line}</text:p>" for line in lines))
+    elif suffix == ".pdf":
+        write_pdf(path, lines)
+    elif suffix == ".docx":
+        from docx import Document
+        document = Document()
+        for line in lines:
+            document.add_paragraph(line)
+        document.save(path)
+    elif suffix == ".xlsx":
+        from openpyxl import Workbook
+        workbook = Workbook()
+        for line in lines:
+            workbook.active.append(line.split())
+        workbook.save(path)
+    elif suffix == ".pptx":
+        from pptx import Presentation
+        from pptx.util import Inches
+        presentation = Presentation()
+        slide = presentation.slides.add_slide(presentation.slide_layouts[6])
+        for i, line in enumerate(lines):
+            slide.shapes.add_textbox(Inches(1), Inches(i % 7), Inches(4), Inches(1)).text_frame.text = line
+        presentation.save(path)
+    else:
+        path.write_text("\n".join(lines))
+
+    result = extract_file(path, 10)
+
+    assert result.error is None
+    assert result.content == "line0 with four words line1 with four words line2 with"
@@ -0,0 +1,102 @@
+import tempfile
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import connor.core.spill as spill_module
+from connor.core.group import ClusteringOptions
+from connor.core.organize import start_run
+from connor.core.spill import EmbeddingSpill, MemoryOptions, TextStore, spill_embeddings
+
+from conftest import TOPICS, HashModel
+
+
+class TopicModel(HashModel):
+    """
+    Embeds each text near the axis of its most frequent topic, so that
+    every clustering engine finds the same groups.
+    """
+
+    def encode(self, texts, normalize_embeddings=True, **kwargs):
+        noise = super().encode(texts) * 0.05
+        X = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for i, text in enumerate(texts):
+            words = text.split()
+            counts = [sum(word in vocabulary.split() for word in words) for vocabulary in TOPICS.values()]
+            X[i, int(np.argmax(counts))] = 1.0
+        X += noise
+        return X / np.linalg.norm(X, axis=1, keepdims=True)
+
+
+def test_text_store_reads_texts_back_by_name(tmp_path):
+    store = TextStore(tmp_path / "texts")
+    texts = {"a.txt": "first", "b.txt": "", "c.txt": "naïve café ☕", "d.txt": "last"}
+    rows = [store.append(name, text) for name, text in texts.items()]
+
+    assert rows == [0, 1, 2, 3]
+    assert dict(store) == texts
+    assert "b.txt" in store and "e.txt" not in store
+    assert list(store.texts([3, 0])) == ["last", "first"]
+    with pytest.raises(KeyError):
+        store["e.txt"]
+    store.close()
+
+
+def test_identical_texts_share_one_encode(tmp_path, model, monkeypatch):
+    monkeypatch.setattr(spill_module, "MIN_SPILL_CHUNK_SIZE", 1)
+    files = [(f"{i}.txt", f"text {i % 4}") for i in range(10)]
+    store = TextStore(tmp_path / "texts")
+    spill = EmbeddingSpill(tmp_path / "embeddings")
+
+    X, saved = spill_embeddings(model, iter(files), store, spill, memory=MemoryOptions(chunk_size=3))
+
+    assert (saved, model.encoded) == (6, 4)
+    assert isinstance(X, np.memmap) and X.dtype == np.float16
+    expected = model.encode([text for _, text in files]).astype(np.float16)
+    np.testing.assert_array_equal(X, expected)
+    store.close()
+
+
+def test_chunks_shrink_above_the_memory_ceiling(tmp_path, model, monkeypatch):
+    monkeypatch.setattr(spill_module, "MIN_SPILL_CHUNK_SIZE", 2)
+    monkeypatch.setattr(spill_module, "current_rss_mb", lambda: 1000.0)
+    store = TextStore(tmp_path / "texts")
+    spill = EmbeddingSpill(tmp_path / "embeddings")
+    stage = spill_module.Stage("read_encode")
+
+    X, _ = spill_embeddings(
+        model, ((f"{i}.txt", f"text {i}") for i in range(40)), store, spill,
+        memory=MemoryOptions(max_rss_mb=10, chunk_size=16), progress=stage,
+    )
+
+    assert X.shape == (40, model.dimensions)
+    assert stage.counters["chunk_size"] == 2
+    store.close()
+
+
+def test_low_memory_run_groups_like_the_normal_run(corpus, monkeypatch, tmp_path):
+    monkeypatch.setattr(spill_module, "MIN_SPILL_CHUNK_SIZE", 1)
+    spill_root = tmp_path / "spill"
+    spill_root.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(spill_root))
+    clustering = ClusteringOptions(max_folder_size=0)
+
+    def run(memory):
+        renamed_dict, _, index = start_run(
+            str(corpus), 100, 2, {}, TopicModel(), set(), TfidfVectorizer(),
+            clustering=clustering, memory=memory, build_tree=False,
+        )
+        return renamed_dict, index
+
+    normal, normal_index = run(MemoryOptions(low_memory=False))
+    low, low_index = run(MemoryOptions(low_memory=True, chunk_size=3))
+
+    def groups(renamed_dict):
+        return sorted(sorted(files) for name, files in renamed_dict.items() if isinstance(files, list))
+
+    assert groups(low) == groups(normal)
+    assert len(groups(low)) == len(TOPICS)
+    assert low["_misc"] == normal["_misc"]
+    assert dict(zip(low_index.names, low_index.counts)) == dict(zip(normal_index.names, normal_index.counts))
+    assert list(spill_root.iterdir()) == []
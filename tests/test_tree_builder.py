@@ -0,0 +1,62 @@
+import io
+
+from connor.core.tree_builder import count_files, make_tree, make_tree_string, write_tree
+
+FILE_DICT = {
+    "Finance": ["budget.txt", "invoice.txt", "loan.txt", "tax.txt"],
+    "Cooking": ["recipe.txt"],
+    "Parent": {
+        "Child": ["a.txt", "b.txt", "c.txt"],
+        "Other": [],
+    },
+    "_misc": {"zip": ["archive.zip", "backup.zip"]},
+}
+RENAMES = {"invoice.txt": "invoice_2.txt", "a.txt": "a_3.txt", "c.txt": "c_2.txt"}
+
+
+def test_tree_lists_every_file_without_a_cap():
+    assert list(make_tree({"Cooking": ["recipe.txt", "sauce.txt"]})) == [
+        "Cooking (2 files)",
+        "├── recipe.txt",
+        "└── sauce.txt",
+    ]
+
+
+def test_tree_snapshot_with_cap_and_renames():
+    tree = make_tree_string("/data/docs", FILE_DICT, max_files=2, renames=RENAMES)
+
+    assert tree == (
+        "Organized Folder:\n"
+        "/data/docs\n"
+        " Finance (4 files)\n"
+        " ├── budget.txt\n"
+        " ├── invoice.txt -> invoice_2.txt\n"
+        " └── ... 2 more\n"
+        " Cooking (1 file)\n"
+        " └── recipe.txt\n"
+        " Parent (3 files)\n"
+        "     Child (3 files)\n"
+        "     ├── a.txt -> a_3.txt\n"
+        "     ├── b.txt\n"
+        "     └── ... 1 more\n"
+        "     Other (0 files)\n"
+        " _misc (2 files)\n"
+        "     zip (2 files)\n"
+        "     ├── archive.zip\n"
+        "     └── backup.zip\n"
+    )
+
+
+def test_cap_of_zero_only_summarizes():
+    assert list(make_tree({"Finance": ["a.txt", "b.txt"]}, max_files=0)) == [
+        "Finance (2 files)",
+        "└── ... 2 more",
+    ]
+
+
+def test_written_tree_matches_the_string():
+    out = io.StringIO()
+    write_tree("/data/docs", FILE_DICT, out, 3, RENAMES)
+
+    assert out.getvalue() == make_tree_string("/data/docs", FILE_DICT, 3, RENAMES)
+    assert count_files(FILE_DICT) == 10